@@ -0,0 +1,160 @@
+"""
+Move generation for many positions at once with NumPy.
+
+Positions are (N, 32) int8 arrays of the playable squares in the stored
+orientation (the dataset.encode_board layout of raw cells, square =
+row * 4 + col // 2). generate_children() returns the same boards, in the
+same order, as Board.returnPossibleMoves() does for each position, so a
+search built on it makes exactly the choices negamax() makes.
+"""
+
+import numpy as np
+
+from gamerecord import square_coords, square_index
+
+# Direction order of get_possible_moves_for_piece: forward first, backward after (kings only)
+_UP = ((-1, -1), (-1, 1))
+_DOWN = ((1, -1), (1, 1))
+_DIRECTIONS = (_UP + _DOWN, _DOWN + _UP)  # index 0: pieces > 0, 1: pieces < 0
+
+# Longest capture chain that the sort keys can hold (12 pieces can be captured at most)
+_MAX_CHAIN = 16
+
+
+def _build_tables():
+    step = np.full((2, 32, 4), -1, dtype=np.intp)
+    jump = np.full((2, 32, 4), -1, dtype=np.intp)
+    for side, directions in enumerate(_DIRECTIONS):
+        for s in range(32):
+            r, c = square_coords(s)
+            for d, (dy, dx) in enumerate(directions):
+                if 0 <= r + dy < 8 and 0 <= c + dx < 8:
+                    step[side, s, d] = square_index(r + dy, c + dx)
+                if 0 <= r + 2 * dy < 8 and 0 <= c + 2 * dx < 8:
+                    jump[side, s, d] = square_index(r + 2 * dy, c + 2 * dx)
+    return step, jump
+
+
+# STEP[side, square, direction]: neighbouring square (-1 off the board); JUMP: the square behind it
+STEP, JUMP = _build_tables()
+
+# Men of side 0 (pieces > 0) promote on row 0, men of side 1 on row 7
+PROMOTES = np.zeros((2, 32), dtype=bool)
+PROMOTES[0, :4] = True
+PROMOTES[1, 28:] = True
+
+
+def to_cells(position):
+    """8x8 cell lists of one (32,) position."""
+    cells = [[0] * 8 for _ in range(8)]
+    for s, piece in enumerate(position.tolist()):
+        r, c = square_coords(s)
+        cells[r][c] = piece
+    return cells
+
+
+def _captures(positions, movers, sides):
+    """
+    All complete capture sequences, ordered like the depth-first search of
+    get_possible_moves_for_piece.
+
+    Returns: (parent, child, sort key) arrays of the finished sequences
+    """
+    m, origin = np.nonzero(positions * movers[:, None] > 0)
+    boards = positions[m].copy()
+    current = origin.copy()
+    king = np.abs(positions[m, origin]) == 2
+    code = np.zeros(len(m), dtype=np.int64)
+    length = 0
+
+    parents, children, keys = [], [], []
+    while len(m):
+        rows = np.arange(len(m))
+        side = sides[m]
+        over = STEP[side, current]
+        land = JUMP[side, current]
+        over_piece = boards[rows[:, None], np.where(over >= 0, over, 0)]
+        land_piece = boards[rows[:, None], np.where(land >= 0, land, 0)]
+
+        valid = (land >= 0) & (over_piece * movers[m][:, None] < 0) & (land_piece == 0)
+        valid[:, 2:] &= king[:, None]
+
+        finished = ~valid.any(axis=1)
+        if length > 0 and finished.any():
+            done = np.nonzero(finished)[0]
+            final = boards[done]
+            promote = ~king[done] & PROMOTES[side[done], current[done]]
+            final[promote, current[done][promote]] = 2 * movers[m[done]][promote]
+            parents.append(m[done])
+            children.append(final)
+            keys.append(np.stack([m[done], origin[done], code[done] << (2 * (_MAX_CHAIN - length))], axis=1))
+
+        k, d = np.nonzero(valid)
+        if not len(k):
+            break
+        new_boards = boards[k]
+        jumped_to, jumped_over, jumped_from = land[k, d], over[k, d], current[k]
+        idx = np.arange(len(k))
+        new_boards[idx, jumped_to] = new_boards[idx, jumped_from]
+        new_boards[idx, jumped_from] = 0
+        new_boards[idx, jumped_over] = 0
+
+        m, origin, king = m[k], origin[k], king[k]
+        boards, current = new_boards, jumped_to
+        code = code[k] * 4 + d
+        length += 1
+
+    if not parents:
+        return np.zeros(0, dtype=np.intp), np.zeros((0, 32), dtype=np.int8), np.zeros((0, 3), dtype=np.int64)
+    return np.concatenate(parents), np.concatenate(children), np.concatenate(keys)
+
+
+def generate_children(positions, movers):
+    """
+    Legal moves of many positions at once.
+
+    Args:
+        positions: (N, 32) int8, stored orientation
+        movers: (N,) sign of the pieces to move in each position (1 or -1)
+
+    Returns:
+        parents: (K,) index of the position each child comes from, ascending
+        children: (K, 32) int8 positions after each move
+        has_capture: (N,) bool, the position had a compulsory capture
+        progress: (K,) bool, the move was a capture or moved an uncrowned piece
+    """
+    positions = np.asarray(positions, dtype=np.int8).reshape(-1, 32)
+    movers = np.asarray(movers, dtype=np.int8).reshape(-1)
+    sides = (movers < 0).astype(np.intp)
+    n = len(positions)
+
+    cap_parents, cap_children, cap_keys = _captures(positions, movers, sides)
+    order = np.lexsort(cap_keys[:, ::-1].T) if len(cap_keys) else np.zeros(0, dtype=np.intp)
+    cap_parents, cap_children = cap_parents[order], cap_children[order]
+
+    has_capture = np.zeros(n, dtype=bool)
+    has_capture[cap_parents] = True
+
+    # Simple moves, only in positions without a capture; nonzero() yields them by position, square, direction
+    step = STEP[sides]
+    target = np.take_along_axis(positions, np.where(step >= 0, step, 0).reshape(n, -1), axis=1).reshape(n, 32, 4)
+    own = positions * movers[:, None]
+    valid = (step >= 0) & (target == 0) & (own > 0)[:, :, None] & ~has_capture[:, None, None]
+    valid[:, :, 2:] &= (own == 2)[:, :, None]
+
+    m, s, d = np.nonzero(valid)
+    t = step[m, s, d]
+    piece = positions[m, s]
+    man = np.abs(piece) == 1
+    simple_children = positions[m]
+    idx = np.arange(len(m))
+    simple_children[idx, t] = np.where(man & PROMOTES[sides[m], t], 2 * movers[m], piece)
+    simple_children[idx, s] = 0
+
+    parents = np.concatenate([cap_parents, m])
+    children = np.concatenate([cap_children, simple_children])
+    progress = np.concatenate([np.ones(len(cap_parents), dtype=bool), man])
+
+    # A position has either captures or simple moves, so a stable sort by parent keeps each one's order
+    order = np.argsort(parents, kind='stable')
+    return parents[order], children[order], has_capture, progress[order]
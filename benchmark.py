@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Deterministic benchmark games and bit-for-bit game replay.
+
+'run' plays a fixed set of seeded games and reports the wall time of each
+one. Because every game is fully determined by its seed, the same set can be
+re-run after an engine change and compared fairly; a changed game
+fingerprint means the change also altered the moves played.
+
+'search' searches positions from the benchmark games at a fixed depth and
+reports the node rate, garbage collections and peak memory of the search.
+
+'replay' regenerates a saved game from its recorded seed and checks that
+the result is identical, e.g. to profile a slow game in isolation.
+
+Examples:
+    python benchmark.py run --output before.json
+    python benchmark.py run --compare before.json
+    python benchmark.py run --games 1 --profile sample --profile-output profile_out
+    python benchmark.py search --depth 5
+    python benchmark.py replay training_games/game_20250101_120000_000000_s1234.pkl
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import time
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+from checkers_types import Board, MoveCache, SearchStats, minimax_possiblemove, set_move_cache
+from gamegenerator import GameGenerator, games_match
+from gamerecord import GameRecord
+from profiling import Profiler, add_profile_arguments
+
+
+# (player1_depth, player2_depth, random_move_chance, initial_random_moves, max_moves)
+BENCHMARK_CONFIGS = [
+    (2, 2, 0.1, 4, 80),
+    (3, 2, 0.1, 4, 80),
+    (2, 4, 0.1, 4, 80),
+    (4, 3, 0.1, 4, 80),
+    (5, 2, 0.1, 4, 60),
+]
+
+
+def benchmark_games(games_per_config=4, base_seed=1000):
+    """The benchmark set: one (name, generate_game kwargs) entry per game."""
+    games = []
+    for p1, p2, chance, initial, max_moves in BENCHMARK_CONFIGS:
+        for k in range(games_per_config):
+            seed = base_seed + k
+            games.append((f"d{p1}v{p2}_s{seed}", {
+                'player1_depth': p1,
+                'player2_depth': p2,
+                'random_move_chance': chance,
+                'initial_random_moves': initial,
+                'max_moves': max_moves,
+                'seed': seed,
+            }))
+    return games
+
+
+def game_fingerprint(game_data):
+    """Short hash of the sequence of moves, to detect changes in play."""
+    return hashlib.sha1(repr(game_data['moves']).encode()).hexdigest()[:12]
+
+
+def run_benchmark(games_per_config=4, base_seed=1000, quiescence_nodes=0, eval_cache_size=0, move_cache_mb=0):
+    """
+    Play the benchmark set once, with a move cache of move_cache_mb MB
+    (checkers_types.MoveCache) if set.
+
+    Returns:
+        Dict of game name -> {'seconds', 'moves', 'winner', 'fingerprint'}
+    """
+    generator = GameGenerator(output_dir=None)
+    results = {}
+    total = 0.0
+    cache = MoveCache(int(move_cache_mb * (1 << 20))) if move_cache_mb else None
+    previous_cache = set_move_cache(cache)
+
+    try:
+        for name, kwargs in benchmark_games(games_per_config, base_seed):
+            start = time.perf_counter()
+            game_data = generator.generate_game(verbose=False, quiescence_nodes=quiescence_nodes,
+                                                eval_cache_size=eval_cache_size, **kwargs)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+
+            results[name] = {
+                'seconds': elapsed,
+                'moves': game_data['total_moves'],
+                'winner': game_data['winner'],
+                'fingerprint': game_fingerprint(game_data),
+            }
+            print(f"{name:<14} {elapsed:8.3f}s  {game_data['total_moves']:3d} moves  "
+                  f"{game_data['winner_name']:<6} {results[name]['fingerprint']}")
+    finally:
+        set_move_cache(previous_cache)  # also on errors / Ctrl-C: the cache is process-wide
+    print(f"\nTotal: {total:.3f}s for {len(results)} games")
+    if cache is not None:
+        print(cache)
+    return results
+
+
+def benchmark_positions(games_per_config=1, base_seed=1000, every=4):
+    """(cells, side_to_move) after every `every`-th ply of the benchmark games."""
+    generator = GameGenerator(output_dir=None)
+    positions = []
+    for _, kwargs in benchmark_games(games_per_config, base_seed):
+        game = GameRecord(generator.generate_game(verbose=False, **kwargs))
+        for i, cells in enumerate(game.positions()):
+            if i % every == every - 1:
+                positions.append((cells, -1 if i % 2 == 0 else 1))  # strong bot moves first
+    return positions
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def search_benchmark(depth=5, games_per_config=1, base_seed=1000, every=4, move_cache_mb=0):
+    """
+    Search positions of the benchmark games to a fixed depth, with a move
+    cache of move_cache_mb MB if set.
+
+    Returns:
+        Dict with 'positions', 'nodes', 'seconds', 'nodes_per_second',
+        'gc_collections' and 'peak_rss_mb'
+    """
+    positions = benchmark_positions(games_per_config, base_seed, every)
+    stats = SearchStats()
+    collections = sum(generation['collections'] for generation in gc.get_stats())
+    cache = MoveCache(int(move_cache_mb * (1 << 20))) if move_cache_mb else None
+    previous_cache = set_move_cache(cache)
+
+    try:
+        start = time.perf_counter()
+        for cells, side_to_move in positions:
+            minimax_possiblemove(Board([row[:] for row in cells], side_to_move), alpha=-10000, beta=10000,
+                                 depth=depth, returnBoard=True, stats=stats)
+        elapsed = time.perf_counter() - start
+    finally:
+        set_move_cache(previous_cache)
+
+    results = {
+        'positions': len(positions),
+        'nodes': stats.nodes,
+        'seconds': elapsed,
+        'nodes_per_second': stats.nodes / elapsed,
+        'gc_collections': sum(generation['collections'] for generation in gc.get_stats()) - collections,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    rss = "n/a" if results['peak_rss_mb'] is None else f"{results['peak_rss_mb']:.1f} MB"
+    print(f"Depth {depth}: {len(positions)} positions, {stats.nodes} nodes in {elapsed:.3f}s "
+          f"({results['nodes_per_second']:.0f} nodes/s), {results['gc_collections']} GC collections, "
+          f"peak RSS {rss}")
+    if cache is not None:
+        print(cache)
+    return results
+
+
+def compare_results(old, new):
+    """Print per-config and total speedups of new over old, and any games that changed."""
+    changed = [name for name in new if name in old and old[name]['fingerprint'] != new[name]['fingerprint']]
+
+    by_config = {}
+    for name in new:
+        if name in old:
+            config = name.rsplit('_s', 1)[0]
+            before, after = by_config.get(config, (0.0, 0.0))
+            by_config[config] = (before + old[name]['seconds'], after + new[name]['seconds'])
+
+    print(f"\n{'config':<10} {'before':>9} {'after':>9} {'speedup':>8}")
+    for config, (before, after) in by_config.items():
+        print(f"{config:<10} {before:8.3f}s {after:8.3f}s {before / after:7.2f}x")
+
+    before = sum(b for b, _ in by_config.values())
+    after = sum(a for _, a in by_config.values())
+    if after:
+        print(f"{'total':<10} {before:8.3f}s {after:8.3f}s {before / after:7.2f}x")
+
+    if changed:
+        print(f"\n{len(changed)} games played differently (timings not like for like): {', '.join(changed)}")
+    else:
+        print("\nAll games identical")
+
+
+def replay(path):
+    """Regenerate a saved game and report whether it matches the original."""
+    generator = GameGenerator(output_dir=None)
+    original = generator.load_game(path)
+
+    start = time.perf_counter()
+    replayed = generator.replay_game(original)
+    elapsed = time.perf_counter() - start
+
+    same = games_match(original, replayed)
+    print(f"Game {original['game_id']} (seed {original['seed']}): replayed {replayed['total_moves']} moves "
+          f"in {elapsed:.3f}s - {'identical' if same else 'DIFFERENT'}")
+    return same
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic benchmark games and game replay")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Play the deterministic benchmark set")
+    run_parser.add_argument("--games", type=int, default=4, help="Games per benchmark config")
+    run_parser.add_argument("--seed", type=int, default=1000, help="Base seed of the benchmark set")
+    run_parser.add_argument("--qnodes", type=int, default=0, help="Quiescence node limit per leaf")
+    run_parser.add_argument("--eval-cache", type=int, default=0, help="Evaluation cache slots per game (0 = off)")
+    run_parser.add_argument("--output", default=None, help="Save timings to this JSON file")
+    run_parser.add_argument("--compare", default=None, help="Compare with timings saved by an earlier run")
+    run_parser.add_argument("--move-cache", type=float, default=0, help="Legal-move cache in MB (0 = off)")
+    add_profile_arguments(run_parser)
+
+    search_parser = subparsers.add_parser("search", help="Node rate and memory of fixed-depth searches")
+    search_parser.add_argument("--depth", type=int, default=5, help="Search depth")
+    search_parser.add_argument("--games", type=int, default=1, help="Games per benchmark config")
+    search_parser.add_argument("--seed", type=int, default=1000, help="Base seed of the benchmark set")
+    search_parser.add_argument("--every", type=int, default=4, help="Search every N-th position of each game")
+    search_parser.add_argument("--move-cache", type=float, default=0, help="Legal-move cache in MB (0 = off)")
+    add_profile_arguments(search_parser)
+
+    replay_parser = subparsers.add_parser("replay", help="Regenerate a saved game from its seed")
+    replay_parser.add_argument("game", help="Path to a game pickle")
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        if not replay(args.game):
+            raise SystemExit(1)
+        return
+
+    if args.command == "search":
+        if args.profile:
+            with Profiler(args.profile, args.profile_interval) as profiler:
+                search_benchmark(args.depth, args.games, args.seed, args.every, args.move_cache)
+            profiler.write(args.profile_output)
+        else:
+            search_benchmark(args.depth, args.games, args.seed, args.every, args.move_cache)
+        return
+
+    if args.profile:
+        with Profiler(args.profile, args.profile_interval) as profiler:
+            results = run_benchmark(args.games, args.seed, args.qnodes, args.eval_cache, args.move_cache)
+        profiler.write(args.profile_output)
+    else:
+        results = run_benchmark(args.games, args.seed, args.qnodes, args.eval_cache, args.move_cache)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved timings to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
 # from functools import cached_property,
+import math
+import sys
+import time
+from collections import OrderedDict
+
+from zobrist import hash_cells, hash_child
 
 # general rules:
 # -2 - opponent king
@@ -6,10 +12,15 @@
 #  1 - my piece
 #  2 - my king
 #  0 - empty
+#
+# Cells are stored from one fixed point of view. side_to_move says whose
+# point of view the board presents: with -1 the negative pieces are "mine"
+# for move generation, evaluation and squeeze(), without copying the cells.
 
 class Board():
-    
-    def __init__(self, board=None):
+    __slots__ = ('board', 'side_to_move')
+
+    def __init__(self, board=None, side_to_move=1):
         if board is None:
             board = [
                 [ 0, -1,  0, -1,  0, -1,  0, -1],
@@ -24,11 +35,22 @@ class Board():
         elif isinstance(board, Board):
             assert(False)
         self.board = board
+        self.side_to_move = side_to_move
     
 
     def squeeze(self):
-        """Return a 4×8 board containing only playable (dark) squares."""
+        """Return a 4×8 board containing only playable (dark) squares, seen by the side to move."""
         squeezed = []
+        if self.side_to_move == -1:
+            # Flipped view: view[r][c] == -board[7 - r][7 - c]
+            for r in range(8):
+                row = self.board[7 - r]
+                if r % 2 == 0:
+                    squeezed.append([-row[c] for c in (6, 4, 2, 0)])
+                else:
+                    squeezed.append([-row[c] for c in (7, 5, 3, 1)])
+            return squeezed
+
         for r in range(8):
             if r % 2 == 0:       # even rows → take columns 1,3,5,7
                 squeezed.append([self.board[r][c] for c in (1, 3, 5, 7)])
@@ -46,6 +68,17 @@ class Board():
 
         self.board = [row[::-1] for row in self.board[::-1]]
         return self  
+
+    def swap_side(self):
+        """Hand the move to the other side: O(1), only the point of view changes."""
+        self.side_to_move = -self.side_to_move
+        return self
+
+    def materialize(self):
+        """Return a new Board whose cells are the current view, e.g. for storage."""
+        if self.side_to_move == 1:
+            return Board([row[:] for row in self.board])
+        return Board([[-cell for cell in row[::-1]] for row in self.board[::-1]])
     
     def display_board(self):
         """
@@ -113,7 +146,8 @@ class Board():
                 else:
                     score -= piece_value + positional_bonus
         
-        return score
+        # The heuristic is symmetric, so the flipped view is just the negated score
+        return score if self.side_to_move == 1 else -score
     
 
     def get_possible_moves_for_piece(self, y, x):
@@ -224,11 +258,28 @@ class Board():
         
         forOpponent=False → current player (1, 2)
         forOpponent=True  → opponent (-1, -2)
+        (both relative to side_to_move: with -1 the current player owns -1, -2)
+
+        With a move cache installed (set_move_cache), positions seen before
+        are answered from it; the boards returned are new lists either way.
         
-        Returns: (capture_detected, list_of_boards)
+        Returns: (capture_detected, list_of_boards), boards in the stored orientation
         """
+        cache = _move_cache
+        if cache is None:
+            return self._generate_moves(forOpponent)
+
+        mover = -1 if (self.side_to_move == -1) != forOpponent else 1
+        cached = cache.lookup(self.board, mover)
+        if cached is not None:
+            return cached
+        capture_detected, boards = self._generate_moves(forOpponent)
+        cache.store(self.board, mover, capture_detected, boards)
+        return capture_detected, boards
+
+    def _generate_moves(self, forOpponent=False):
+        """returnPossibleMoves() without the move cache."""
 
-        result_boards = []
         board = self.board
 
         def clone_board(b):
@@ -237,6 +288,8 @@ class Board():
         rows = len(board)
         cols = len(board[0]) if rows else 0
 
+        if self.side_to_move == -1:
+            forOpponent = not forOpponent
         valid_pieces = (-1, -2) if forOpponent else (1, 2)
         capture_boards = []
         normal_boards = []
@@ -278,13 +331,589 @@ class Board():
             return (False, normal_boards)
 
 
+class SearchBoard(Board):
+    """
+    Board for the nodes of a search: the cells are always given and not
+    checked, and instances come from a BoardPool and are reused from node to
+    node instead of being allocated for every child.
+    """
+    __slots__ = ()
+
+    def __init__(self, board, side_to_move=1):
+        self.board = board
+        self.side_to_move = side_to_move
+
+
+class BoardPool:
+    """
+    SearchBoards for one search, preallocated per ply. Only one node per ply
+    is searched at a time, so the child of a node at ply p is always the same
+    object, refilled with the next child's cells; a node's children scored
+    together (batched leaves) get a list of boards per ply.
+    """
+    __slots__ = ('boards', 'batches')
+
+    def __init__(self, plies=16):
+        self.boards = [SearchBoard(None) for _ in range(plies)]
+        self.batches = [[] for _ in range(plies)]
+
+    def _grow(self, ply):
+        while len(self.boards) <= ply:
+            self.boards.append(SearchBoard(None))
+            self.batches.append([])
+
+    def board(self, ply, cells, side_to_move):
+        """The pooled board of `ply`, holding cells; valid until the next call for the same ply."""
+        if ply >= len(self.boards):
+            self._grow(ply)
+        board = self.boards[ply]
+        board.board = cells
+        board.side_to_move = side_to_move
+        return board
+
+    def batch(self, ply, cells_list, side_to_move):
+        """Pooled boards of `ply` holding each of cells_list, as a new list."""
+        if ply >= len(self.batches):
+            self._grow(ply)
+        boards = self.batches[ply]
+        while len(boards) < len(cells_list):
+            boards.append(SearchBoard(None))
+        for board, cells in zip(boards, cells_list):
+            board.board = cells
+            board.side_to_move = side_to_move
+        return boards[:len(cells_list)]
+
+
+class MoveCache:
+    """
+    LRU cache of legal moves: (capture_detected, child boards) of a position
+    and the player whose moves they are. The least recently used positions
+    are dropped once the estimated size passes max_bytes.
+
+    Positions and children are stored as tuples of row tuples, with every
+    distinct row stored once, so an entry is small and holds nothing the
+    garbage collector has to walk. The key is the position itself: Python
+    hashes it faster than hash_cells and equal keys are always the same
+    position. Callers get new lists and may change them.
+    """
+
+    # Estimated bytes of one stored child (its tuple of 8 shared rows) and of an entry apart from its children
+    CHILD_BYTES = sys.getsizeof((None,) * 8) + 8
+    ENTRY_BYTES = 2 * sys.getsizeof((None,) * 8) + 250
+
+    def __init__(self, max_bytes=64 << 20):
+        """
+        Args:
+            max_bytes: Memory cap of the cached move lists (estimated)
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (position, mover) -> (capture_detected, children)
+        self.rows = {}                # every distinct row tuple, shared by the entries
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _freeze(self, cells):
+        rows = self.rows
+        return tuple([rows.setdefault(row, row) for row in map(tuple, cells)])
+
+    def lookup(self, cells, mover):
+        """(capture_detected, new lists of the boards) of a cached position, else None."""
+        key = (tuple(map(tuple, cells)), mover)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], [list(map(list, child)) for child in entry[1]]
+
+    def store(self, cells, mover, capture_detected, boards):
+        """Cache the moves of a position."""
+        key = (self._freeze(cells), mover)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= self.ENTRY_BYTES + len(old[1]) * self.CHILD_BYTES
+        self.entries[key] = (capture_detected, tuple([self._freeze(board) for board in boards]))
+        self.bytes += self.ENTRY_BYTES + len(boards) * self.CHILD_BYTES
+        while self.bytes > self.max_bytes and self.entries:
+            _, (_, dropped) = self.entries.popitem(last=False)
+            self.bytes -= self.ENTRY_BYTES + len(dropped) * self.CHILD_BYTES
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.rows.clear()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __str__(self):
+        return (f"move cache {self.hits}/{self.hits + self.misses} hits ({self.hit_rate:.1%}), "
+                f"{len(self.entries)} positions, {self.bytes / (1 << 20):.1f}/{self.max_bytes / (1 << 20):.0f} MB, "
+                f"{self.evictions} evictions")
+
+
+# Cache used by every Board.returnPossibleMoves() call, see set_move_cache
+_move_cache = None
+
+
+def set_move_cache(cache):
+    """
+    Install a MoveCache for all move generation in this process (None: off).
+
+    Returns: The previously installed cache
+    """
+    global _move_cache
+    previous, _move_cache = _move_cache, cache
+    return previous
+
+
+def get_move_cache():
+    return _move_cache
+
+
+def is_progress(before, after):
+    """
+    True if the move from `before` to `after` (8x8 cell lists) can never be
+    undone: a capture or a move by an uncrowned piece (including promotion).
+    """
+    for r in range(8):
+        row_before, row_after = before[r], after[r]
+        if row_before == row_after:
+            continue
+        for c in range(8):
+            if row_before[c] != row_after[c] and (abs(row_before[c]) == 1 or abs(row_after[c]) == 1):
+                return True
+
+    # Only kings changed squares: progress only if one of them was captured
+    return sum(1 for row in before for x in row if x) != sum(1 for row in after for x in row if x)
+
+
+class PositionHistory:
+    """
+    Positions reached in a game, for draw detection.
+
+    A position is the cells (in the stored orientation) plus the player to
+    move, identified by its Zobrist hash (zobrist.py). The game is drawn when a position occurs repetition_limit times, or
+    after no_progress_limit consecutive plies without a capture or a move by
+    an uncrowned piece (0 disables that rule).
+    """
+
+    def __init__(self, repetition_limit=3, no_progress_limit=0):
+        self.repetition_limit = repetition_limit
+        self.no_progress_limit = no_progress_limit
+        self.counts = {}
+        self.no_progress = 0  # plies since the last capture or man move
+
+    @staticmethod
+    def key(cells, side_to_move):
+        return hash_cells(cells, side_to_move)
+
+    def record(self, cells, side_to_move, progress=True):
+        """
+        Add the position reached after a move.
+
+        Returns: None, or 'repetition' / 'no_progress' if the game is now drawn
+        """
+        if progress:
+            # Nothing before an irreversible move can occur again
+            self.counts.clear()
+            self.no_progress = 0
+        else:
+            self.no_progress += 1
+
+        key = self.key(cells, side_to_move)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+        if self.counts[key] >= self.repetition_limit:
+            return 'repetition'
+        if self.no_progress_limit and self.no_progress >= self.no_progress_limit:
+            return 'no_progress'
+        return None
+
+    def __contains__(self, key):
+        return key in self.counts
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed or its node limit is used up."""
+
+
+class SearchStats:
+    """Node counters for one search (pass the same instance down the whole tree)."""
+
+    def __init__(self):
+        self.nodes = 0              # minimax nodes visited
+        self.leaves = 0             # static evaluations
+        self.qnodes = 0             # positions expanded by the quiescence search
+        self.qnode_limit_hits = 0   # captures left unresolved because a leaf's node limit was reached
+        self.max_qdepth = 0         # deepest capture chain followed past the nominal depth
+        self.researches = 0         # PVS / aspiration re-searches after a failed narrow window
+        self.draws = 0              # moves scored as draws by repetition / no progress
+
+    def __str__(self):
+        return (f"nodes={self.nodes} leaves={self.leaves} qnodes={self.qnodes} "
+                f"qlimit_hits={self.qnode_limit_hits} max_qdepth={self.max_qdepth} "
+                f"researches={self.researches} draws={self.draws}")
+
+
+class SearchTracer:
+    """
+    Observer for the search core. Every hook is a no-op; subclass and
+    override the ones you need. A search without a tracer skips the calls.
+
+    side is 1 for the root's side to move (the maximizing player) and -1
+    for its opponent. Scores and windows are passed as the
+    core sees them: from the point of view of the side to move.
+    """
+
+    def enter(self, ply, side, depth, alpha, beta):
+        pass
+
+    def leaf(self, ply, side, score):
+        pass
+
+    def no_moves(self, ply, side):
+        pass
+
+    def children(self, ply, side, count):
+        pass
+
+    def child(self, ply, side, index, count):
+        pass
+
+    def child_score(self, ply, side, score, alpha):
+        pass
+
+    def cutoff(self, ply, side):
+        pass
+
+    def exit(self, ply, side, score):
+        pass
+
+
+class PrintTracer(SearchTracer):
+    """Prints the search tree in minimax terms (MAX / MIN, α / β); used by minimax_debug."""
+
+    def __init__(self, indent=0):
+        self.indent = indent
+
+    def _prefix(self, ply):
+        return "│   " * (self.indent + ply)
+
+    def enter(self, ply, side, depth, alpha, beta):
+        player = "MAX" if side > 0 else "MIN"
+        if side < 0:
+            alpha, beta = -beta, -alpha
+        print(f"{self._prefix(ply)}▶ {player} | depth={depth} | α={alpha} β={beta}")
+
+    def leaf(self, ply, side, score):
+        if side < 0:
+            score *= -1
+        print(f"{self._prefix(ply)}✔ Leaf score = {score}")
+
+    def no_moves(self, ply, side):
+        print(f"{self._prefix(ply)}✘ No moves - {'LOSS' if side > 0 else 'WIN'}")
+
+    def children(self, ply, side, count):
+        print(f"{self._prefix(ply)}Found {count} {'moves' if side > 0 else 'opponent moves'}")
+
+    def child(self, ply, side, index, count):
+        print(f"{self._prefix(ply)}─ {'Move' if side > 0 else 'Opponent move'} {index+1}/{count}")
+
+    def child_score(self, ply, side, score, alpha):
+        prefix = self._prefix(ply)
+        if side > 0:
+            print(f"{prefix}  Eval = {score}")
+            print(f"{prefix}  Updated α={alpha}")
+        else:
+            print(f"{prefix}  Updated β={-alpha}")
+
+    def cutoff(self, ply, side):
+        print(f"{self._prefix(ply)}✂ PRUNE (β ≤ α)")
+
+    def exit(self, ply, side, score):
+        if side > 0:
+            print(f"{self._prefix(ply)}◀ MAX returns {score}")
+        else:
+            print(f"{self._prefix(ply)}◀ MIN returns {-score}")
+
+
+SEARCH_ALGORITHMS = ('alphabeta', 'pvs')
+
+# PVS relies on the first child being good; below this depth ordering costs more than it saves
+PVS_ORDERING_DEPTH = 2
+
+# With batch_leaves, a depth-1 node first evaluates this many children, then the rest in one batch
+LEAF_BATCH_FIRST = 3
+
+
+class SearchContext:
+    """Settings and per-search state shared by every node of one search."""
+
+    def __init__(self, algorithm='alphabeta', deadline=None, evaluator=None,
+                 quiescence_nodes=0, stats=None, tracer=None, history=None, batch_leaves=False,
+                 node_limit=None):
+        if algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError(f"Unknown search algorithm '{algorithm}'")
+        self.algorithm = algorithm
+        self.deadline = deadline
+        self.evaluator = evaluator
+        self.quiescence_nodes = quiescence_nodes
+        self.stats = stats
+        self.tracer = tracer
+        self.history = history    # PositionHistory of the game so far, enables draw detection
+        self.node_limit = node_limit  # SearchTimeout once stats.nodes passes this (needs stats)
+        # Score the children of depth-1 nodes with one evaluate_batch() call (not with a tracer or quiescence)
+        self.batch_leaves = batch_leaves and tracer is None and not quiescence_nodes
+        self.qbudget = 0          # quiescence nodes left for the current leaf
+        self.best_board = None    # best root move found so far
+        self.path = set()         # position keys from the root to the current node
+        self.key = None           # position key of the current node (with a history)
+        self.no_progress = history.no_progress if history is not None else 0
+        self.pool = BoardPool()   # the boards of every node below the root
+
+    def enter_root(self, board):
+        if self.history is not None:
+            self.key = PositionHistory.key(board.board, board.side_to_move)
+            self.path = {self.key}
+
+
+def negamax(ctx: SearchContext, board: Board, alpha, beta, depth: int, side: int = 1, ply: int = 0):
+    """
+    The search core. Returns the score from the point of view of `side`,
+    the player to move (1: the root board's side_to_move, -1: its opponent).
+    Boards are never flipped: every node keeps the root's point of view and
+    `side` just selects whose moves are generated.
+
+    Alpha-beta or PVS (ctx.algorithm) down to depth 0; below that, with
+    ctx.quiescence_nodes set, only positions with a compulsory capture are
+    expanded (negative depths) until they are quiet or the leaf's quiescence
+    budget runs out. At ply 0 the best child board is left in ctx.best_board.
+
+    With ctx.history set, a move into a position that already occurred in
+    the game or on the current search path, or one that reaches the
+    no-progress limit, is scored as a draw (0) without being searched.
+    Position keys are updated incrementally from the node's key (ctx.key)
+    with zobrist.hash_child, which only looks at the squares the move changed.
+
+    The evaluator scores a board from the root's side; leaves multiply that
+    by `side` so every node, leaf or not, is scored for the player to move.
+    """
+    if ctx.deadline is not None and time.perf_counter() > ctx.deadline:
+        raise SearchTimeout()
+
+    stats = ctx.stats
+    tracer = ctx.tracer
+
+    if stats is not None:
+        if depth >= 0:
+            stats.nodes += 1
+            if ctx.node_limit is not None and stats.nodes > ctx.node_limit:
+                raise SearchTimeout()
+        else:
+            stats.qnodes += 1
+    if depth < 0:
+        ctx.qbudget -= 1
+    if tracer is not None:
+        tracer.enter(ply, side, depth, alpha, beta)
+
+    if depth <= 0:
+        if depth == 0:
+            ctx.qbudget = ctx.quiescence_nodes
+        if ctx.quiescence_nodes:
+            capture_detected, childboards = board.returnPossibleMoves(forOpponent=side < 0)
+        else:
+            capture_detected = False
+
+        if not capture_detected or ctx.qbudget <= 0:
+            if stats is not None:
+                stats.leaves += 1
+                if capture_detected:
+                    stats.qnode_limit_hits += 1
+            score = side * (board.estimateAdvantage() if ctx.evaluator is None else ctx.evaluator.evaluate(board))
+            if tracer is not None:
+                tracer.leaf(ply, side, score)
+            return score
+
+        if stats is not None:
+            stats.max_qdepth = max(stats.max_qdepth, 1 - depth)
+    else:
+        capture_detected, childboards = board.returnPossibleMoves(forOpponent=side < 0)
+
+        if not childboards:
+            if tracer is not None:
+                tracer.no_moves(ply, side)
+            return -10000
+
+    pvs = ctx.algorithm == 'pvs' and depth > 0
+    if pvs and ply > 0 and depth >= PVS_ORDERING_DEPTH:
+        scratch = ctx.pool.board(ply + 1, None, board.side_to_move)
+
+        def ordering_key(cells):
+            scratch.board = cells
+            return -side * scratch.estimateAdvantage()
+
+        childboards.sort(key=ordering_key)
+
+    if depth == 1 and ctx.batch_leaves:
+        return _negamax_leaves(ctx, board, childboards, capture_detected, alpha, beta, side, ply)
+
+    if tracer is not None:
+        tracer.children(ply, side, len(childboards))
+
+    history = ctx.history
+    node_key = ctx.key
+
+    best = -10000
+    for i, childb in enumerate(childboards):
+        if tracer is not None:
+            tracer.child(ply, side, i, len(childboards))
+
+        if history is not None:
+            child_key = hash_child(node_key, board.board, childb)
+            child_no_progress = 0 if capture_detected or is_progress(board.board, childb) else ctx.no_progress + 1
+            if (child_key in history or child_key in ctx.path
+                    or (history.no_progress_limit and child_no_progress >= history.no_progress_limit)):
+                if stats is not None:
+                    stats.draws += 1
+                score = 0
+            else:
+                ctx.path.add(child_key)
+                parent_no_progress, ctx.no_progress = ctx.no_progress, child_no_progress
+                ctx.key = child_key
+                score = _search_child(ctx, board, childb, alpha, beta, depth, side, ply, pvs and i > 0)
+                ctx.key = node_key
+                ctx.no_progress = parent_no_progress
+                ctx.path.discard(child_key)
+        else:
+            score = _search_child(ctx, board, childb, alpha, beta, depth, side, ply, pvs and i > 0)
+
+        if score > best:
+            best = score
+            if ply == 0:
+                ctx.best_board = childb
+
+        alpha = max(alpha, score)
+        if tracer is not None:
+            tracer.child_score(ply, side, score, alpha)
+        if alpha >= beta:
+            if tracer is not None:
+                tracer.cutoff(ply, side)
+            break
+
+    if tracer is not None:
+        tracer.exit(ply, side, best)
+    return best
+
+
+def _negamax_leaves(ctx, board, childboards, capture_detected, alpha, beta, side, ply):
+    """
+    negamax() for a depth-1 node when ctx.batch_leaves is set.
+
+    Every child is a leaf, so all of them are scored with a single
+    evaluate_batch() call and alpha-beta is then resolved over the list.
+    Children past a cutoff are evaluated needlessly, but the returned value,
+    best board and draw handling are the same as searching them one by one.
+    """
+    stats = ctx.stats
+    history = ctx.history
+    children = ctx.pool.batch(ply + 1, childboards, board.side_to_move)
+
+    drawn = [False] * len(children)
+    if history is not None:
+        for i, childb in enumerate(childboards):
+            child_key = hash_child(ctx.key, board.board, childb)
+            child_no_progress = 0 if capture_detected or is_progress(board.board, childb) else ctx.no_progress + 1
+            drawn[i] = (child_key in history or child_key in ctx.path
+                        or (history.no_progress_limit and child_no_progress >= history.no_progress_limit))
+
+    leaves = [child for child, draw in zip(children, drawn) if not draw]
+    leaf_scores = []
+    evaluated = 0
+
+    best = -10000
+    for i, childb in enumerate(childboards):
+        if drawn[i]:
+            if stats is not None:
+                stats.draws += 1
+            score = 0
+        else:
+            if evaluated == len(leaf_scores):
+                # The first batch is small since a cutoff often comes right away
+                batch = leaves[evaluated:evaluated + LEAF_BATCH_FIRST] if evaluated == 0 else leaves[evaluated:]
+                if ctx.evaluator is None:
+                    leaf_scores.extend(leaf.estimateAdvantage() for leaf in batch)
+                else:
+                    leaf_scores.extend(ctx.evaluator.evaluate_batch(batch))
+                if stats is not None:
+                    stats.nodes += len(batch)
+                    stats.leaves += len(batch)
+            # The child leaf scores side_to_move's view times -side, negated here
+            score = side * float(leaf_scores[evaluated])
+            evaluated += 1
+
+        if score > best:
+            best = score
+            if ply == 0:
+                ctx.best_board = childb
+
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+
+    return best
+
+
+def _search_child(ctx, board, childb, alpha, beta, depth, side, ply, null_window):
+    """Score one child for negamax(), from the parent's point of view."""
+    child = ctx.pool.board(ply + 1, childb, board.side_to_move)
+
+    if null_window:
+        # PVS: only ask whether this move beats alpha
+        score = -negamax(ctx, child, -math.nextafter(alpha, math.inf), -alpha, depth - 1, -side, ply + 1)
+        if alpha < score < beta:
+            if ctx.stats is not None:
+                ctx.stats.researches += 1
+            score = -negamax(ctx, child, -beta, -score, depth - 1, -side, ply + 1)
+        return score
+
+    return -negamax(ctx, child, -beta, -alpha, depth - 1, -side, ply + 1)
+
+
+def _search(ctx: SearchContext, board: Board, alpha, beta, isMaximizing: bool, depth: int, returnBoard: bool):
+    """Run the core for a minimax-style call: scores from the maximizing side's view."""
+    assert(not (isMaximizing == False and returnBoard == True))
+    ctx.enter_root(board)
+
+    if isMaximizing:
+        score = negamax(ctx, board, alpha, beta, depth, 1)
+        return ctx.best_board if returnBoard else score
+    return -negamax(ctx, board, -beta, -alpha, depth, -1)
+
+
 def minimax_possiblemove(
     board: Board,
     alpha: int,
     beta: int,
     isMaximizing: bool = True,
     depth: int = 5,
-    returnBoard: bool = False
+    returnBoard: bool = False,
+    deadline: float = None,
+    evaluator=None,
+    quiescence_nodes: int = 0,
+    stats: SearchStats = None,
+    history: PositionHistory = None,
+    batch_leaves: bool = False
 ):
     """
     Minimax with alpha-beta pruning.
@@ -294,168 +923,191 @@ def minimax_possiblemove(
     represents a COMPLETE turn (including all forced multi-captures).
     
     Therefore, we ALWAYS switch players after applying a move from returnPossibleMoves.
-    """
-    assert(not (isMaximizing == False and returnBoard == True))
-    
-    if depth == 0:
-        score = board.estimateAdvantage()
-        if not isMaximizing:
-            score *= -1
-        return score
-    
-    if isMaximizing:
-        maxeval = -10000
-        best_board = None
 
-        _, childboards = board.returnPossibleMoves()
-        
-        # If no moves available, this is a loss
-        if not childboards:
-            return -10000
-        
-        for childb in childboards:
-            child_obj = Board(childb)
-            
-            # ALWAYS switch to opponent after a complete move
-            # (multi-captures are already complete in the board state)
-            eval = minimax_possiblemove(
-                child_obj, alpha, beta, 
-                isMaximizing=False,  # Always switch to minimizing
-                depth=depth-1
-            )
-            
-            if eval > maxeval:
-                maxeval = eval
-                best_board = childb
-
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-
-        return best_board if returnBoard else maxeval
-    
-    else:  # Minimizing (opponent's turn)
-        mineval = 10000
-        
-        _, childboards = board.returnPossibleMoves(forOpponent=True)
-        
-        # If no moves available, this is a win for us
-        if not childboards:
-            return 10000
-        
-        for childb in childboards:
-            child_obj = Board(childb)
-            
-            # ALWAYS switch to maximizing player after opponent's complete move
-            eval = minimax_possiblemove(
-                child_obj, alpha, beta, 
-                isMaximizing=True,  # Always switch to maximizing
-                depth=depth-1
-            )
-            
-            mineval = min(mineval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-                
-        return mineval
+    deadline: optional time.perf_counter() value; SearchTimeout is raised once it passes.
+    evaluator: optional leaf evaluator (see evaluators.py); None uses estimateAdvantage().
+    quiescence_nodes: if > 0, depth-0 positions with a pending capture are extended
+        through their captures, spending at most this many quiescence nodes per leaf.
+    stats: optional SearchStats collecting node counts.
+    history: optional PositionHistory of the game; repetitions and the no-progress
+        limit are then scored as draws.
+    batch_leaves: score all children of a depth-1 node with one evaluator.evaluate_batch()
+        call, which pays off for array-based evaluators (ignored with quiescence).
+    """
+    ctx = SearchContext('alphabeta', deadline, evaluator, quiescence_nodes, stats, history=history,
+                        batch_leaves=batch_leaves)
+    return _search(ctx, board, alpha, beta, isMaximizing, depth, returnBoard)
 
 
-def minimax_debug(
+def pvs_search(
     board: Board,
     alpha: int,
     beta: int,
     isMaximizing: bool = True,
     depth: int = 5,
-    indent: int = 0,
-    returnBoard: bool = False
+    returnBoard: bool = False,
+    deadline: float = None,
+    evaluator=None,
+    quiescence_nodes: int = 0,
+    stats: SearchStats = None,
+    history: PositionHistory = None,
+    batch_leaves: bool = False
 ):
-    """Debug version of minimax that prints the search tree."""
-    prefix = "│   " * indent
-    player = "MAX" if isMaximizing else "MIN"
-
-    print(f"{prefix}▶ {player} | depth={depth} | α={alpha} β={beta}")
-    
-    if depth == 0:
-        score = board.estimateAdvantage()
-        if not isMaximizing:
-            score *= -1
-        print(f"{prefix}✔ Leaf score = {score}")
-        return score
-
-    if isMaximizing:
-        maxeval = -10000
-        best_board = None
-
-        _, childboards = board.returnPossibleMoves()
-
-        if not childboards:
-            print(f"{prefix}✘ No moves - LOSS")
-            return -10000
-
-        print(f"{prefix}Found {len(childboards)} moves")
+    """
+    Principal variation search (negascout); same arguments and results as
+    minimax_possiblemove.
+
+    The first child is searched with the full window. Every later child is
+    only tested against a null window (is it better than the best so far?)
+    and re-searched with the full window when the test says yes. Children
+    of interior nodes are ordered by the static heuristic so the first one is
+    usually best and most tests fail quickly: fewer nodes for the same value.
+    The root's own move order is left alone, which keeps the chosen board
+    identical to minimax_possiblemove.
+    """
+    ctx = SearchContext('pvs', deadline, evaluator, quiescence_nodes, stats, history=history,
+                        batch_leaves=batch_leaves)
+    return _search(ctx, board, alpha, beta, isMaximizing, depth, returnBoard)
 
-        for i, childb in enumerate(childboards):
-            print(f"{prefix}─ Move {i+1}/{len(childboards)}")
-            child_obj = Board(childb)
 
-            eval = minimax_debug(
-                child_obj,
-                alpha,
-                beta,
-                isMaximizing=False,
-                depth=depth - 1,
-                indent=indent + 1
-            )
+def search_root(
+    board: Board,
+    depth: int,
+    alpha: float = -10000,
+    beta: float = 10000,
+    algorithm: str = 'alphabeta',
+    deadline: float = None,
+    evaluator=None,
+    quiescence_nodes: int = 0,
+    stats: SearchStats = None,
+    tracer: SearchTracer = None,
+    history: PositionHistory = None,
+    batch_leaves: bool = False,
+    node_limit: int = None
+):
+    """
+    Search the root position (maximizing side to move) with one of
+    SEARCH_ALGORITHMS and return both results the callers need.
 
-            print(f"{prefix}  Eval = {eval}")
+    node_limit: raise SearchTimeout once stats.nodes exceeds this value
+        (a total, so one SearchStats can carry a budget across searches).
 
-            if eval > maxeval:
-                maxeval = eval
-                best_board = childb
+    Returns: (score, best_board); best_board is None when every move loses
+    (or there are none), exactly as minimax_possiblemove(returnBoard=True).
+    """
+    assert depth >= 1
+    ctx = SearchContext(algorithm, deadline, evaluator, quiescence_nodes, stats, tracer, history, batch_leaves,
+                        node_limit)
+    ctx.enter_root(board)
+    score = negamax(ctx, board, alpha, beta, depth, 1)
+    return score, ctx.best_board
 
-            alpha = max(alpha, eval)
-            print(f"{prefix}  Updated α={alpha}")
 
-            if beta <= alpha:
-                print(f"{prefix}✂ PRUNE (β ≤ α)")
-                break
+def aspiration_search(
+    board: Board,
+    depth: int,
+    guess: float,
+    window: float = 0.5,
+    algorithm: str = 'alphabeta',
+    deadline: float = None,
+    evaluator=None,
+    quiescence_nodes: int = 0,
+    stats: SearchStats = None,
+    history: PositionHistory = None,
+    batch_leaves: bool = False,
+    node_limit: int = None
+):
+    """
+    Root search with an aspiration window (guess - window, guess + window).
 
-        print(f"{prefix}◀ MAX returns {maxeval}")
-        return best_board if returnBoard else maxeval
+    A score strictly inside the window is exact. A score on or outside an
+    edge is only a bound, so the root is searched again with the full window;
+    either way the result equals search_root with the full window.
 
-    else:
-        mineval = 10000
+    Returns: (score, best_board)
+    """
+    options = dict(algorithm=algorithm, deadline=deadline, evaluator=evaluator,
+                   quiescence_nodes=quiescence_nodes, stats=stats, history=history,
+                   batch_leaves=batch_leaves, node_limit=node_limit)
 
-        _, childboards = board.returnPossibleMoves(forOpponent=True)
+    alpha, beta = guess - window, guess + window
+    score, best_board = search_root(board, depth, alpha, beta, **options)
+    if alpha < score < beta:
+        return score, best_board
 
-        if not childboards:
-            print(f"{prefix}✘ No moves - WIN")
-            return 10000
+    if stats is not None:
+        stats.researches += 1
+    return search_root(board, depth, -10000, 10000, **options)
 
-        print(f"{prefix}Found {len(childboards)} opponent moves")
 
-        for i, childb in enumerate(childboards):
-            print(f"{prefix}─ Opponent move {i+1}/{len(childboards)}")
-            child_obj = Board(childb)
+def iterative_deepening(
+    board: Board,
+    max_depth: int = 5,
+    time_budget: float = None,
+    evaluator=None,
+    quiescence_nodes: int = 0,
+    stats: SearchStats = None,
+    algorithm: str = 'alphabeta',
+    aspiration_window: float = None,
+    history: PositionHistory = None,
+    batch_leaves: bool = False,
+    node_limit: int = None
+):
+    """
+    Search depth 1, 2, ... max_depth and keep the best board of the deepest
+    completed iteration.
 
-            eval = minimax_debug(
-                child_obj,
-                alpha,
-                beta,
-                isMaximizing=True,
-                depth=depth - 1,
-                indent=indent + 1
-            )
+    Without a time budget or aspiration window this is a single search at
+    max_depth. With a time budget (in seconds), deeper iterations are
+    abandoned once it runs out; depth 1 always completes so a move is
+    returned whenever one exists. node_limit works the same way with a
+    budget of minimax nodes over all iterations.
 
-            mineval = min(mineval, eval)
-            beta = min(beta, eval)
+    aspiration_window: if set, each iteration is searched with an aspiration
+        window around the score of the previous iteration.
 
-            print(f"{prefix}  Updated β={beta}")
+    Returns: (best_board, depth_reached)
+    """
+    if node_limit is not None and stats is None:
+        stats = SearchStats()
+    options = dict(algorithm=algorithm, evaluator=evaluator, quiescence_nodes=quiescence_nodes, stats=stats,
+                   history=history, batch_leaves=batch_leaves)
+
+    if time_budget is None and aspiration_window is None and node_limit is None:
+        _, best_board = search_root(board, max_depth, **options)
+        return best_board, max_depth
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    max_nodes = None if node_limit is None else stats.nodes + node_limit
+    best_board, depth_reached = None, 0
+    scores = {}
+
+    for depth in range(1, max_depth + 1):
+        limits = dict(deadline=deadline, node_limit=max_nodes) if depth > 1 else {}
+        try:
+            if aspiration_window is not None and depth - 1 in scores:
+                score, result = aspiration_search(board, depth, scores[depth - 1], aspiration_window,
+                                                  **limits, **options)
+            else:
+                score, result = search_root(board, depth, **limits, **options)
+        except SearchTimeout:
+            break
+        scores[depth] = score
+        best_board, depth_reached = result, depth
+
+    return best_board, depth_reached
 
-            if beta <= alpha:
-                print(f"{prefix}✂ PRUNE (β ≤ α)")
-                break
 
-        print(f"{prefix}◀ MIN returns {mineval}")
-        return mineval
\ No newline at end of file
+def minimax_debug(
+    board: Board,
+    alpha: int,
+    beta: int,
+    isMaximizing: bool = True,
+    depth: int = 5,
+    indent: int = 0,
+    returnBoard: bool = False,
+    evaluator=None
+):
+    """Debug version of minimax that prints the search tree."""
+    ctx = SearchContext('alphabeta', evaluator=evaluator, tracer=PrintTracer(indent))
+    return _search(ctx, board, alpha, beta, isMaximizing, depth, returnBoard)
@@ -0,0 +1,241 @@
+"""
+Compact array storage for training positions.
+
+Positions are stored as the 32 playable squares of `Board.squeeze()`,
+flattened row by row into an int8 vector, always in the strong bot's
+orientation (the same orientation as the boards in the game files).
+A dataset directory holds one .npy file per array plus a metadata.json.
+Derived columns (add_column) are more .npy files next to the base arrays,
+with their transform and parameters recorded in metadata.json.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from checkers_types import Board
+from gamerecord import GameRecord, read_games
+
+
+def encode_board(board):
+    """Encode a Board (or an 8x8 list) as a flat int8 vector of 32 squares."""
+    if not isinstance(board, Board):
+        board = Board(board)
+    return np.array(board.squeeze(), dtype=np.int8).reshape(32)
+
+
+# Row and column of each of the 32 playable squares, in squeeze() order
+_SQUARE_ROWS = np.repeat(np.arange(8), 4)
+_SQUARE_COLS = np.array([c for r in range(8) for c in ((1, 3, 5, 7) if r % 2 == 0 else (0, 2, 4, 6))])
+
+
+def encode_boards(boards):
+    """
+    Encode a sequence of Boards (or 8x8 lists) into an (N, 32) int8 array.
+
+    Same result as encode_board() on each board, but converted to an array
+    in one go; boards viewed by the weak bot (side_to_move -1) are colour
+    swapped like Board.squeeze() does.
+    """
+    if len(boards) == 0:
+        return np.zeros((0, 32), dtype=np.int8)
+
+    cells = np.array([board.board if isinstance(board, Board) else board for board in boards], dtype=np.int8)
+    encoded = cells[:, _SQUARE_ROWS, _SQUARE_COLS]
+
+    swapped = np.array([isinstance(board, Board) and board.side_to_move == -1 for board in boards])
+    if swapped.any():
+        encoded[swapped] = colour_swap(encoded[swapped])
+    return encoded
+
+
+def decode_board(encoded):
+    """Rebuild a full 8x8 Board from a 32-square vector (inverse of encode_board)."""
+    squeezed = np.asarray(encoded).reshape(8, 4)
+    board = [[0] * 8 for _ in range(8)]
+    for r in range(8):
+        cols = (1, 3, 5, 7) if r % 2 == 0 else (0, 2, 4, 6)
+        for i, c in enumerate(cols):
+            board[r][c] = int(squeezed[r][i])
+    return Board(board)
+
+
+def iter_game_files(games_dir):
+    """Yield the paths of all game pickle files in a directory, sorted by name."""
+    for filename in sorted(os.listdir(games_dir)):
+        if filename.endswith('.pkl'):
+            yield os.path.join(games_dir, filename)
+
+
+def collect_positions(games_dir):
+    """
+    Collect every position reached in the game corpus.
+
+    Each move of a game contributes the board after the move.
+
+    Returns:
+        Dictionary of arrays:
+            'positions'     (N, 32) int8, strong bot's orientation
+            'side_to_move'  (N,) int8, 1 = strong bot to move, -1 = weak bot
+            'static_labels' (N,) float32, the 'board_value' recorded by the generator
+    """
+    positions = []
+    side_to_move = []
+    static_labels = []
+
+    for filepath in iter_game_files(games_dir):
+        for game_data in read_games(filepath):
+            game = GameRecord(game_data)
+            for i, cells in enumerate(game.positions()):
+                positions.append(encode_board(cells))
+                side_to_move.append(-1 if i % 2 == 0 else 1)  # strong bot moves first
+                static_labels.append(game['board_values'][i])
+
+    return {
+        'positions': np.array(positions, dtype=np.int8).reshape(-1, 32),
+        'side_to_move': np.array(side_to_move, dtype=np.int8),
+        'static_labels': np.array(static_labels, dtype=np.float32),
+    }
+
+
+def colour_swap(positions):
+    """
+    Swap the colours of (N, 32) positions, like Board.flipSides().
+
+    flipSides rotates the board by 180 degrees and negates the pieces; on the
+    32-square layout the rotation maps square s to square 31 - s.
+    """
+    return -np.asarray(positions)[:, ::-1]
+
+
+def dedupe(arrays):
+    """
+    Drop repeated (position, side_to_move) pairs, keeping the first occurrence.
+
+    All arrays in the dictionary are filtered with the same rows.
+    """
+    keys = np.concatenate([arrays['positions'], arrays['side_to_move'].reshape(-1, 1)], axis=1)
+    keys = np.ascontiguousarray(keys, dtype=np.int8).view(np.dtype((np.void, keys.shape[1]))).reshape(-1)
+    _, first = np.unique(keys, return_index=True)
+    keep = np.sort(first)
+    return {name: array[keep] for name, array in arrays.items()}
+
+
+def augment(arrays, label_names=('static_labels',)):
+    """
+    Add the colour-swapped copy of every position and remove duplicates.
+
+    The swapped position is the same game state seen from the other side, so
+    side_to_move and the labels named in label_names are negated; other
+    arrays are copied unchanged. Positions whose swapped copy is already in
+    the corpus (including positions symmetric to themselves) are kept once.
+
+    Checkers has no left-right mirror symmetry on an 8x8 board: mirroring
+    moves pieces onto the light squares, so colour swap is the only one.
+    """
+    swapped = {}
+    for name, array in arrays.items():
+        if name == 'positions':
+            swapped[name] = colour_swap(array)
+        elif name == 'side_to_move' or name in label_names:
+            swapped[name] = -array
+        else:
+            swapped[name] = array
+    return dedupe({name: np.concatenate([arrays[name], swapped[name]]) for name in arrays})
+
+
+def save_arrays(output_dir, arrays, metadata=None):
+    """Save a dictionary of arrays as <name>.npy files plus metadata.json."""
+    os.makedirs(output_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), array)
+
+    if metadata is not None:
+        save_metadata(output_dir, metadata)
+
+
+def load_arrays(output_dir, names, mmap_mode=None):
+    """Load the named arrays from a dataset directory."""
+    return {
+        name: np.load(os.path.join(output_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in names
+    }
+
+
+def load_metadata(output_dir):
+    """Load metadata.json from a dataset directory (empty dict if missing)."""
+    path = os.path.join(output_dir, "metadata.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_metadata(output_dir, metadata):
+    """Write metadata.json atomically."""
+    path = os.path.join(output_dir, "metadata.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# Elementwise transforms for derived columns: name -> function(values, **params)
+COLUMN_TRANSFORMS = {
+    'tanh': lambda values, divisor: np.tanh(values / divisor),
+    'scale': lambda values, divisor: values / divisor,
+    'clip': lambda values, low, high: np.clip(values, low, high),
+}
+
+# Rows per chunk when computing a derived column
+COLUMN_CHUNK_ROWS = 1 << 20
+
+
+def add_column(output_dir, name, source, transform, dtype=np.float32, chunk_rows=COLUMN_CHUNK_ROWS, **params):
+    """
+    Add (or recompute) a column derived elementwise from another column of a dataset.
+
+    The source is read memory-mapped and transformed chunk by chunk straight
+    into <name>.npy (written under a temporary name, then renamed), so only
+    one chunk is in memory and the base arrays are never rewritten. The
+    transform and its parameters are recorded under metadata['columns'].
+
+    Args:
+        output_dir: Dataset directory
+        name: New column
+        source: Existing column to derive it from
+        transform: Name in COLUMN_TRANSFORMS
+        dtype: dtype of the new column
+        chunk_rows: Rows transformed at a time
+        **params: Parameters of the transform (e.g. divisor=30.0 for 'tanh')
+
+    Returns:
+        The new column, memory-mapped
+    """
+    if transform not in COLUMN_TRANSFORMS:
+        raise ValueError(f"Unknown transform '{transform}', expected one of {sorted(COLUMN_TRANSFORMS)}")
+    if name == source:
+        raise ValueError(f"Column {name} cannot be derived from itself")
+    function = COLUMN_TRANSFORMS[transform]
+
+    values = load_arrays(output_dir, (source,), mmap_mode='r')[source]
+    path = os.path.join(output_dir, f"{name}.npy")
+    tmp_path = path + ".tmp"
+    column = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=values.shape)
+    for start in range(0, len(values), chunk_rows):
+        column[start:start + chunk_rows] = function(np.asarray(values[start:start + chunk_rows], dtype=np.float64),
+                                                    **params)
+    column.flush()
+    del column
+    os.replace(tmp_path, path)
+
+    metadata = load_metadata(output_dir)
+    metadata.setdefault('columns', {})[name] = {
+        'source': source,
+        'transform': transform,
+        'params': params,
+        'dtype': np.dtype(dtype).name,
+    }
+    save_metadata(output_dir, metadata)
+    return np.load(path, mmap_mode='r')
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Game generation and position labelling across several machines.
+
+A coordinator hands out work units over TCP; workers on any host run them
+and send the results back. The coordinator writes the results with the same
+files and checkpoints as jobscheduler.py (game units) and labeler.py (label
+chunks), so a run can be stopped and resumed with either tool.
+
+Protocol, one JSON object per line:
+
+    worker      -> {"type": "hello", "worker": name}
+    coordinator -> {"type": "welcome", "heartbeat_interval": seconds}
+    worker      -> {"type": "request"}
+    coordinator -> {"type": "task", "unit": id, "lease": n, "kind": kind, "payload": {...}}
+                 | {"type": "wait", "seconds": s}     every open unit is leased, ask again later
+                 | {"type": "done"}
+    worker      -> {"type": "heartbeat", "lease": n}  every heartbeat_interval while working, no reply
+    worker      -> {"type": "result", "unit": id, "lease": n, "result": ...}
+    coordinator -> {"type": "ack", "accepted": true / false}
+
+A lease that gets no heartbeat for lease_timeout seconds, or whose worker
+disconnects, expires and the unit goes back to the queue. Units are
+deterministic (seeded games, fixed search depth), so any result of a unit is
+as good as another: the first one is kept, later ones are dropped as
+duplicates.
+
+Everything runs on one box for testing:
+    python distributed.py coordinator generate --spec generation_jobs.json --port 5555
+    python distributed.py worker --port 5555 &
+    python distributed.py worker --port 5555 &
+
+    python distributed.py coordinator label --games-dir training_games --output-dir labelled --depth 6
+"""
+
+import argparse
+import bisect
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+from jobscheduler import JobScheduler, load_spec, play_unit, write_games
+from labeler import PositionLabeler, _label_chunk
+
+
+def game_to_json(game_data):
+    """Game data as JSON-compatible values (moves become lists)."""
+    return dict(game_data, moves=[list(move) for move in game_data['moves']])
+
+
+def game_from_json(data):
+    """Inverse of game_to_json."""
+    return dict(data, moves=[tuple(move) for move in data['moves']])
+
+
+class GenerationSource:
+    """Work units of a job spec; results are written like JobScheduler does."""
+
+    kind = 'generate'
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.pending = scheduler.pending_units()
+        self.in_flight_games = {}
+        self.remaining = sum(len(units) for units in self.pending.values())
+
+    def _parse(self, unit_id):
+        name, unit = unit_id.rsplit('/', 1)
+        return name, int(unit)
+
+    def next(self):
+        """(unit id, payload) of the unit to hand out next, or None."""
+        picked = self.scheduler.next_unit(self.pending, self.in_flight_games)
+        if picked is None:
+            return None
+        name, unit = picked
+        games = self.scheduler.unit_games(name, unit)
+        self.in_flight_games[name] = self.in_flight_games.get(name, 0) + games
+        payload = {
+            'job': self.scheduler.jobs[name],
+            'first_game': unit * self.scheduler.unit_size,
+            'num_games': games,
+            'lockstep_games': self.scheduler.spec['lockstep_games'],
+        }
+        return f"{name}/{unit}", payload
+
+    def is_pending(self, unit_id):
+        """True if the unit is in the queue (not handed out, not finished)."""
+        name, unit = self._parse(unit_id)
+        return unit in self.pending.get(name, [])
+
+    def release(self, unit_id):
+        """Put a handed-out unit back in the queue."""
+        name, unit = self._parse(unit_id)
+        self.in_flight_games[name] -= self.scheduler.unit_games(name, unit)
+        bisect.insort(self.pending[name], unit)
+
+    def complete(self, unit_id, result):
+        """Store the result of a unit that is handed out or back in the queue."""
+        name, unit = self._parse(unit_id)
+        if unit in self.pending[name]:
+            self.pending[name].remove(unit)
+        else:
+            self.in_flight_games[name] -= self.scheduler.unit_games(name, unit)
+
+        games = [game_from_json(data) for data in result]
+        write_games(self.scheduler.unit_path(name, unit), games)
+        self.scheduler.complete_unit(name, unit, len(games))
+        self.remaining -= 1
+
+    def finish(self):
+        self.scheduler.print_status()
+
+
+class LabellingSource:
+    """Label chunks of a PositionLabeler; results are written as its chunk checkpoints."""
+
+    kind = 'label'
+
+    def __init__(self, labeler, games_dir):
+        self.labeler = labeler
+        self.arrays = labeler.prepare(games_dir)
+        self.pending = [i for i in range(labeler.num_chunks(self.arrays))
+                        if not os.path.exists(labeler.chunk_path(i))]
+        self.remaining = len(self.pending)
+
+    def next(self):
+        if not self.pending:
+            return None
+        chunk_idx = self.pending.pop(0)
+        lo, hi = chunk_idx * self.labeler.chunk_size, (chunk_idx + 1) * self.labeler.chunk_size
+        payload = {
+            'positions': np.asarray(self.arrays['positions'][lo:hi]).tolist(),
+            'side_to_move': np.asarray(self.arrays['side_to_move'][lo:hi]).tolist(),
+            'depth': self.labeler.depth,
+        }
+        return str(chunk_idx), payload
+
+    def is_pending(self, unit_id):
+        return int(unit_id) in self.pending
+
+    def release(self, unit_id):
+        bisect.insort(self.pending, int(unit_id))
+
+    def complete(self, unit_id, result):
+        chunk_idx = int(unit_id)
+        if chunk_idx in self.pending:
+            self.pending.remove(chunk_idx)
+        self.labeler.save_chunk(chunk_idx, np.array(result, dtype=np.float32))
+        self.remaining -= 1
+
+    def finish(self):
+        self.labeler.finish(self.arrays)
+
+
+def _run_generate(payload):
+    games = play_unit(payload['job'], payload['first_game'], payload['num_games'], payload['lockstep_games'])
+    return [game_to_json(game_data) for game_data in games]
+
+
+def _run_label(payload):
+    _, labels = _label_chunk((0, np.array(payload['positions'], dtype=np.int8),
+                              np.array(payload['side_to_move'], dtype=np.int8), payload['depth']))
+    return labels.tolist()
+
+
+# Work unit kind -> function of the payload, run by the workers
+HANDLERS = {
+    'generate': _run_generate,
+    'label': _run_label,
+}
+
+
+def _send(wfile, message):
+    wfile.write((json.dumps(message) + "\n").encode())
+    wfile.flush()
+
+
+def _receive(rfile):
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    return json.loads(line)
+
+
+class Coordinator:
+    """Serve the units of a work source to workers over TCP."""
+
+    def __init__(self, source, host="0.0.0.0", port=5555, lease_timeout=60.0, heartbeat_interval=5.0,
+                 linger=5.0):
+        """
+        Args:
+            source: GenerationSource or LabellingSource
+            host, port: Address to listen on (port 0 picks a free port, see self.address)
+            lease_timeout: Seconds without a heartbeat after which a unit is handed out again
+            heartbeat_interval: Seconds between worker heartbeats
+            linger: Seconds to keep serving after the last unit so connected workers hear 'done'
+        """
+        self.source = source
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.linger = linger
+
+        self.lock = threading.Lock()
+        self.leases = {}          # unit id -> (lease number, worker, deadline)
+        self.next_lease = 0
+        self.connections = 0
+        self.completed = 0
+        self.expired = 0
+        self.duplicates = 0
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._handle(self.rfile, self.wfile, self.client_address)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        for unit_id, (lease, worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                self._release(unit_id, f"lease {lease} of {worker} timed out")
+
+    def _release(self, unit_id, reason):
+        del self.leases[unit_id]
+        self.source.release(unit_id)
+        self.expired += 1
+        print(f"Unit {unit_id} back in the queue: {reason}")
+
+    def _assign(self, worker):
+        self._expire_leases()
+        if self.source.remaining == 0:
+            return {'type': 'done'}
+        picked = self.source.next()
+        if picked is None:
+            return {'type': 'wait', 'seconds': min(1.0, self.heartbeat_interval)}
+
+        unit_id, payload = picked
+        self.next_lease += 1
+        self.leases[unit_id] = (self.next_lease, worker, time.monotonic() + self.lease_timeout)
+        return {'type': 'task', 'unit': unit_id, 'lease': self.next_lease, 'kind': self.source.kind,
+                'payload': payload}
+
+    def _heartbeat(self, lease):
+        for unit_id, (held, worker, _) in self.leases.items():
+            if held == lease:
+                self.leases[unit_id] = (held, worker, time.monotonic() + self.lease_timeout)
+                return
+
+    def _result(self, unit_id, result, worker):
+        if unit_id in self.leases:
+            del self.leases[unit_id]  # possibly another worker's lease; its result will be a duplicate
+        elif not self.source.is_pending(unit_id):
+            self.duplicates += 1
+            print(f"Duplicate result for unit {unit_id} from {worker} dropped")
+            return False
+
+        self.source.complete(unit_id, result)
+        self.completed += 1
+        print(f"Unit {unit_id} done by {worker} ({self.source.remaining} to go)")
+        return True
+
+    def _handle(self, rfile, wfile, client_address):
+        worker = f"{client_address[0]}:{client_address[1]}"
+        held = {}  # unit id -> lease number, units this connection is working on
+        with self.lock:
+            self.connections += 1
+        try:
+            hello = _receive(rfile)
+            worker = hello.get('worker') or worker
+            _send(wfile, {'type': 'welcome', 'heartbeat_interval': self.heartbeat_interval})
+
+            while True:
+                message = _receive(rfile)
+                with self.lock:
+                    if message['type'] == 'request':
+                        reply = self._assign(worker)
+                        if reply['type'] == 'task':
+                            held[reply['unit']] = reply['lease']
+                    elif message['type'] == 'heartbeat':
+                        self._heartbeat(message['lease'])
+                        continue
+                    elif message['type'] == 'result':
+                        held.pop(message['unit'], None)
+                        reply = {'type': 'ack', 'accepted': self._result(message['unit'], message['result'], worker)}
+                    else:
+                        raise ValueError(f"Unknown message type {message['type']!r}")
+                _send(wfile, reply)
+                if reply['type'] == 'done':
+                    return
+        except (ConnectionError, OSError, ValueError) as e:
+            print(f"Worker {worker} disconnected: {e}")
+        finally:
+            with self.lock:
+                self.connections -= 1
+                for unit_id, lease in held.items():
+                    if unit_id in self.leases and self.leases[unit_id][0] == lease:
+                        self._release(unit_id, f"{worker} disconnected")
+
+    def serve(self):
+        """Serve until every unit is done, then write the final outputs."""
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        print(f"Coordinator on {self.address[0]}:{self.address[1]}, {self.source.remaining} units to go")
+
+        try:
+            while True:
+                time.sleep(min(0.5, self.lease_timeout / 4))
+                with self.lock:
+                    self._expire_leases()
+                    if self.source.remaining == 0:
+                        break
+
+            deadline = time.monotonic() + self.linger
+            while self.connections and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+
+        print(f"All units done: {self.completed} results, {self.expired} leases expired, "
+              f"{self.duplicates} duplicates dropped")
+        self.source.finish()
+
+
+class Worker:
+    """Connect to a coordinator and run work units until it reports that everything is done."""
+
+    def __init__(self, host="localhost", port=5555, name=None, connect_timeout=30.0):
+        self.host = host
+        self.port = port
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        self.connect_timeout = connect_timeout
+        self.units = 0
+
+    def _connect(self):
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection((self.host, self.port))
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def _heartbeats(self, send, lease, interval, stop):
+        while not stop.wait(interval):
+            send({'type': 'heartbeat', 'lease': lease})
+
+    def run(self):
+        """Returns the number of units this worker ran."""
+        with self._connect() as sock, sock.makefile('rb') as rfile, sock.makefile('wb') as wfile:
+            write_lock = threading.Lock()
+
+            def send(message):
+                with write_lock:
+                    _send(wfile, message)
+
+            send({'type': 'hello', 'worker': self.name})
+            interval = _receive(rfile)['heartbeat_interval']
+
+            while True:
+                send({'type': 'request'})
+                reply = _receive(rfile)
+                if reply['type'] == 'done':
+                    return self.units
+                if reply['type'] == 'wait':
+                    time.sleep(reply['seconds'])
+                    continue
+
+                stop = threading.Event()
+                heartbeat = threading.Thread(target=self._heartbeats, args=(send, reply['lease'], interval, stop),
+                                             daemon=True)
+                heartbeat.start()
+                try:
+                    result = HANDLERS[reply['kind']](reply['payload'])
+                finally:
+                    stop.set()
+                    heartbeat.join()
+
+                send({'type': 'result', 'unit': reply['unit'], 'lease': reply['lease'], 'result': result})
+                _receive(rfile)  # ack
+                self.units += 1
+                print(f"{self.name}: unit {reply['unit']} done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed game generation and labelling")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="Hand out work units")
+    coordinator_parser.add_argument("work", choices=("generate", "label"))
+    coordinator_parser.add_argument("--host", default="0.0.0.0")
+    coordinator_parser.add_argument("--port", type=int, default=5555)
+    coordinator_parser.add_argument("--lease-timeout", type=float, default=60.0,
+                                    help="Seconds without a heartbeat before a unit is reassigned")
+    coordinator_parser.add_argument("--heartbeat", type=float, default=5.0, help="Worker heartbeat interval")
+    coordinator_parser.add_argument("--spec", default="generation_jobs.json", help="Job spec (generate)")
+    coordinator_parser.add_argument("--games-dir", default="training_games", help="Game corpus (label)")
+    coordinator_parser.add_argument("--output-dir", default=None,
+                                    help="Output directory (default: the spec's for generate, 'labelled' for label)")
+    coordinator_parser.add_argument("--depth", type=int, default=6, help="Minimax depth (label)")
+    coordinator_parser.add_argument("--chunk-size", type=int, default=256, help="Positions per unit (label)")
+    coordinator_parser.add_argument("--augment", action="store_true", help="Also write the augmented corpus (label)")
+
+    worker_parser = subparsers.add_parser("worker", help="Run work units for a coordinator")
+    worker_parser.add_argument("--host", default="localhost")
+    worker_parser.add_argument("--port", type=int, default=5555)
+    worker_parser.add_argument("--name", default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        Worker(args.host, args.port, args.name).run()
+        return
+
+    if args.work == "generate":
+        spec = load_spec(args.spec)
+        if args.output_dir:
+            spec['output_dir'] = args.output_dir
+        source = GenerationSource(JobScheduler(spec))
+    else:
+        labeler = PositionLabeler(args.output_dir or "labelled", args.depth, args.chunk_size, augment=args.augment)
+        source = LabellingSource(labeler, args.games_dir)
+
+    Coordinator(source, args.host, args.port, args.lease_timeout, args.heartbeat).serve()
+
+
+if __name__ == "__main__":
+    main()
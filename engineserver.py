@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+A long-running engine process that answers move requests over a local socket.
+
+Clients that search in-process pay the start-up cost every time and begin
+with empty caches. The server keeps a pool of worker processes, each with the
+engine's evaluator (and its evaluation cache) loaded once and kept warm, plus
+a cache of finished results, and serves any number of clients concurrently.
+
+Line protocol (one request per line, one reply per line):
+
+    move <position> <side> [depth=N] [time=S] [nodes=N]
+        -> bestmove <position> depth=<depth reached> nodes=<nodes> cached=<0|1>
+        -> nomove                        (no legal move, or every move loses)
+    ping  -> pong
+    stats -> stats requests=N cached=N searches=N
+    quit  -> bye                         (and the connection is closed)
+    anything wrong -> error <message>
+
+A position is 32 characters, one per playable square in Board.squeeze()
+order (square = row * 4 + col // 2) in the stored orientation: '.' empty,
+'x' / 'X' man / king of the strong bot (1 / 2), 'o' / 'O' of the weak bot
+(-1 / -2). <side> is the player to move, 1 or -1. Limits not given in a
+request come from the server's engine spec; results of searches without a
+time limit are deterministic and cached.
+
+Example:
+    python engineserver.py --engine server:depth=6,cache=65536 --port 5600 --workers 4
+    python engineserver.py --engine server:depth=6 --socket /tmp/checkers.sock
+
+    with EngineClient("127.0.0.1:5600") as engine:
+        best_board, info = engine.best_move(board, depth=4)
+"""
+
+import argparse
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from checkers_types import Board, MoveCache, SearchStats, set_move_cache
+from gamerecord import square_coords
+from tournament import EngineConfig
+
+PIECE_CHARS = {0: '.', 1: 'x', 2: 'X', -1: 'o', -2: 'O'}
+CHAR_PIECES = {char: piece for piece, char in PIECE_CHARS.items()}
+
+
+def position_to_text(cells):
+    """32-character text of 8x8 cells (stored orientation)."""
+    return ''.join(PIECE_CHARS[cells[r][c]] for r, c in map(square_coords, range(32)))
+
+
+def text_to_position(text):
+    """8x8 cells of a 32-character position text."""
+    if len(text) != 32 or any(char not in CHAR_PIECES for char in text):
+        raise ValueError(f"Bad position {text!r}: expected 32 characters of '.xXoO'")
+    cells = [[0] * 8 for _ in range(8)]
+    for square, char in enumerate(text):
+        r, c = square_coords(square)
+        cells[r][c] = CHAR_PIECES[char]
+    return cells
+
+
+def parse_address(address):
+    """'host:port' -> (host, port) for TCP; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+# Engine of a worker process, set by _init_worker
+_engine = None
+
+
+def _init_worker(engine, move_cache_bytes=0):
+    global _engine
+    _engine = engine
+    _engine.loaded_evaluator()  # load once, before the first request
+    if move_cache_bytes:
+        set_move_cache(MoveCache(move_cache_bytes))
+
+
+def _search(text, side, depth, time_budget, node_limit):
+    """Worker entry point: one search with the process's warm engine."""
+    board = Board(text_to_position(text), side)
+    stats = SearchStats()
+    best_board, depth_reached = _engine.search(board, depth=depth, time_budget=time_budget,
+                                               node_limit=node_limit, stats=stats)
+    return (None if best_board is None else position_to_text(best_board)), depth_reached, stats.nodes
+
+
+def _parse_move_request(words):
+    if len(words) < 3:
+        raise ValueError("usage: move <position> <side> [depth=N] [time=S] [nodes=N]")
+    text, side = words[1], int(words[2])
+    if side not in (1, -1):
+        raise ValueError(f"Bad side {side}: expected 1 or -1")
+    text_to_position(text)
+
+    limits = {'depth': None, 'time': None, 'nodes': None}
+    for option in words[3:]:
+        key, _, value = option.partition('=')
+        if key not in limits:
+            raise ValueError(f"Unknown limit '{key}'")
+        limits[key] = float(value) if key == 'time' else int(value)
+    return text, side, limits['depth'], limits['time'], limits['nodes']
+
+
+class EngineServer:
+    """Serve move requests for one engine config from a pool of warm worker processes."""
+
+    def __init__(self, engine, address=("127.0.0.1", 5600), workers=None, result_cache=4096, move_cache_mb=0):
+        """
+        Args:
+            engine: EngineConfig (or an engine spec string, see EngineConfig.parse)
+            address: (host, port) to listen on TCP (port 0 picks a free port), or a Unix socket path
+            workers: Worker processes searching in parallel (default: all CPUs)
+            result_cache: Finished results kept for repeated requests (0 = off)
+            move_cache_mb: Memory cap of each worker's legal-move cache (checkers_types.MoveCache, 0 = off)
+        """
+        self.engine = EngineConfig.parse(engine) if isinstance(engine, str) else engine
+        self.workers = workers or os.cpu_count()
+        self.result_cache = result_cache
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+        self.requests = self.cached = self.searches = 0
+
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(self.engine, int(move_cache_mb * (1 << 20))))
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    reply = server.handle_line(line)
+                    self.wfile.write((reply + "\n").encode())
+                    self.wfile.flush()
+                    if reply == "bye":
+                        return
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = socketserver.ThreadingUnixStreamServer(address, Handler)
+        else:
+            socketserver.ThreadingTCPServer.allow_reuse_address = True
+            self.server = socketserver.ThreadingTCPServer(address, Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+
+    def handle_line(self, line):
+        """Reply to one request line (str, or bytes as read from the socket)."""
+        try:
+            if isinstance(line, bytes):
+                line = line.decode()
+            words = line.split()
+            if not words:
+                return "error empty request"
+            if words[0] == "move":
+                return self.move(*_parse_move_request(words))
+            if words[0] == "ping":
+                return "pong"
+            if words[0] == "stats":
+                return f"stats requests={self.requests} cached={self.cached} searches={self.searches}"
+            if words[0] == "quit":
+                return "bye"
+            return f"error unknown command '{words[0]}'"
+        except ValueError as e:
+            return f"error {e}"
+        except Exception as e:
+            # A failed search (or a bug) answers this request only; the connection and server stay up
+            return f"error {type(e).__name__}: {e}"
+
+    def move(self, text, side, depth, time_budget, node_limit):
+        # Searches with a time limit depend on the machine's load, so only the others are cached
+        key = (text, side, depth, node_limit) if time_budget is None and self.result_cache else None
+        with self.lock:
+            self.requests += 1
+            result = self.results.get(key) if key is not None else None
+            if result is not None:
+                self.results.move_to_end(key)
+                self.cached += 1
+
+        cached = result is not None
+        if not cached:
+            result = self.pool.submit(_search, text, side, depth, time_budget, node_limit).result()
+            with self.lock:
+                self.searches += 1
+                if key is not None:
+                    self.results[key] = result
+                    if len(self.results) > self.result_cache:
+                        self.results.popitem(last=False)
+
+        best, depth_reached, nodes = result
+        if best is None:
+            return "nomove"
+        return f"bestmove {best} depth={depth_reached} nodes={nodes} cached={int(cached)}"
+
+    def serve_forever(self):
+        print(f"Engine server for {self.engine} on {self.address} with {self.workers} workers")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        """Stop serve_forever() (from another thread)."""
+        self.server.shutdown()
+
+    def close(self):
+        self.server.server_close()
+        self.pool.shutdown()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class EngineClient:
+    """
+    Client of an EngineServer. The connection is opened on first use and
+    reused for every request; it is reopened once if the server dropped it.
+    One client can be shared by threads (requests are serialized); use one
+    client per thread for concurrent searches.
+    """
+
+    def __init__(self, address="127.0.0.1:5600", timeout=None):
+        """
+        Args:
+            address: 'host:port', a Unix socket path, or a (host, port) tuple
+            timeout: Optional socket timeout in seconds
+        """
+        self.address = parse_address(address) if isinstance(address, str) else tuple(address)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sock = None
+        self.rfile = None
+
+    def _connect(self):
+        if isinstance(self.address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+            self.sock.connect(self.address)
+        else:
+            self.sock = socket.create_connection(self.address, self.timeout)
+        self.rfile = self.sock.makefile('rb')
+
+    def request(self, line):
+        """Send one request line and return the reply line."""
+        with self.lock:
+            for attempt in (0, 1):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    self.sock.sendall((line + "\n").encode())
+                    reply = self.rfile.readline()
+                    if not reply:
+                        raise ConnectionError("connection closed by the engine server")
+                    return reply.decode().strip()
+                except ConnectionError:
+                    self._disconnect()
+                    if attempt:
+                        raise
+
+    def best_move(self, board, depth=None, time_budget=None, node_limit=None):
+        """
+        Best move for board.side_to_move.
+
+        Returns:
+            (best_board, info): best_board as 8x8 cells in the stored orientation
+            (None without a move, as minimax_possiblemove); info has 'depth',
+            'nodes' and 'cached'
+        """
+        line = f"move {position_to_text(board.board)} {board.side_to_move}"
+        if depth is not None:
+            line += f" depth={depth}"
+        if time_budget is not None:
+            line += f" time={time_budget}"
+        if node_limit is not None:
+            line += f" nodes={node_limit}"
+
+        words = self.request(line).split()
+        if words[0] == "nomove":
+            return None, {}
+        if words[0] != "bestmove":
+            raise RuntimeError(f"Engine server: {' '.join(words)}")
+        info = {key: int(value) for key, _, value in (word.partition('=') for word in words[2:])}
+        info['cached'] = bool(info['cached'])
+        return text_to_position(words[1]), info
+
+    def ping(self):
+        return self.request("ping") == "pong"
+
+    def stats(self):
+        words = self.request("stats").split()
+        return {key: int(value) for key, _, value in (word.partition('=') for word in words[1:])}
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.rfile.close()
+            self.sock.close()
+        self.sock = self.rfile = None
+
+    def close(self):
+        with self.lock:
+            if self.sock is not None:
+                try:
+                    self.sock.sendall(b"quit\n")
+                    self.rfile.readline()
+                except OSError:
+                    pass
+            self._disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve move requests from a warm engine")
+    parser.add_argument("--engine", default="server:depth=6,cache=65536",
+                        help="Engine spec, as for tournament.py --engine")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--result-cache", type=int, default=4096, help="Cached results (0 = off)")
+    parser.add_argument("--move-cache", type=float, default=64, help="Legal-move cache per worker in MB (0 = off)")
+
+    args = parser.parse_args()
+
+    address = args.socket or (args.host, args.port)
+    EngineServer(args.engine, address, args.workers, args.result_cache, args.move_cache).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
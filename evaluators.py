@@ -0,0 +1,253 @@
+"""
+Position evaluators for the minimax search.
+
+An evaluator scores a Board from the point of view of the side whose pieces
+are positive (1, 2), exactly like Board.estimateAdvantage(). It needs two
+methods:
+
+    evaluate(board)        -> float
+    evaluate_batch(boards) -> sequence of floats, one per board
+
+and may override evaluate_positions(positions, side_to_move) for array
+callers such as the lockstep self-play driver.
+
+Pass one to minimax_possiblemove(..., evaluator=...); None keeps the built-in
+heuristic.
+"""
+
+import numpy as np
+
+from checkers_types import Board
+from dataset import colour_swap, decode_board, encode_boards
+from zobrist import hash_board
+
+
+# One-hot channel order used by the 'onehot' feature encoding
+PIECE_CHANNELS = (1, 2, -1, -2)
+
+
+class Evaluator:
+    """Base class; subclasses implement evaluate() and usually a faster evaluate_batch()."""
+
+    def evaluate(self, board):
+        raise NotImplementedError
+
+    def evaluate_batch(self, boards):
+        return [self.evaluate(board) for board in boards]
+
+    def evaluate_positions(self, positions, side_to_move):
+        """
+        Scores of (N, 32) positions in the stored orientation (encode_boards of
+        the raw cells), each viewed with the given side_to_move.
+        """
+        boards = []
+        for position, side in zip(positions, side_to_move):
+            board = decode_board(position)
+            board.side_to_move = int(side)
+            boards.append(board)
+        return np.asarray(self.evaluate_batch(boards), dtype=np.float64)
+
+
+class StaticEvaluator(Evaluator):
+    """The hand-written heuristic, Board.estimateAdvantage()."""
+
+    def __init__(self):
+        self.table = static_table()
+
+    def evaluate(self, board):
+        return board.estimateAdvantage()
+
+    def evaluate_batch(self, boards):
+        """Vectorized estimateAdvantage(), bit-for-bit equal to scoring the boards one by one."""
+        if len(boards) == 0:
+            return np.zeros(0)
+        encoded = encode_boards([board.board for board in boards])  # stored orientation
+        return self.evaluate_positions(encoded, [board.side_to_move for board in boards])
+
+    def evaluate_positions(self, positions, side_to_move):
+        positions = np.asarray(positions).reshape(-1, 32)
+        if len(positions) == 0:
+            return np.zeros(0)
+        terms = self.table[np.arange(32), positions % 5]
+        # estimateAdvantage adds the squares' terms one by one in this order; accumulate does the same
+        scores = np.add.accumulate(terms, axis=1)[:, -1]
+        return scores * np.asarray(side_to_move, dtype=np.float64)
+
+
+class CachedEvaluator(Evaluator):
+    """
+    Memoizes another evaluator in a fixed-size table indexed by Zobrist hash.
+
+    Each slot holds one (key, score) pair; a new position that maps to an
+    occupied slot replaces it. Keep one instance for a whole game (or longer)
+    to reuse scores across moves.
+    """
+
+    def __init__(self, evaluator=None, size=1 << 16):
+        """
+        Args:
+            evaluator: Evaluator to cache; None for the static heuristic
+            size: Number of slots, rounded up to a power of two
+        """
+        self.evaluator = evaluator if evaluator is not None else StaticEvaluator()
+        self.size = 1 << max(0, int(size) - 1).bit_length()
+        self.mask = self.size - 1
+        self.keys = [None] * self.size
+        self.scores = [0.0] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, board):
+        key = hash_board(board)
+        slot = key & self.mask
+        if self.keys[slot] == key:
+            self.hits += 1
+            return self.scores[slot]
+
+        self.misses += 1
+        score = self.evaluator.evaluate(board)
+        self.keys[slot] = key
+        self.scores[slot] = score
+        return score
+
+    def evaluate_batch(self, boards):
+        scores = [0.0] * len(boards)
+        missing = []
+        for i, board in enumerate(boards):
+            key = hash_board(board)
+            slot = key & self.mask
+            if self.keys[slot] == key:
+                scores[i] = self.scores[slot]
+            else:
+                missing.append((i, key, slot))
+
+        self.hits += len(boards) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            computed = self.evaluator.evaluate_batch([boards[i] for i, _, _ in missing])
+            for (i, key, slot), score in zip(missing, computed):
+                scores[i] = score
+                self.keys[slot] = key
+                self.scores[slot] = score
+        return scores
+
+    def __str__(self):
+        return f"cache {self.hits}/{self.hits + self.misses} hits ({self.hit_rate:.1%}), {self.size} slots"
+
+
+def encode_features(encoded, kind="squares"):
+    """
+    Turn (N, 32) int8 positions into model inputs.
+
+    kind='squares': the 32 square values as float32, shape (N, 32)
+    kind='onehot':  one channel per piece type in PIECE_CHANNELS, shape (N, 128)
+    """
+    encoded = np.asarray(encoded, dtype=np.int8).reshape(-1, 32)
+    if kind == "squares":
+        return encoded.astype(np.float32)
+    if kind == "onehot":
+        return np.concatenate([(encoded == p) for p in PIECE_CHANNELS], axis=1).astype(np.float32)
+    raise ValueError(f"Unknown feature encoding '{kind}'")
+
+
+class NumpyEvaluator(Evaluator):
+    """
+    Linear model or small MLP evaluated with NumPy.
+
+    Weights are read from an .npz file holding W0, b0, W1, b1, ... (ReLU
+    between layers, linear output with a single unit), plus optional keys:
+        features - 'squares' (default) or 'onehot', see encode_features()
+        scale    - multiplier applied to the network output
+    """
+
+    def __init__(self, weights_path):
+        self.weights_path = weights_path
+        with np.load(weights_path) as data:
+            self.layers = []
+            i = 0
+            while f"W{i}" in data:
+                self.layers.append((data[f"W{i}"].astype(np.float32), data[f"b{i}"].astype(np.float32)))
+                i += 1
+            self.features = str(data["features"]) if "features" in data else "squares"
+            self.scale = float(data["scale"]) if "scale" in data else 1.0
+
+        if not self.layers:
+            raise ValueError(f"{weights_path} contains no layers (expected W0, b0, ...)")
+
+    def forward(self, features):
+        x = features
+        for i, (W, b) in enumerate(self.layers):
+            x = x @ W + b
+            if i < len(self.layers) - 1:
+                np.maximum(x, 0, out=x)
+        return x.reshape(-1) * self.scale
+
+    def evaluate(self, board):
+        return float(self.evaluate_batch([board])[0])
+
+    def evaluate_batch(self, boards):
+        return self.forward(encode_features(encode_boards(boards), self.features))
+
+    def evaluate_positions(self, positions, side_to_move):
+        # The network sees positions from the side to move, like Board.squeeze()
+        positions = np.asarray(positions, dtype=np.int8).reshape(-1, 32)
+        swapped = np.asarray(side_to_move) == -1
+        view = np.where(swapped[:, None], colour_swap(positions), positions)
+        return self.forward(encode_features(view, self.features))
+
+
+def static_table():
+    """
+    (32, 5) float64 table of estimateAdvantage() terms: entry [square, piece % 5]
+    is the score of that single piece on that square (stored orientation).
+    """
+    table = np.zeros((32, 5), dtype=np.float64)
+    squares = [(r, c) for r in range(8) for c in ((1, 3, 5, 7) if r % 2 == 0 else (0, 2, 4, 6))]
+    for i, (y, x) in enumerate(squares):
+        for piece in PIECE_CHANNELS:
+            cells = [[0] * 8 for _ in range(8)]
+            cells[y][x] = piece
+            table[i, piece % 5] = Board(cells).estimateAdvantage()
+    return table
+
+
+def static_weights():
+    """
+    Board.estimateAdvantage() expressed as linear 'onehot' weights.
+
+    The heuristic is a sum of independent per-square, per-piece terms, so it
+    is exactly a linear model; useful as a reference model and for testing.
+    """
+    squares = [(r, c) for r in range(8) for c in ((1, 3, 5, 7) if r % 2 == 0 else (0, 2, 4, 6))]
+    W = np.zeros((len(PIECE_CHANNELS) * 32, 1), dtype=np.float32)
+
+    for channel, piece in enumerate(PIECE_CHANNELS):
+        for i, (y, x) in enumerate(squares):
+            value = 3.0 if abs(piece) == 1 else 5.0
+            if piece == 1:
+                value += (7 - y) * 0.1
+            elif piece == -1:
+                value += y * 0.1
+            value += (7 - (abs(3.5 - x) + abs(3.5 - y))) * 0.05
+            if (piece == 1 and y == 7) or (piece == -1 and y == 0):
+                value += 0.3
+            W[channel * 32 + i, 0] = value if piece > 0 else -value
+
+    return {"W0": W, "b0": np.zeros(1, dtype=np.float32), "features": np.array("onehot")}
+
+
+def load_evaluator(spec):
+    """Build an evaluator from a name: None/'static' or a path to an .npz weights file."""
+    if spec is None or spec == "static":
+        return StaticEvaluator()
+    return NumpyEvaluator(spec)
@@ -1,7 +1,9 @@
 import pygame
+import os
 import sys
 import random
-from checkers_types import Board, minimax_possiblemove
+from checkers_types import Board, MoveCache, minimax_possiblemove, set_move_cache
+from engineserver import EngineClient
 
 # ----------------------------------
 # Your Board class goes here EXACTLY
@@ -14,6 +16,13 @@ TILE = 80
 BOARD_SIZE = TILE * 8
 FPS = 60
 
+# Set CHECKERS_ENGINE_SERVER=host:port (or a socket path) to ask a running engineserver.py for AI moves
+ENGINE_SERVER = os.environ.get("CHECKERS_ENGINE_SERVER")
+engine = EngineClient(ENGINE_SERVER) if ENGINE_SERVER else None
+
+# Clicks re-ask the moves of the same position, and the AI's searches revisit positions
+set_move_cache(MoveCache(max_bytes=32 << 20))
+
 pygame.init()
 screen = pygame.display.set_mode((BOARD_SIZE, BOARD_SIZE))
 pygame.display.set_caption("Checkers – Using Given Board Type")
@@ -55,14 +64,8 @@ def apply_move(move, y, x):
 
 def check_any_captures_available():
     """Check if any of the player's pieces can capture."""
-    for y in range(8):
-        for x in range(8):
-            if board_obj.board[y][x] in (1, 2):  # Player's pieces
-                moves = board_obj.get_possible_moves_for_piece(y, x)
-                for move in moves:
-                    if move['type'] == 'capture':
-                        return True
-    return False
+    capture_detected, _ = board_obj.returnPossibleMoves()  # cached per position
+    return capture_detected
 
 
 # =============== Drawing ===============
@@ -103,19 +106,22 @@ def coords_from_mouse(pos):
 
 
 def ai_opponent_minimax():
-    board_obj.flipSides()
+    # let the AI see its pieces (-1, -2) as its own without copying the board
+    board_obj.side_to_move = -1
 
-    best_board = minimax_possiblemove(board_obj, -10000, 10000, depth=6, returnBoard=True)
+    if engine is not None:
+        best_board, _ = engine.best_move(board_obj, depth=6)
+    else:
+        best_board = minimax_possiblemove(board_obj, -10000, 10000, depth=6, returnBoard=True)
+
+    board_obj.side_to_move = 1
 
     if best_board is None:
         print("AI has no moves!")
-        board_obj.flipSides()
         return False
     
     print(f"best_board type: {type(best_board)}")
     board_obj.board = best_board
-
-    board_obj.flipSides()
     return True
 
 
@@ -123,16 +129,15 @@ def ai_opponent_minimax():
 def ai_random_move():
     """Opponent (-1, -2) makes a random legal move."""
 
-    # temporarily flip sides so AI sees pieces as (1,2)
-    board_obj.flipSides()
+    # temporarily take the AI's point of view so it sees pieces as (1,2)
+    board_obj.side_to_move = -1
     _, moves = board_obj.returnPossibleMoves()
     # moves is list of boards, but we need individual piece moves
+    board_obj.side_to_move = 1
 
     if moves:
         board_obj.board = random.choice(moves)
 
-    board_obj.flipSides()
-
 
 
 # =============== Main Loop ===============
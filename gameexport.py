@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Render games to images without a display.
+
+Uses the viewer's drawing code (GameVisualizer with headless=True) on an
+offscreen surface; every worker process keeps one visualizer, so the board
+and piece sprites are drawn once per process and then only blitted.
+
+Formats:
+    sheet     one PNG per game: a contact sheet of the board after every
+              --every-th ply (and the final position)
+    gif       one animated GIF per game: board and info panel, one frame per ply
+    overview  one PNG for all selected games: the position at --ply (default:
+              the final position) of each game
+
+Games are picked from a corpus with --sample N (random, reproducible with
+--seed), --first N, or --game-id (repeatable).
+
+Example:
+    python gameexport.py --games-dir training_games --sample 50 --format sheet gif overview --workers 8
+"""
+
+import argparse
+import os
+import random
+from multiprocessing import Pool
+
+import pygame
+from PIL import Image
+
+from dataset import iter_game_files
+from gamerecord import GameRecord, read_games
+from gameviewer import GameVisualizer
+
+# Visualizer of a worker process (sprites are cached on it), see _visualizer_for
+_visualizer = None
+
+
+def _visualizer_for(square_size):
+    global _visualizer
+    if _visualizer is None or _visualizer.square_size != square_size:
+        _visualizer = GameVisualizer(square_size=square_size, headless=True)
+    return _visualizer
+
+
+def render_position(visualizer, record, ply, info_panel=False):
+    """
+    The board after `ply` moves of a GameRecord as a new surface, optionally
+    with the viewer's info panel next to it.
+    """
+    visualizer.games = [record]
+    visualizer.current_game_idx = 0
+    visualizer.current_move_idx = ply
+    visualizer.screen.fill(visualizer.BACKGROUND)
+    visualizer.draw_board()
+    width = visualizer.board_size
+    if info_panel:
+        visualizer.draw_info_panel()
+        width = visualizer.window_width
+    return visualizer.screen.subsurface((0, 0, width, visualizer.board_size)).copy()
+
+
+def contact_sheet(surfaces, columns, gap=4, background=GameVisualizer.BACKGROUND):
+    """Lay equally sized surfaces out on a grid."""
+    if not surfaces:
+        raise ValueError("contact_sheet needs at least one surface")
+    width, height = surfaces[0].get_size()
+    rows = (len(surfaces) + columns - 1) // columns
+    sheet = pygame.Surface((columns * (width + gap) + gap, rows * (height + gap) + gap))
+    sheet.fill(background)
+    for i, surface in enumerate(surfaces):
+        row, col = divmod(i, columns)
+        sheet.blit(surface, (gap + col * (width + gap), gap + row * (height + gap)))
+    return sheet
+
+
+def to_image(surface):
+    """A pygame surface as a PIL image."""
+    return Image.frombytes('RGB', surface.get_size(), pygame.image.tobytes(surface, 'RGB'))
+
+
+def sheet_plies(record, every):
+    """Plies shown on a game's contact sheet: every `every`-th and the final one."""
+    plies = list(range(0, len(record) + 1, every))
+    if plies[-1] != len(record):
+        plies.append(len(record))
+    return plies
+
+
+def load_records(games):
+    """GameRecords of list_games() entries, reading each file once."""
+    by_path = {}
+    for path, index, _ in games:
+        by_path.setdefault(path, set()).add(index)
+    records = {}
+    for path, indices in by_path.items():
+        for index, game_data in enumerate(read_games(path)):
+            if index in indices:
+                records[path, index] = GameRecord(game_data)
+    return [records[path, index] for path, index, _ in games]
+
+
+def _export_file(task):
+    """Worker entry point: write the sheets / GIFs of the selected games of one file."""
+    path, indices, formats, output_dir, options = task
+    written = []
+    for record in load_records([(path, index, None) for index in indices]):
+        written.extend(_export_game(record, formats, output_dir, options))
+    return len(indices), written
+
+
+def _export_game(record, formats, output_dir, options):
+    visualizer = _visualizer_for(options['square_size'])
+    written = []
+
+    if 'sheet' in formats:
+        thumbnails = [render_position(visualizer, record, ply) for ply in sheet_plies(record, options['every'])]
+        filepath = os.path.join(output_dir, f"game_{record['game_id']}.png")
+        pygame.image.save(contact_sheet(thumbnails, options['columns']), filepath)
+        written.append(filepath)
+
+    if 'gif' in formats:
+        frames = [to_image(render_position(visualizer, record, ply, info_panel=True))
+                  for ply in range(len(record) + 1)]
+        durations = [options['frame_ms']] * (len(frames) - 1) + [options['frame_ms'] * 5]  # hold the end
+        filepath = os.path.join(output_dir, f"game_{record['game_id']}.gif")
+        frames[0].save(filepath, save_all=True, append_images=frames[1:], duration=durations, loop=0)
+        written.append(filepath)
+
+    return written
+
+
+def list_games(games_dir):
+    """(path, index in file, game_id) of every game in a corpus, in file order."""
+    games = []
+    for path in iter_game_files(games_dir):
+        for index, game_data in enumerate(read_games(path)):
+            games.append((path, index, game_data['game_id']))
+    return games
+
+
+def select_games(games, sample=None, seed=0, first=None, game_ids=None):
+    """Pick games from list_games(): by id, the first N, or a seeded random sample."""
+    if game_ids:
+        wanted = set(game_ids)
+        return [game for game in games if game[2] in wanted]
+    if first is not None:
+        return games[:first]
+    if sample is not None and sample < len(games):
+        return sorted(random.Random(seed).sample(games, sample))
+    return games
+
+
+def export_overview(games, output_path, ply=None, square_size=30, columns=10):
+    """One PNG with one position (default: the final one) of each game."""
+    visualizer = _visualizer_for(square_size)
+    thumbnails = [render_position(visualizer, record, len(record) if ply is None else min(ply, len(record)))
+                  for record in load_records(games)]
+    pygame.image.save(contact_sheet(thumbnails, columns), output_path)
+    return output_path
+
+
+def export_games(games, output_dir, formats=('sheet',), workers=None, square_size=30, every=1, columns=8,
+                 frame_ms=400):
+    """
+    Write the sheets / GIFs of the given games (entries of list_games) across a process pool.
+
+    Returns: List of written files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    options = {'square_size': square_size, 'every': every, 'columns': columns, 'frame_ms': frame_ms}
+    by_path = {}
+    for path, index, _ in games:
+        by_path.setdefault(path, []).append(index)
+    tasks = [(path, indices, formats, output_dir, options) for path, indices in by_path.items()]
+
+    written = []
+    done = 0
+    with Pool(workers) as pool:
+        for num_games, files in pool.imap_unordered(_export_file, tasks):
+            written.extend(files)
+            done += num_games
+            print(f"Rendered {done}/{len(games)} games")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render games to PNG contact sheets and animated GIFs")
+    parser.add_argument("--games-dir", default="training_games", help="Directory containing game pickle files")
+    parser.add_argument("--output-dir", default="exports", help="Directory for the images")
+    parser.add_argument("--format", nargs="+", choices=("sheet", "gif", "overview"), default=["sheet"])
+    parser.add_argument("--sample", type=int, default=None, help="Render a random sample of N games")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random sample")
+    parser.add_argument("--first", type=int, default=None, help="Render the first N games")
+    parser.add_argument("--game-id", action="append", default=None, help="Render this game (repeatable)")
+    parser.add_argument("--square-size", type=int, default=30, help="Pixels per board square")
+    parser.add_argument("--every", type=int, default=1, help="Plies between contact sheet positions")
+    parser.add_argument("--columns", type=int, default=8, help="Positions per contact sheet row")
+    parser.add_argument("--ply", type=int, default=None, help="Ply shown in the overview (default: final)")
+    parser.add_argument("--frame-ms", type=int, default=400, help="GIF frame duration in milliseconds")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+
+    args = parser.parse_args()
+
+    games = select_games(list_games(args.games_dir), args.sample, args.seed, args.first, args.game_id)
+    if not games:
+        print("no games selected")
+        return
+    print(f"Rendering {len(games)} games to {args.output_dir}")
+
+    formats = [f for f in args.format if f != 'overview']
+    if formats:
+        export_games(games, args.output_dir, formats, args.workers, args.square_size, args.every, args.columns,
+                     args.frame_ms)
+    if 'overview' in args.format:
+        os.makedirs(args.output_dir, exist_ok=True)
+        path = export_overview(games, os.path.join(args.output_dir, "overview.png"), args.ply, args.square_size)
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
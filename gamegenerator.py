@@ -1,82 +1,203 @@
+import argparse
 import pickle
 import os
 from datetime import datetime
-from checkers_types import Board, minimax_possiblemove
+from checkers_types import Board, PositionHistory, is_progress, minimax_possiblemove
+from evaluators import CachedEvaluator
+from gamerecord import FORMAT_VERSION, GameRecord, encode_move
+from profiling import Profiler, add_profile_arguments
 import random
 
 
+def _quiet(*args, **kwargs):
+    """Stand-in for print() when a game is generated with verbose=False."""
+
+
+# Game rules shared by GameGenerator.generate_game and selfplay.LockstepGame
+
+def game_settings(max_moves, random_move_chance, initial_random_moves, quiescence_nodes,
+                  repetition_limit, no_progress_limit):
+    """The generate_game arguments recorded in game_data['settings'], for replay_game."""
+    return {
+        'max_moves': max_moves,
+        'random_move_chance': random_move_chance,
+        'initial_random_moves': initial_random_moves,
+        'quiescence_nodes': quiescence_nodes,
+        'repetition_limit': repetition_limit,
+        'no_progress_limit': no_progress_limit,
+    }
+
+
+def decide_random_move(rng, initial_random_moves, random_move_chance):
+    """
+    Whether the next move is a random one: all initial random moves are, later
+    ones with random_move_chance. The rng is only drawn from after the opening.
+
+    Returns: (use_random, remaining initial_random_moves)
+    """
+    if initial_random_moves > 0:
+        return True, initial_random_moves - 1
+    return rng.random() < random_move_chance, 0
+
+
+def game_end_after_move(board_before, cells, history, player):
+    """
+    Record the position after `player`'s move in the history and check for a draw.
+
+    Args:
+        board_before / cells: Board cells before and after the move (stored orientation)
+        history: The game's PositionHistory
+        player: Player who made the move (1 = strong bot, -1 = weak bot)
+
+    Returns:
+        None if the game goes on, else the termination: 'insufficient_material',
+        'repetition' or 'no_progress' (all draws)
+    """
+    piece_count = sum(1 for row in cells for cell in row if cell != 0)
+    if piece_count <= 2:
+        return 'insufficient_material'
+    return history.record(cells, -player, is_progress(board_before, cells)) or None
+
+
+def game_winner(termination, current_player):
+    """Winner of a game that ended with `termination` on current_player's move (0 = draw)."""
+    return -current_player if termination == 'no_moves' else 0
+
+
+def make_game_data(seed, settings, player1_depth, player2_depth, total_moves, winner, termination,
+                   start_board, moves, board_values, move_types, final_board):
+    """The game_data dictionary that is saved for a finished game."""
+    return {
+        'game_id': datetime.now().strftime("%Y%m%d_%H%M%S_%f") + f"_s{seed}",
+        'seed': seed,
+        'settings': settings,  # remaining generate_game arguments, for replay_game
+        'player1_depth': player1_depth,
+        'player2_depth': player2_depth,
+        'random_move_chance': settings['random_move_chance'],
+        'total_moves': total_moves,
+        'winner': winner,  # 1 = strong bot, -1 = weak bot, 0 = draw
+        'winner_name': 'Strong' if winner == 1 else ('Weak' if winner == -1 else 'Draw'),
+        'termination': termination,  # no_moves, insufficient_material, repetition, no_progress, move_limit
+        'format': FORMAT_VERSION,
+        'start_board': start_board,  # 8x4, strong bot's orientation
+        'moves': moves,  # (from, to, promoted, *captures) per move, squares 0-31
+        'board_values': board_values,
+        'move_types': move_types,
+        'final_board': final_board
+    }
+
+
 class GameGenerator:
     """
     Generate checkers games between two minimax bots with different depths.
     Each game is saved as a pickle file containing training data.
     """
     
-    def __init__(self, output_dir="training_games"):
+    def __init__(self, output_dir="training_games", writer=None):
+        """
+        Args:
+            output_dir: Directory for the game files (None: generate only, nothing is saved)
+            writer: Optional gamewriter.GameWriter; save_game() then queues games
+                to it instead of writing them on the calling thread
+        """
         self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
+        self.writer = writer
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
     
-    def generate_game(self, player1_depth=5, player2_depth=2, max_moves=200, random_move_chance=0.0, initial_random_moves=0):
+    def generate_game(self, player1_depth=5, player2_depth=2, max_moves=200, random_move_chance=0.0, initial_random_moves=0,
+                      player1_engine=None, player2_engine=None, verbose=True, quiescence_nodes=0,
+                      repetition_limit=3, no_progress_limit=40, seed=None, eval_cache_size=0):
         """
         Generate a single game between two bots.
         
+        All random decisions come from a random.Random(seed), so a game played
+        by fixed-depth engines can be regenerated exactly from its recorded seed
+        (see replay_game). Engines with a time budget are not reproducible.
+        
         Args:
             player1_depth: Minimax depth for the stronger bot
             player2_depth: Minimax depth for the weaker bot
             max_moves: Maximum number of moves before declaring draw
             random_move_chance: Probability (0.0-1.0) of making a random move instead of minimax
+            player1_engine: Optional engine for player 1 instead of plain minimax at player1_depth.
+                Any object with a `depth` attribute and a `choose_board(board, history)` method.
+            player2_engine: Same for player 2
+            verbose: Print progress while playing
+            quiescence_nodes: Quiescence node limit per leaf for the built-in minimax (0 = off)
+            repetition_limit: Occurrences of the same position (and player to move) that draw the game
+            no_progress_limit: Consecutive moves without a capture or man move that draw the game (0 = off)
+            seed: Seed for the game's random moves (None = draw one from the global random module)
+            eval_cache_size: Slots of an evaluation cache shared by both built-in bots for the whole game (0 = off)
             
         Returns:
             Dictionary containing game data
         """
+        log = print if verbose else _quiet
+        if seed is None:
+            seed = random.getrandbits(32)
+        rng = random.Random(seed)
+        evaluator = CachedEvaluator(size=eval_cache_size) if eval_cache_size else None
+        settings = game_settings(max_moves, random_move_chance, initial_random_moves, quiescence_nodes,
+                                 repetition_limit, no_progress_limit)
         board = Board()
-        game_history = []
+        start_board = board.squeeze()
+        moves = []  # compact moves, see gamerecord.py
+        board_values = []
+        move_types = []
         move_count = 0
         current_player = 1  # 1 = strong bot, -1 = weak bot
+        termination = 'move_limit'
         
-        print(f"\n{'='*60}")
-        print(f"Starting new game: Strong(depth={player1_depth}) vs Weak(depth={player2_depth})")
-        print(f"{'='*60}")
+        # Positions seen so far, for draws by repetition / no progress (also used by the search)
+        history = PositionHistory(repetition_limit, no_progress_limit)
+        history.record(board.board, current_player)
+        
+        log(f"\n{'='*60}")
+        log(f"Starting new game: Strong(depth={player1_depth}) vs Weak(depth={player2_depth}), seed={seed}")
+        log(f"{'='*60}")
         
         while move_count < max_moves:
             move_count += 1
             
             # Determine which bot is playing
             if current_player == 1:
-                depth = player1_depth
+                engine = player1_engine
+                depth = player1_depth if engine is None else engine.depth
                 player_name = "Strong"
             else:
-                depth = player2_depth
+                engine = player2_engine
+                depth = player2_depth if engine is None else engine.depth
                 player_name = "Weak"
             
-            # Store the board BEFORE any flipping (from strong bot's perspective always)
+            # Store the board BEFORE the move (cells are always kept from strong bot's perspective)
             board_before_standard = [row[:] for row in board.board]
             
-            # Get current board state (from perspective of current player)
-            if current_player == -1:
-                board.flipSides()
+            # Present the board from the perspective of the current player (no copy)
+            board.side_to_move = current_player
             
             # Check if current player has any moves
             _, possible_moves = board.returnPossibleMoves()
             
             if not possible_moves:
                 # Current player has no moves - they lose
-                winner = -current_player
-                print(f"\nMove {move_count}: {player_name} has no moves - loses!")
+                termination = 'no_moves'
+                winner = game_winner(termination, current_player)
+                log(f"\nMove {move_count}: {player_name} has no moves - loses!")
                 
-                # Flip back if we flipped
-                if current_player == -1:
-                    board.flipSides()
+                board.side_to_move = 1
                 break
             
             # Decide whether to use minimax or random move
-            use_random = initial_random_moves > 0 or random.random() < random_move_chance
-            if initial_random_moves > 0:
-                initial_random_moves -= 1
+            use_random, initial_random_moves = decide_random_move(rng, initial_random_moves, random_move_chance)
             
             if use_random:
                 # Make a random move from available options
-                best_board = random.choice(possible_moves)
+                best_board = rng.choice(possible_moves)
                 move_type = "random"
+            elif engine is not None:
+                best_board = engine.choose_board(board, history)
+                move_type = "minimax"
             else:
                 # Get best move using minimax
                 best_board = minimax_possiblemove(
@@ -85,59 +206,46 @@ class GameGenerator:
                     beta=10000,
                     isMaximizing=True,
                     depth=depth,
-                    returnBoard=True
+                    returnBoard=True,
+                    evaluator=evaluator,
+                    quiescence_nodes=quiescence_nodes,
+                    history=history
                 )
                 move_type = "minimax"
             
             if best_board is None:
                 # No valid move found - current player loses
-                winner = -current_player
-                print(f"\nMove {move_count}: {player_name} cannot find valid move - loses!")
+                termination = 'no_moves'
+                winner = game_winner(termination, current_player)
+                log(f"\nMove {move_count}: {player_name} cannot find valid move - loses!")
                 
-                if current_player == -1:
-                    board.flipSides()
+                board.side_to_move = 1
                 break
             
-            # Apply the move
+            # Apply the move (boards come back in the stored orientation)
             board.board = best_board
             
-            # Flip back to standard perspective (strong bot's view)
-            if current_player == -1:
-                board.flipSides()
-            
-            # Store the board AFTER move (from strong bot's perspective)
-            board_after_standard = [row[:] for row in board.board]
-            
-            # Create squeezed versions
-            squeezed_before = Board(board_before_standard).squeeze()
-            squeezed_after = Board(board_after_standard).squeeze()
+            # Back to standard perspective (strong bot's view)
+            board.side_to_move = 1
             
             # Calculate board value from strong bot's perspective (always from current standard board)
             board_value = board.estimateAdvantage()
             
-            # Store move in history
-            move_data = {
-                'move_number': move_count,
-                'player': current_player,
-                'board_before_8x8': board_before_standard,
-                'board_after_8x8': board_after_standard,
-                'board_before_4x8': squeezed_before,
-                'board_after_4x8': squeezed_after,
-                'board_value': board_value,
-                'depth_used': depth,
-                'move_type': move_type  # 'minimax' or 'random'
-            }
-            game_history.append(move_data)
+            # Store the move compactly; boards are rebuilt from the moves when read (GameRecord)
+            moves.append(encode_move(board_before_standard, board.board))
+            board_values.append(board_value)
+            move_types.append(move_type)  # 'minimax' or 'random'
             
             # Print progress every 10 moves
             if move_count % 10 == 0:
-                print(f"Move {move_count}: {player_name} played (value={board_value:.2f})")
+                log(f"Move {move_count}: {player_name} played (value={board_value:.2f})")
             
-            # Check for draw by insufficient material
-            piece_count = sum(1 for row in board.board for cell in row if cell != 0)
-            if piece_count <= 2:
-                winner = 0  # Draw
-                print(f"\nMove {move_count}: Draw by insufficient material")
+            # Check for draw by insufficient material, repetition or no progress (kings shuffling around)
+            draw = game_end_after_move(board_before_standard, board.board, history, current_player)
+            if draw:
+                termination = draw
+                winner = game_winner(termination, current_player)
+                log(f"\nMove {move_count}: Draw by {draw.replace('_', ' ')}")
                 break
             
             # Switch players
@@ -145,27 +253,46 @@ class GameGenerator:
         
         else:
             # Max moves reached - declare draw
-            winner = 0
-            print(f"\nMove {move_count}: Draw by move limit")
+            winner = game_winner(termination, current_player)
+            log(f"\nMove {move_count}: Draw by move limit")
+        
+        if evaluator is not None:
+            log(f"Evaluation {evaluator}")
         
         # Create game summary
-        game_data = {
-            'game_id': datetime.now().strftime("%Y%m%d_%H%M%S_%f"),
-            'player1_depth': player1_depth,
-            'player2_depth': player2_depth,
-            'random_move_chance': random_move_chance,
-            'total_moves': move_count,
-            'winner': winner,  # 1 = strong bot, -1 = weak bot, 0 = draw
-            'winner_name': 'Strong' if winner == 1 else ('Weak' if winner == -1 else 'Draw'),
-            'move_history': game_history,
-            'final_board': board.board,
-            'final_board_squeezed': board.squeeze()
-        }
+        return make_game_data(seed, settings, player1_depth, player2_depth, move_count, winner, termination,
+                              start_board, moves, board_values, move_types, board.board)
+    
+    def replay_game(self, game_data, player1_engine=None, player2_engine=None, verbose=False):
+        """
+        Regenerate a saved game from its seed and settings.
+        
+        Engines are not stored in game_data; pass the same ones again if the
+        original game used them.
+        
+        Returns:
+            The regenerated game data (compare it with games_match)
+        """
+        if 'seed' not in game_data:
+            raise ValueError(f"Game {game_data['game_id']} has no recorded seed and cannot be replayed")
         
-        return game_data
+        return self.generate_game(game_data['player1_depth'], game_data['player2_depth'],
+                                  player1_engine=player1_engine, player2_engine=player2_engine,
+                                  verbose=verbose, seed=game_data['seed'], **game_data['settings'])
     
     def save_game(self, game_data):
-        """Save game data to a pickle file."""
+        """
+        Save game data to a pickle file.
+        
+        Returns:
+            The file path; with a writer the game id, as the writer picks the
+            file (writer.files lists the files once they are written)
+        """
+        if self.writer is not None:
+            self.writer.write(game_data)
+            print(f"Game {game_data['game_id']} queued: {game_data['winner_name']}, {game_data['total_moves']} moves")
+            return game_data['game_id']
+        
         filename = f"game_{game_data['game_id']}.pkl"
         filepath = os.path.join(self.output_dir, filename)
         
@@ -177,7 +304,8 @@ class GameGenerator:
         print(f"Total moves: {game_data['total_moves']}")
         return filepath
     
-    def generate_games(self, num_games, player1_depth=5, player2_depth=2, max_moves=200, random_move_chance=0.0, initial_random_moves=5):
+    def generate_games(self, num_games, player1_depth=5, player2_depth=2, max_moves=200, random_move_chance=0.0, initial_random_moves=5,
+                       quiescence_nodes=0, repetition_limit=3, no_progress_limit=40, seed=None, lockstep_games=0):
         """
         Generate multiple games and save them.
         
@@ -187,9 +315,15 @@ class GameGenerator:
             player2_depth: Minimax depth for weaker bot
             max_moves: Maximum moves per game
             random_move_chance: Probability (0.0-1.0) of making random moves instead of minimax
+            quiescence_nodes: Quiescence node limit per leaf (0 = plain minimax)
+            repetition_limit: Occurrences of a position that draw the game
+            no_progress_limit: Moves without a capture or man move that draw the game (0 = off)
+            seed: Optional base seed; game i is played with seed + i
+            lockstep_games: Play this many games together with selfplay.LockstepSelfPlay
+                (0 = one at a time; not combined with quiescence)
             
         Returns:
-            List of filepaths to saved games
+            List of what save_game() returned for each game
         """
         saved_games = []
         
@@ -201,19 +335,31 @@ class GameGenerator:
         print(f"# Max moves per game: {max_moves}")
         print(f"{'#'*60}")
         
-        for i in range(num_games):
-            print(f"\n\n{'*'*60}")
-            print(f"* GAME {i+1}/{num_games}")
-            print(f"{'*'*60}")
+        if lockstep_games > 0 and quiescence_nodes == 0:
+            from selfplay import LockstepSelfPlay
+            selfplay = LockstepSelfPlay(num_games, player1_depth, player2_depth, max_moves, random_move_chance,
+                                        initial_random_moves, repetition_limit, no_progress_limit, seed=seed,
+                                        lockstep_games=lockstep_games)
+            for game_data in selfplay.run():
+                saved_games.append(self.save_game(game_data))
+        else:
+            for i in range(num_games):
+                print(f"\n\n{'*'*60}")
+                print(f"* GAME {i+1}/{num_games}")
+                print(f"{'*'*60}")
             
-            try:
-                game_data = self.generate_game(player1_depth, player2_depth, max_moves, random_move_chance, initial_random_moves)
-                filepath = self.save_game(game_data)
-                saved_games.append(filepath)
-            except Exception as e:
-                print(f"\nError generating game {i+1}: {e}")
-                import traceback
-                traceback.print_exc()
+                try:
+                    game_data = self.generate_game(player1_depth, player2_depth, max_moves, random_move_chance, initial_random_moves,
+                                                   quiescence_nodes=quiescence_nodes,
+                                                   repetition_limit=repetition_limit,
+                                                   no_progress_limit=no_progress_limit,
+                                                   seed=None if seed is None else seed + i)
+                    filepath = self.save_game(game_data)
+                    saved_games.append(filepath)
+                except Exception as e:
+                    print(f"\nError generating game {i+1}: {e}")
+                    import traceback
+                    traceback.print_exc()
         
         print(f"\n\n{'#'*60}")
         print(f"# Generation complete!")
@@ -234,6 +380,7 @@ class GameGenerator:
         
         print(f"\n{'='*60}")
         print(f"Game ID: {game_data['game_id']}")
+        print(f"Seed: {game_data.get('seed', 'not recorded')}")
         print(f"Strong depth: {game_data['player1_depth']}")
         print(f"Weak depth: {game_data['player2_depth']}")
         print(f"Total moves: {game_data['total_moves']}")
@@ -241,51 +388,74 @@ class GameGenerator:
         print(f"{'='*60}")
         
         # Show first few moves
+        record = GameRecord(game_data)
         print("\nFirst 5 moves:")
-        for move in game_data['move_history'][:5]:
+        for i in range(min(5, len(record))):
+            move = record.move_info(i)
             player_name = "Strong" if move['player'] == 1 else "Weak"
             print(f"  Move {move['move_number']}: {player_name} "
                   f"(depth={move['depth_used']}, value={move['board_value']:.2f})")
         
-        if len(game_data['move_history']) > 5:
+        if len(record) > 5:
             print("  ...")
 
 
+def games_match(a, b):
+    """True if two games have the same result and exactly the same sequence of moves."""
+    a, b = GameRecord(a), GameRecord(b)
+    return (a['winner'] == b['winner'] and a['total_moves'] == b['total_moves'] and
+            a['start_board'] == b['start_board'] and a.moves == b.moves)
+
+
+def profile_generation(spec_path, mode, num_games, job_name=None, output_dir="profile_out", interval=0.001):
+    """
+    Play num_games games of one job of a spec in this process (no pool, so
+    the profiler sees every game) under a Profiler, save them as a unit
+    file, and write the profile.
+    """
+    from jobscheduler import load_spec, play_unit, write_games
+
+    spec = load_spec(spec_path)
+    job = spec['jobs'][0] if job_name is None else next(job for job in spec['jobs'] if job['name'] == job_name)
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Profiling {num_games} games of job {job['name']} ({mode})")
+
+    with Profiler(mode, interval) as profiler:
+        games = play_unit(job, 0, num_games, spec['lockstep_games'])
+        write_games(os.path.join(output_dir, f"{job['name']}_profiled.pkl"), games)
+
+    moves = sum(game_data['total_moves'] for game_data in games)
+    print(f"{len(games)} games, {moves} moves in {profiler.seconds:.3f}s")
+    profiler.write(output_dir)
+    return profiler
+
+
 def main():
-    """Example usage of the game generator."""
-    generator = GameGenerator(output_dir="training_games")
-    
-    # Generate 5 games with different depth combinations
-    print("Generating games with varied bot strengths...")
-    
-    # Games with depth 5 vs depth 2, pure minimax
-    #generator.generate_games(num_games=2, player1_depth=5, player2_depth=2, max_moves=50, random_move_chance=0.5, initial_random_moves=10)
-    generator.generate_games(num_games=1000, player1_depth=5, player2_depth=1, max_moves=60, random_move_chance=0.5, initial_random_moves=5)
-    generator.generate_games(num_games=1000, player1_depth=1, player2_depth=5, max_moves=60, random_move_chance=0.5, initial_random_moves=5)
-    
-    generator.generate_games(num_games=1000, player1_depth=2, player2_depth=3, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    generator.generate_games(num_games=1000, player1_depth=3, player2_depth=2, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    
-    generator.generate_games(num_games=1000, player1_depth=1, player2_depth=2, max_moves=60, random_move_chance=0.1, initial_random_moves=5)
-    generator.generate_games(num_games=1000, player1_depth=2, player2_depth=1, max_moves=60, random_move_chance=0.1, initial_random_moves=5)
-    
-    generator.generate_games(num_games=1000, player1_depth=4, player2_depth=2, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    generator.generate_games(num_games=1000, player1_depth=2, player2_depth=4, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    
-    generator.generate_games(num_games=1000, player1_depth=3, player2_depth=1, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    generator.generate_games(num_games=1000, player1_depth=1, player2_depth=3, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    
-    generator.generate_games(num_games=1000, player1_depth=3, player2_depth=2, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    generator.generate_games(num_games=1000, player1_depth=2, player2_depth=3, max_moves=60, random_move_chance=0.3, initial_random_moves=5)
-    
-    
+    """Generate the training corpus described by generation_jobs.json (see jobscheduler.py)."""
+    from jobscheduler import JobScheduler
+
+    parser = argparse.ArgumentParser(description="Generate the training corpus of a job spec")
+    parser.add_argument("--spec", default="generation_jobs.json", help="Job spec (JSON)")
+    add_profile_arguments(parser)
+    parser.add_argument("--profile-games", type=int, default=10, help="Games played under the profiler")
+    parser.add_argument("--profile-job", default=None, help="Job whose settings are profiled (default: the first)")
+    args = parser.parse_args()
+
+    if args.profile:
+        profile_generation(args.spec, args.profile, args.profile_games, args.profile_job, args.profile_output,
+                           args.profile_interval)
+        return
+
+    scheduler = JobScheduler(args.spec)
+    scheduler.run()
+    generator = GameGenerator(output_dir=scheduler.output_dir)
 
     # Show summary of first generated game
-    game_files = [f for f in os.listdir("training_games") if f.endswith('.pkl')]
+    game_files = sorted(f for f in os.listdir(generator.output_dir) if f.endswith('.pkl'))
     if game_files:
         print("\n\nExample game summary:")
-        generator.print_game_summary(os.path.join("training_games", game_files[0]))
+        generator.print_game_summary(os.path.join(generator.output_dir, game_files[0]))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,205 @@
+"""
+Compact game records.
+
+Instead of four board copies per move, a game stores its start position and
+one small tuple per move:
+
+    (from_square, to_square, promoted, *captured_squares)
+
+Squares are numbered 0-31 in Board.squeeze() order (square = row * 4 + col // 2),
+always in the strong bot's orientation. Boards are rebuilt on demand by
+replaying the moves; GameRecord keeps a copy of every KEYFRAME_INTERVAL-th
+position so that any ply is reached by replaying only a few moves.
+"""
+
+import pickle
+
+FORMAT_VERSION = 2
+KEYFRAME_INTERVAL = 16
+
+
+def square_index(r, c):
+    """Square number (0-31) of a playable 8x8 cell."""
+    return r * 4 + c // 2
+
+
+def square_coords(square):
+    """(row, col) of a square number (inverse of square_index)."""
+    r = square // 4
+    return r, (square % 4) * 2 + (1 if r % 2 == 0 else 0)
+
+
+def _cell(cells, square):
+    r, c = square_coords(square)
+    return cells[r][c]
+
+
+def unsqueeze(squeezed):
+    """Rebuild 8x8 cells from the 8x4 form returned by Board.squeeze()."""
+    cells = [[0] * 8 for _ in range(8)]
+    for square in range(32):
+        r, c = square_coords(square)
+        cells[r][c] = squeezed[r][square % 4]
+    return cells
+
+
+def encode_move(before, after):
+    """
+    Describe the move that turns 8x8 cells `before` into `after`.
+
+    A capture sequence that ends on its own start square leaves the mover
+    where it was; it is stored with from/to = -1 and only the captures.
+    """
+    frm = to = -1
+    removed = []
+    for r in range(8):
+        for c in range(8):
+            b, a = before[r][c], after[r][c]
+            if b == a:
+                continue
+            if b == 0:
+                to = square_index(r, c)
+            else:
+                removed.append((square_index(r, c), b))
+
+    if to >= 0:
+        mover_is_positive = _cell(after, to) > 0
+        captures = []
+        for square, piece in removed:
+            if (piece > 0) == mover_is_positive:
+                frm = square
+            else:
+                captures.append(square)
+        promoted = abs(_cell(before, frm)) == 1 and abs(_cell(after, to)) == 2
+    else:
+        captures = [square for square, _ in removed]
+        promoted = False
+
+    return (frm, to, promoted) + tuple(captures)
+
+
+def apply_move(cells, move):
+    """Play a compact move on 8x8 cells in place."""
+    frm, to, promoted = move[:3]
+    if frm >= 0:
+        r, c = square_coords(frm)
+        piece = cells[r][c]
+        cells[r][c] = 0
+        if promoted:
+            piece = 2 if piece > 0 else -2
+        r, c = square_coords(to)
+        cells[r][c] = piece
+    for square in move[3:]:
+        r, c = square_coords(square)
+        cells[r][c] = 0
+
+
+def compact_game(game_data):
+    """
+    Convert a game in the old layout (full boards in 'move_history') to the
+    compact layout. Games that are already compact are returned unchanged.
+    """
+    if 'moves' in game_data:
+        return game_data
+
+    history = game_data['move_history']
+    if history:
+        start = history[0]['board_before_8x8']
+    else:
+        start = game_data['final_board']
+
+    compact = {k: v for k, v in game_data.items() if k not in ('move_history', 'final_board_squeezed')}
+    compact['format'] = FORMAT_VERSION
+    compact['start_board'] = [[start[r][c] for c in range(8) if (r + c) % 2 == 1] for r in range(8)]
+    compact['moves'] = [encode_move(m['board_before_8x8'], m['board_after_8x8']) for m in history]
+    compact['board_values'] = [m['board_value'] for m in history]
+    compact['move_types'] = [m.get('move_type', 'minimax') for m in history]
+    return compact
+
+
+class GameRecord:
+    """
+    Read access to a game: positions by ply and per-move details.
+
+    Items not covered by the methods below are read from the game data
+    directly (record['winner'], record['total_moves'], ...).
+    """
+
+    def __init__(self, game_data, keyframe_interval=KEYFRAME_INTERVAL):
+        """
+        Args:
+            game_data: Game dictionary in the compact or the old layout
+            keyframe_interval: Plies between stored positions
+        """
+        self.game_data = compact_game(game_data)
+        self.moves = self.game_data['moves']
+        self.keyframe_interval = keyframe_interval
+
+        # Replay once, keeping every keyframe_interval-th position
+        self.keyframes = []
+        cells = unsqueeze(self.game_data['start_board'])
+        for ply in range(len(self.moves) + 1):
+            if ply % keyframe_interval == 0:
+                self.keyframes.append([row[:] for row in cells])
+            if ply < len(self.moves):
+                apply_move(cells, self.moves[ply])
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __getitem__(self, key):
+        return self.game_data[key]
+
+    def get(self, key, default=None):
+        return self.game_data.get(key, default)
+
+    def position_at(self, ply):
+        """8x8 cells after `ply` moves (0 = start position), strong bot's orientation."""
+        ply = max(0, min(ply, len(self.moves)))
+        keyframe = ply // self.keyframe_interval
+        cells = [row[:] for row in self.keyframes[keyframe]]
+        for move in self.moves[keyframe * self.keyframe_interval:ply]:
+            apply_move(cells, move)
+        return cells
+
+    def positions(self):
+        """Yield the cells after every move, in order."""
+        cells = unsqueeze(self.game_data['start_board'])
+        for move in self.moves:
+            apply_move(cells, move)
+            yield [row[:] for row in cells]
+
+    def move_info(self, index):
+        """
+        Details of move `index` (0-based).
+
+        Returns:
+            Dictionary with 'move_number', 'player', 'board_value', 'depth_used', 'move_type'
+        """
+        player = 1 if index % 2 == 0 else -1
+        return {
+            'move_number': index + 1,
+            'player': player,
+            'board_value': self.game_data['board_values'][index],
+            'depth_used': self.game_data['player1_depth'] if player == 1 else self.game_data['player2_depth'],
+            'move_type': self.game_data['move_types'][index],
+        }
+
+
+def read_games(filepath):
+    """
+    Yield every game in a game file. A file holds one or more pickled games
+    back to back (gamewriter.GameWriter can put several games in one file).
+    """
+    with open(filepath, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def load_game_record(filepath, keyframe_interval=KEYFRAME_INTERVAL):
+    """Load a game pickle (either layout) as a GameRecord; the first game of a multi-game file."""
+    with open(filepath, 'rb') as f:
+        return GameRecord(pickle.load(f), keyframe_interval)
@@ -5,10 +5,11 @@ Shows games move-by-move with playback controls.
 """
 
 import pygame
-import pickle
 import os
 import sys
 
+from gamerecord import GameRecord, read_games
+
 
 class GameVisualizer:
     """Visualize checkers games using pygame."""
@@ -28,13 +29,15 @@ class GameVisualizer:
     OPPONENT_KING = (200, 200, 200)  # Light gray
     KING_CROWN = (255, 215, 0)  # Gold
     
-    def __init__(self, games_dir="training_games", square_size=70):
+    def __init__(self, games_dir="training_games", square_size=70, headless=False):
         """
         Initialize the visualizer.
         
         Args:
             games_dir: Directory containing game pickle files
             square_size: Size of each board square in pixels
+            headless: Draw on an offscreen surface without opening a window and
+                without loading games (set self.games yourself, see gameexport.py)
         """
         self.games_dir = games_dir
         self.square_size = square_size
@@ -53,6 +56,14 @@ class GameVisualizer:
         self.playback_speed = 1.0  # Moves per second
         self.last_update_time = 0
         
+        # Piece sprites and the empty board, drawn once and then blitted
+        self.sprites = {}
+        self.background = None
+        
+        if headless:
+            self.screen = pygame.Surface((self.window_width, self.window_height))
+            return
+        
         # Initialize pygame
         pygame.init()
         self.screen = pygame.display.set_mode((self.window_width, self.window_height))
@@ -96,9 +107,8 @@ class GameVisualizer:
             if filename.endswith('.pkl'):
                 filepath = os.path.join(self.games_dir, filename)
                 try:
-                    with open(filepath, 'rb') as f:
-                        game = pickle.load(f)
-                        self.games.append(game)
+                    for game_data in read_games(filepath):
+                        self.games.append(GameRecord(game_data))
                 except Exception as e:
                     print(f"Error loading {filename}: {e}")
         
@@ -116,13 +126,8 @@ class GameVisualizer:
         if not game:
             return None
         
-        if self.current_move_idx == 0:
-            # Initial board - reconstruct from first move
-            if game['move_history']:
-                return game['move_history'][0]['board_before_8x8']
-            return None
-        elif self.current_move_idx <= len(game['move_history']):
-            return game['move_history'][self.current_move_idx - 1]['board_after_8x8']
+        if self.current_move_idx <= len(game):
+            return game.position_at(self.current_move_idx)
         
         return game['final_board']
     
@@ -132,6 +137,22 @@ class GameVisualizer:
         if not board:
             return
         
+        self.screen.blit(self.board_background(), (0, 0))
+        
+        # Draw pieces
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece != 0:
+                    self.draw_piece(row, col, piece)
+    
+    def board_background(self):
+        """The empty board with its grid lines (pieces never reach the lines)."""
+        if self.background is not None:
+            return self.background
+        
+        self.background = pygame.Surface((self.board_size, self.board_size))
+        
         # Draw squares
         for row in range(8):
             for col in range(8):
@@ -144,31 +165,33 @@ class GameVisualizer:
                 else:
                     color = self.DARK_SQUARE
                 
-                pygame.draw.rect(self.screen, color, 
+                pygame.draw.rect(self.background, color, 
                                (x, y, self.square_size, self.square_size))
         
-        # Draw pieces
-        for row in range(8):
-            for col in range(8):
-                piece = board[row][col]
-                if piece != 0:
-                    self.draw_piece(row, col, piece)
-        
         # Draw grid lines
         for i in range(9):
             # Vertical lines
-            pygame.draw.line(self.screen, (0, 0, 0),
+            pygame.draw.line(self.background, (0, 0, 0),
                            (i * self.square_size, 0),
                            (i * self.square_size, self.board_size), 1)
             # Horizontal lines
-            pygame.draw.line(self.screen, (0, 0, 0),
+            pygame.draw.line(self.background, (0, 0, 0),
                            (0, i * self.square_size),
                            (self.board_size, i * self.square_size), 1)
+        return self.background
     
     def draw_piece(self, row, col, piece):
         """Draw a single piece."""
-        center_x = col * self.square_size + self.square_size // 2
-        center_y = row * self.square_size + self.square_size // 2
+        self.screen.blit(self.piece_sprite(piece), (col * self.square_size, row * self.square_size))
+    
+    def piece_sprite(self, piece):
+        """A transparent square with the piece drawn on it, drawn on first use."""
+        if piece in self.sprites:
+            return self.sprites[piece]
+        
+        sprite = pygame.Surface((self.square_size, self.square_size), pygame.SRCALPHA)
+        center_x = self.square_size // 2
+        center_y = self.square_size // 2
         radius = self.square_size // 3
         
         # Determine piece color
@@ -184,14 +207,17 @@ class GameVisualizer:
                 color = self.OPPONENT_PIECE
         
         # Draw piece
-        pygame.draw.circle(self.screen, color, (center_x, center_y), radius)
-        pygame.draw.circle(self.screen, (0, 0, 0), (center_x, center_y), radius, 2)
+        pygame.draw.circle(sprite, color, (center_x, center_y), radius)
+        pygame.draw.circle(sprite, (0, 0, 0), (center_x, center_y), radius, 2)
         
         # Draw crown for kings
         if abs(piece) == 2:
-            self.draw_crown(center_x, center_y, radius)
+            self.draw_crown(sprite, center_x, center_y, radius)
+        
+        self.sprites[piece] = sprite
+        return sprite
     
-    def draw_crown(self, x, y, radius):
+    def draw_crown(self, surface, x, y, radius):
         """Draw a crown on a king piece."""
         crown_size = radius // 2
         points = [
@@ -201,7 +227,7 @@ class GameVisualizer:
             (x + crown_size//2, y - crown_size//2),
             (x + crown_size, y)
         ]
-        pygame.draw.lines(self.screen, self.KING_CROWN, False, points, 3)
+        pygame.draw.lines(surface, self.KING_CROWN, False, points, 3)
     
     def draw_info_panel(self):
         """Draw the information panel on the right side using visual indicators."""
@@ -276,8 +302,8 @@ class GameVisualizer:
         y_offset += 40
         
         # Current move details
-        if self.current_move_idx > 0 and self.current_move_idx <= len(game['move_history']):
-            move = game['move_history'][self.current_move_idx - 1]
+        if self.current_move_idx > 0 and self.current_move_idx <= len(game):
+            move = game.move_info(self.current_move_idx - 1)
             
             y_offset += 10
             # Section divider
@@ -0,0 +1,167 @@
+"""
+Background writing of generated games.
+
+GameWriter takes finished games from the generating thread and writes them on
+a writer thread, so a slow output directory (e.g. a network mount) does not
+stall the search. Games wait in a bounded queue; when it is full, write()
+blocks until the writer catches up (back-pressure), so memory stays bounded
+if generation outpaces the disk.
+
+Several games can share one file (games_per_file): they are pickled back to
+back and read with gamerecord.read_games. A file is written under a temporary
+name and renamed when complete, so readers never see a partial file. A file
+that is not full yet is completed anyway once it has been open for
+flush_interval seconds, which bounds how many finished games a crash can lose.
+
+write_file() queues a group of games that must end up together in a file of
+a given name (a job scheduler unit); `files` tells when it is complete.
+"""
+
+import os
+import pickle
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class _File:
+    """A write_file() request: games written together to one named file."""
+
+    def __init__(self, path, games):
+        self.path = path
+        self.games = games
+
+
+class GameWriter:
+    """Write games to an output directory on a background thread."""
+
+    def __init__(self, output_dir, games_per_file=1, queue_size=64, flush_interval=5.0, fsync=True):
+        """
+        Args:
+            output_dir: Directory for the game files (created if missing)
+            games_per_file: Games pickled into one file
+            queue_size: Games that can wait to be written before write() blocks
+            flush_interval: Seconds after which a partly filled file is completed anyway
+            fsync: Force each file to disk before it is renamed into place
+        """
+        self.output_dir = output_dir
+        self.games_per_file = games_per_file
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.files = []       # completed files, in the order they were written
+        self.games = 0        # games written to completed files
+        self.stalls = 0       # write() calls that found the queue full
+        self.error = None
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, name="GameWriter", daemon=True)
+        self.thread.start()
+
+    def write(self, game_data):
+        """Queue a finished game; blocks only while the queue is full."""
+        if self.closed:
+            raise ValueError("GameWriter is closed")
+        self._check_error()
+        try:
+            self.queue.put_nowait(game_data)
+        except queue.Full:
+            self.stalls += 1
+            self.queue.put(game_data)
+
+    def write_file(self, path, games):
+        """
+        Queue games to be written as one file at `path`, apart from the
+        games_per_file grouping; blocks only while the queue is full.
+        The path is appended to `files` once the file is complete.
+        """
+        self.write(_File(path, games))
+
+    def close(self):
+        """Write everything still queued, complete the open file and stop the writer thread."""
+        if not self.closed:
+            self.closed = True
+            self.queue.put(_STOP)
+            self.thread.join()
+        self._check_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __str__(self):
+        return f"GameWriter({self.games} games in {len(self.files)} files, {self.stalls} stalls)"
+
+    def _check_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"Writing games to {self.output_dir} failed") from self.error
+
+    def _run(self):
+        f = None
+        stopped = False
+        try:
+            while True:
+                timeout = None
+                if f is not None:
+                    timeout = max(0.0, f.opened + self.flush_interval - time.monotonic())
+                try:
+                    game_data = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    self._complete(f)  # open for flush_interval seconds
+                    f = None
+                    continue
+
+                if game_data is _STOP:
+                    stopped = True
+                    break
+                if isinstance(game_data, _File):
+                    unit = self._open_path(game_data.path)
+                    for game in game_data.games:
+                        pickle.dump(game, unit)
+                    unit.count = len(game_data.games)
+                    self._complete(unit)
+                    continue
+                if f is None:
+                    f = self._open(game_data)
+                pickle.dump(game_data, f)
+                f.count += 1
+                if f.count >= self.games_per_file:
+                    self._complete(f)
+                    f = None
+
+            if f is not None:
+                self._complete(f)
+        except Exception as e:
+            self.error = e
+            # Keep draining so that write() never blocks on a dead writer
+            while not stopped:
+                stopped = self.queue.get() is _STOP
+
+    def _open(self, game_data):
+        if self.games_per_file == 1:
+            filename = f"game_{game_data['game_id']}.pkl"
+        else:
+            filename = f"games_{game_data['game_id']}.pkl"
+        return self._open_path(os.path.join(self.output_dir, filename))
+
+    def _open_path(self, path):
+        f = open(path + ".tmp", 'wb')
+        f.path = path
+        f.opened = time.monotonic()
+        f.count = 0
+        return f
+
+    def _complete(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        f.close()
+        os.replace(f.name, f.path)
+        self.files.append(f.path)
+        self.games += f.count
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Resumable game generation from a declarative job spec.
+
+The spec (JSON, see generation_jobs.json) lists the games to generate:
+
+    {
+      "output_dir": "training_games",
+      "unit_size": 50,              games per work unit / checkpoint
+      "seed": 0,                    base seed, see below
+      "lockstep_games": 32,         0 = play the games of a unit one at a time
+      "jobs": [
+        {"name": "d5v1", "player1_depth": 5, "player2_depth": 1, "games": 1000,
+         "max_moves": 60, "random_move_chance": 0.5, "initial_random_moves": 5},
+        ...
+      ]
+    }
+
+Every job is split into units of unit_size games, which are played across a
+process pool; each finished unit is written by a background GameWriter as one
+file with all its games (<output_dir>/<job>_uNNNNN.pkl), so the workers never
+wait on the disk, and checkpointed in <output_dir>/jobs_state.json once that
+file is complete.
+Running the same spec again skips the finished units, so an interrupted run
+resumes where it stopped, and raising a job's "games" later only adds units.
+
+Game k of job j is played with seed spec seed + j * JOB_SEED_STRIDE + k (or
+the job's own "seed" + k), so a unit that is redone produces the same games.
+
+The next unit always goes to the job that is furthest from its target (the
+largest fraction of games neither finished nor in flight), so all jobs grow
+together and an interrupted run leaves a balanced corpus.
+
+Example:
+    python jobscheduler.py --spec generation_jobs.json --workers 8
+    python jobscheduler.py --spec generation_jobs.json --status
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from gamegenerator import GameGenerator
+from gamewriter import GameWriter
+from selfplay import LockstepSelfPlay
+
+JOB_SEED_STRIDE = 1_000_000
+
+# Job keys passed on to GameGenerator.generate_game
+GAME_SETTINGS = ('max_moves', 'random_move_chance', 'initial_random_moves', 'repetition_limit', 'no_progress_limit')
+
+
+def load_spec(path):
+    """Read a job spec and fill in the defaults."""
+    with open(path) as f:
+        spec = json.load(f)
+
+    spec.setdefault('output_dir', 'training_games')
+    spec.setdefault('unit_size', 50)
+    spec.setdefault('seed', 0)
+    spec.setdefault('lockstep_games', 0)
+
+    names = set()
+    for j, job in enumerate(spec['jobs']):
+        unknown = set(job) - {'name', 'player1_depth', 'player2_depth', 'games', 'seed'} - set(GAME_SETTINGS)
+        if unknown:
+            raise ValueError(f"Job {job.get('name', j)}: unknown keys {sorted(unknown)}")
+        if job['name'] in names:
+            raise ValueError(f"Duplicate job name {job['name']}")
+        names.add(job['name'])
+        job.setdefault('seed', spec['seed'] + j * JOB_SEED_STRIDE)
+    return spec
+
+
+def play_unit(job, first_game, num_games, lockstep_games=0):
+    """Play games first_game .. first_game + num_games - 1 of a job; returns them in seed order."""
+    settings = {key: job[key] for key in GAME_SETTINGS if key in job}
+    seed = job['seed'] + first_game
+
+    if lockstep_games > 0:
+        selfplay = LockstepSelfPlay(num_games, job['player1_depth'], job['player2_depth'], seed=seed,
+                                    lockstep_games=lockstep_games, **settings)
+        return sorted(selfplay.run(), key=lambda game_data: game_data['seed'])
+
+    generator = GameGenerator(output_dir=None)
+    return [generator.generate_game(job['player1_depth'], job['player2_depth'], verbose=False,
+                                    seed=seed + k, **settings)
+            for k in range(num_games)]
+
+
+def write_games(path, games):
+    """Write games back to back to one file, under a temporary name first so a crash never leaves a partial unit."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for game_data in games:
+            pickle.dump(game_data, f)
+    os.replace(tmp_path, path)
+
+
+def _play_unit(task):
+    """Worker entry point: play one unit of a job; the parent writes the games."""
+    job, unit, first_game, num_games, lockstep_games = task
+    return job['name'], unit, play_unit(job, first_game, num_games, lockstep_games)
+
+
+class JobScheduler:
+    """
+    Run a job spec as a persistent queue of work units.
+
+    Output directory layout:
+        <job>_uNNNNN.pkl    - finished units, several games per file (gamerecord.read_games)
+        jobs_state.json     - the jobs and the finished units of each (unit -> games)
+    """
+
+    def __init__(self, spec, workers=None):
+        """
+        Args:
+            spec: Job spec dictionary (load_spec) or path to a spec file
+            workers: Worker processes (default: all CPUs)
+        """
+        self.spec = load_spec(spec) if isinstance(spec, str) else spec
+        self.output_dir = self.spec['output_dir']
+        self.unit_size = self.spec['unit_size']
+        self.workers = workers or os.cpu_count()
+        self.jobs = {job['name']: job for job in self.spec['jobs']}
+        self.state_path = os.path.join(self.output_dir, "jobs_state.json")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.completed = self.load_state()
+
+    def load_state(self):
+        """Finished units per job from an earlier run, checked against the current spec."""
+        completed = {name: {} for name in self.jobs}
+        if not os.path.exists(self.state_path):
+            return completed
+
+        with open(self.state_path) as f:
+            state = json.load(f)
+        if state['unit_size'] != self.unit_size:
+            raise ValueError(f"{self.output_dir} was started with unit_size={state['unit_size']}; "
+                             f"use a new output directory")
+        for name, old in state['jobs'].items():
+            if name not in self.jobs:
+                continue
+            job = self.jobs[name]
+            changed = [key for key in set(old) | set(job) if key != 'games' and old.get(key) != job.get(key)]
+            if changed:
+                raise ValueError(f"Job {name} changed since the last run ({', '.join(sorted(changed))}); "
+                                 f"rename it or use a new output directory")
+            completed[name] = {int(unit): games for unit, games in state['completed'].get(name, {}).items()}
+        return completed
+
+    def save_state(self):
+        """Checkpoint the finished units; written atomically."""
+        state = {
+            'unit_size': self.unit_size,
+            'jobs': self.jobs,
+            'completed': self.completed,
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def complete_unit(self, name, unit, games):
+        """Checkpoint a unit whose file has been written."""
+        self.completed[name][unit] = games
+        self.save_state()
+
+    def num_units(self, name):
+        return (self.jobs[name]['games'] + self.unit_size - 1) // self.unit_size
+
+    def unit_games(self, name, unit):
+        """Number of games in a unit (the last unit of a job may be short)."""
+        return min(self.unit_size, self.jobs[name]['games'] - unit * self.unit_size)
+
+    def unit_path(self, name, unit):
+        return os.path.join(self.output_dir, f"{name}_u{unit:05d}.pkl")
+
+    def games_done(self, name):
+        return sum(min(games, self.unit_games(name, unit)) for unit, games in self.completed[name].items()
+                   if unit < self.num_units(name))
+
+    def pending_units(self):
+        """Units still to play (or to replay with more games), per job, lowest first."""
+        return {name: [unit for unit in range(self.num_units(name))
+                       if self.completed[name].get(unit, 0) < self.unit_games(name, unit)]
+                for name in self.jobs}
+
+    def next_unit(self, pending, in_flight_games):
+        """
+        Pick the unit to start next: from the job with the largest fraction of
+        its target neither finished nor in flight (ties: spec order).
+        """
+        best, best_deficit = None, 0.0
+        for name, units in pending.items():
+            if not units:
+                continue
+            target = self.jobs[name]['games']
+            deficit = (target - self.games_done(name) - in_flight_games.get(name, 0)) / target
+            if best is None or deficit > best_deficit:
+                best, best_deficit = name, deficit
+        if best is None:
+            return None
+        return best, pending[best].pop(0)
+
+    def print_status(self):
+        pending = self.pending_units()
+        total_done = total = 0
+        for name, job in self.jobs.items():
+            done = self.games_done(name)
+            total_done += done
+            total += job['games']
+            pairing = f"d{job['player1_depth']}v{job['player2_depth']}"
+            print(f"{name:<12} {pairing:<5} {done:6d}/{job['games']:<6d} games ({self.num_units(name) - len(pending[name])}/{self.num_units(name)} units)")
+        print(f"{'total':<12} {'':5} {total_done:6d}/{total:<6d} games")
+
+    def run(self):
+        """Play every unfinished unit; returns the number of units played."""
+        pending = self.pending_units()
+        num_pending = sum(len(units) for units in pending.values())
+        print(f"{num_pending} units to go on {self.workers} workers")
+        self.print_status()
+
+        in_flight = {}
+        in_flight_games = {}
+        max_in_flight = 2 * self.workers
+        writing = {}  # unit file -> (job, unit, games), queued to the writer
+        played = moves = 0
+        start = time.perf_counter()
+
+        def checkpoint_written():
+            nonlocal played
+            for path in writer.files[played:]:
+                name, unit, games = writing.pop(path)
+                self.complete_unit(name, unit, games)
+                played += 1
+                elapsed = time.perf_counter() - start
+                print(f"{name} unit {unit} done ({played}/{num_pending}, {self.games_done(name)}/"
+                      f"{self.jobs[name]['games']} games, {moves / elapsed:.0f} moves/s)")
+
+        with GameWriter(self.output_dir, queue_size=self.workers) as writer, \
+                ProcessPoolExecutor(self.workers) as pool:
+            while True:
+                while len(in_flight) < max_in_flight:
+                    picked = self.next_unit(pending, in_flight_games)
+                    if picked is None:
+                        break
+                    name, unit = picked
+                    games = self.unit_games(name, unit)
+                    task = (self.jobs[name], unit, unit * self.unit_size, games, self.spec['lockstep_games'])
+                    in_flight[pool.submit(_play_unit, task)] = (name, games)
+                    in_flight_games[name] = in_flight_games.get(name, 0) + games
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, games = in_flight.pop(future)
+                    in_flight_games[name] -= games
+                    _, unit, unit_games = future.result()
+                    path = self.unit_path(name, unit)
+                    writing[path] = (name, unit, games)
+                    writer.write_file(path, unit_games)
+                    moves += sum(game_data['total_moves'] for game_data in unit_games)
+                checkpoint_written()
+
+        checkpoint_written()  # units completed when the writer was closed
+        self.print_status()
+        return played
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate games from a resumable job spec")
+    parser.add_argument("--spec", default="generation_jobs.json", help="Job spec (JSON)")
+    parser.add_argument("--output-dir", default=None, help="Override the spec's output directory")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: all CPUs)")
+    parser.add_argument("--status", action="store_true", help="Only show the progress of every job")
+
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    if args.output_dir:
+        spec['output_dir'] = args.output_dir
+    scheduler = JobScheduler(spec, args.workers)
+    if args.status:
+        scheduler.print_status()
+    else:
+        scheduler.run()
+
+
+if __name__ == "__main__":
+    main()
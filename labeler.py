@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Label corpus positions with a configurable-depth minimax search.
+
+Positions are read from the game pickles, split into chunks and scored
+across a process pool. Every finished chunk is written to disk straight
+away, so an interrupted run picks up where it stopped when started again
+with the same output directory.
+
+With --augment, the labelled corpus is also written with its colour-swapped
+positions added (see dataset.augment) to <output-dir>/augmented.
+
+Example:
+    python labeler.py --games-dir training_games --output-dir labelled --depth 6 --workers 8 --augment
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from checkers_types import minimax_possiblemove
+from dataset import augment, collect_positions, decode_board, save_arrays, load_arrays, load_metadata
+
+
+def search_label(encoded, side_to_move, depth):
+    """
+    Score a single position with minimax.
+
+    The search runs from the side to move; the result is returned from the
+    strong bot's perspective so it is comparable with 'board_value'.
+    """
+    board = decode_board(encoded)
+    board.side_to_move = side_to_move
+
+    value = minimax_possiblemove(board, alpha=-10000, beta=10000, isMaximizing=True, depth=depth)
+    return value if side_to_move == 1 else -value
+
+
+def _label_chunk(args):
+    """Worker entry point: label one chunk of positions."""
+    chunk_idx, positions, side_to_move, depth = args
+    labels = np.zeros(len(positions), dtype=np.float32)
+    for i in range(len(positions)):
+        labels[i] = search_label(positions[i], int(side_to_move[i]), depth)
+    return chunk_idx, labels
+
+
+class PositionLabeler:
+    """
+    Label every position of a game corpus with a deep search value.
+
+    Output directory layout:
+        positions.npy, side_to_move.npy, static_labels.npy  - extracted corpus
+        chunks/labels_XXXXXX.npy                            - finished chunks (checkpoints)
+        labels.npy                                          - final labels, float32
+        metadata.json                                       - run parameters
+        augmented/                                          - optional colour-swap augmented corpus
+    """
+
+    def __init__(self, output_dir="labelled", depth=6, chunk_size=256, workers=None, augment=False):
+        self.output_dir = output_dir
+        self.augment = augment
+        self.depth = depth
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+        self.chunks_dir = os.path.join(output_dir, "chunks")
+        os.makedirs(self.chunks_dir, exist_ok=True)
+
+    def chunk_path(self, chunk_idx):
+        return os.path.join(self.chunks_dir, f"labels_{chunk_idx:06d}.npy")
+
+    def prepare(self, games_dir):
+        """
+        Extract positions from the corpus, or reuse the ones from a previous run.
+
+        Reusing the saved arrays keeps chunk boundaries stable across resumes
+        even if new games were added to the corpus in the meantime.
+        """
+        metadata = load_metadata(self.output_dir)
+        if metadata:
+            if metadata['depth'] != self.depth or metadata['chunk_size'] != self.chunk_size:
+                raise ValueError(
+                    f"{self.output_dir} was started with depth={metadata['depth']}, "
+                    f"chunk_size={metadata['chunk_size']}; use a new output directory"
+                )
+            print(f"Resuming: {metadata['num_positions']} positions from {self.output_dir}")
+            return load_arrays(self.output_dir, ('positions', 'side_to_move'))
+
+        arrays = collect_positions(games_dir)
+        metadata = {
+            'games_dir': games_dir,
+            'depth': self.depth,
+            'chunk_size': self.chunk_size,
+            'num_positions': len(arrays['positions']),
+        }
+        save_arrays(self.output_dir, arrays, metadata)
+        print(f"Collected {metadata['num_positions']} positions from {games_dir}")
+        return arrays
+
+    def save_chunk(self, chunk_idx, labels):
+        """Write a finished chunk atomically so a crash never leaves a partial checkpoint."""
+        path = self.chunk_path(chunk_idx)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, labels)
+        os.replace(tmp_path, path)
+
+    def run(self, games_dir):
+        """Label all positions, skipping chunks finished by earlier runs."""
+        arrays = self.prepare(games_dir)
+        positions = arrays['positions']
+        side_to_move = arrays['side_to_move']
+
+        num_chunks = self.num_chunks(arrays)
+        pending = [i for i in range(num_chunks) if not os.path.exists(self.chunk_path(i))]
+
+        print(f"Depth {self.depth}: {num_chunks - len(pending)}/{num_chunks} chunks already done, "
+              f"{len(pending)} to go on {self.workers} workers")
+
+        tasks = (
+            (i, positions[i * self.chunk_size:(i + 1) * self.chunk_size],
+             side_to_move[i * self.chunk_size:(i + 1) * self.chunk_size], self.depth)
+            for i in pending
+        )
+
+        start = time.perf_counter()
+        with Pool(self.workers) as pool:
+            for done, (chunk_idx, labels) in enumerate(pool.imap_unordered(_label_chunk, tasks), 1):
+                self.save_chunk(chunk_idx, labels)
+                elapsed = time.perf_counter() - start
+                print(f"Chunk {chunk_idx} done ({done}/{len(pending)}, "
+                      f"{done * self.chunk_size / elapsed:.1f} positions/s)")
+
+        return self.finish(arrays)
+
+    def num_chunks(self, arrays):
+        return (len(arrays['positions']) + self.chunk_size - 1) // self.chunk_size
+
+    def finish(self, arrays):
+        """Combine the finished chunks into labels.npy (and the augmented corpus)."""
+        num_chunks = self.num_chunks(arrays)
+        labels = np.concatenate([np.load(self.chunk_path(i)) for i in range(num_chunks)]) \
+            if num_chunks else np.zeros(0, dtype=np.float32)
+        np.save(os.path.join(self.output_dir, "labels.npy"), labels)
+        print(f"Wrote {len(labels)} labels to {os.path.join(self.output_dir, 'labels.npy')}")
+
+        if self.augment:
+            self.save_augmented(arrays, labels)
+        return labels
+
+    def save_augmented(self, arrays, labels):
+        """Write the corpus plus colour-swapped positions to <output_dir>/augmented."""
+        corpus = {
+            'positions': np.asarray(arrays['positions']),
+            'side_to_move': np.asarray(arrays['side_to_move']),
+            'static_labels': np.asarray(load_arrays(self.output_dir, ('static_labels',))['static_labels']),
+            'labels': labels,
+        }
+        augmented = augment(corpus, label_names=('static_labels', 'labels'))
+        augmented_dir = os.path.join(self.output_dir, "augmented")
+        save_arrays(augmented_dir, augmented, {
+            'source': self.output_dir,
+            'depth': self.depth,
+            'num_positions': len(augmented['positions']),
+            'symmetries': ['colour_swap'],
+        })
+        print(f"Wrote {len(augmented['positions'])} augmented positions "
+              f"({len(labels)} before augmentation and deduplication) to {augmented_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label corpus positions with deep minimax search")
+    parser.add_argument("--games-dir", default="training_games",
+                        help="Directory containing game pickle files")
+    parser.add_argument("--output-dir", default="labelled",
+                        help="Directory for label arrays and checkpoints")
+    parser.add_argument("--depth", type=int, default=6,
+                        help="Minimax depth used for each label")
+    parser.add_argument("--chunk-size", type=int, default=256,
+                        help="Positions per work unit / checkpoint")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: all CPUs)")
+    parser.add_argument("--augment", action="store_true",
+                        help="Also write the corpus with colour-swapped positions added")
+
+    args = parser.parse_args()
+
+    labeler = PositionLabeler(args.output_dir, args.depth, args.chunk_size, args.workers, args.augment)
+    labeler.run(args.games_dir)
+
+
+if __name__ == "__main__":
+    main()
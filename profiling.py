@@ -0,0 +1,282 @@
+"""
+Profiling for the generator and benchmark entry points (--profile).
+
+Two modes:
+    cprofile  deterministic: cProfile over the run; exact call counts and
+              per-function self / cumulative time (profile.prof, loadable
+              with pstats or snakeviz)
+    sample    statistical: a thread samples the profiled thread's stack
+              every --profile-interval seconds; low overhead and complete
+              stacks, written as collapsed stacks for flame graphs
+              (flamegraph.pl, speedscope, inferno)
+
+Both write the per-function table (functions.txt) and a breakdown of the
+time into the hot-path categories of PROFILE_CATEGORIES (breakdown.txt):
+
+    movegen  legal move generation (Board.returnPossibleMoves, arraymoves)
+    eval     position evaluation (evaluators, Board.estimateAdvantage)
+    search   the search itself: negamax and its drivers, hashing, history
+    flip     changing the point of view (flipSides, swap_side, materialize)
+    save     encoding and writing games (gamerecord, pickle, GameWriter)
+    other    everything else (game loop, random moves, interpreter)
+
+Time of a function outside the categories (a builtin such as list.append,
+copy.deepcopy) is charged to the category of its nearest categorized
+caller, so "search" is the search's own overhead, not its children.
+
+Example:
+    python benchmark.py run --games 2 --profile sample --profile-output profile_out
+    python gamegenerator.py --profile cprofile --profile-games 20
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# category -> (file name, function name or '*'); the first matching rule wins
+PROFILE_CATEGORIES = {
+    'save': [
+        ('gamerecord.py', '*'), ('gamewriter.py', '*'), ('jobscheduler.py', 'write_games'),
+        ('gamegenerator.py', 'save_game'), ('~', "<built-in method _pickle.dump>"),
+        ('~', "<built-in method posix.fsync>"), ('~', "<built-in method posix.replace>"),
+    ],
+    'flip': [
+        ('checkers_types.py', 'flipSides'), ('checkers_types.py', 'swap_side'),
+        ('checkers_types.py', 'materialize'),
+    ],
+    'movegen': [
+        ('checkers_types.py', 'returnPossibleMoves'), ('checkers_types.py', 'get_possible_moves_for_piece'),
+        ('checkers_types.py', 'dfs'), ('checkers_types.py', 'inside'), ('checkers_types.py', 'clone_board'),
+        ('checkers_types.py', '_generate_moves'), ('checkers_types.py', 'lookup'), ('checkers_types.py', 'store'),
+        ('checkers_types.py', '_freeze'), ('arraymoves.py', '*'),
+    ],
+    'eval': [
+        ('evaluators.py', '*'), ('checkers_types.py', 'estimateAdvantage'), ('checkers_types.py', 'squeeze'),
+    ],
+    'search': [
+        ('checkers_types.py', 'negamax'), ('checkers_types.py', '_negamax_leaves'),
+        ('checkers_types.py', '_search_child'), ('checkers_types.py', '_search'),
+        ('checkers_types.py', 'minimax_possiblemove'), ('checkers_types.py', 'pvs_search'),
+        ('checkers_types.py', 'search_root'), ('checkers_types.py', 'aspiration_search'),
+        ('checkers_types.py', 'iterative_deepening'), ('checkers_types.py', 'enter_root'),
+        ('checkers_types.py', 'record'), ('checkers_types.py', 'key'), ('checkers_types.py', 'is_progress'),
+        ('checkers_types.py', '__contains__'), ('selfplay.py', 'lockstep_search'), ('zobrist.py', '*'),
+    ],
+}
+
+CATEGORY_ORDER = ('movegen', 'eval', 'search', 'flip', 'save', 'other')
+
+
+def categorize(filename, function):
+    """Category of a function (None if it is in none of PROFILE_CATEGORIES)."""
+    basename = os.path.basename(filename)
+    for category, rules in PROFILE_CATEGORIES.items():
+        for rule_file, rule_function in rules:
+            if rule_file == basename and rule_function in ('*', function):
+                return category
+    return None
+
+
+def function_name(func):
+    """'file:line(function)' of a pstats function key, as pstats prints it."""
+    filename, line, function = func
+    if filename == '~':
+        return function
+    return f"{os.path.basename(filename)}:{line}({function})"
+
+
+class Profiler:
+    """
+    Profile a block of code:
+
+        with Profiler('sample') as profiler:
+            run_benchmark()
+        profiler.write('profile_out')
+    """
+
+    def __init__(self, mode='cprofile', interval=0.001):
+        """
+        Args:
+            mode: 'cprofile' (deterministic) or 'sample' (statistical)
+            interval: Seconds between stack samples in 'sample' mode; the
+                effective rate is also limited by sys.getswitchinterval()
+        """
+        if mode not in ('cprofile', 'sample'):
+            raise ValueError(f"Unknown profile mode '{mode}', expected 'cprofile' or 'sample'")
+        self.mode = mode
+        self.interval = interval
+        self.seconds = 0.0
+        self.profile = None
+        self.stacks = Counter()  # sample mode: tuple of pstats function keys (outermost first) -> samples
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        if self.mode == 'cprofile':
+            self.profile.disable()
+        else:
+            self._stop.set()
+            self._sampler.join()
+        self.seconds = time.perf_counter() - self._start_time
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _sample(self, thread_id):
+        """Sampler thread: record the stack of the profiled thread until stopped."""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def function_stats(self):
+        """
+        Per-function rows, most self time first:
+            (function key, calls, self seconds, cumulative seconds)
+        In sample mode calls is None and the times are estimated from the
+        share of samples (self: innermost frame, cumulative: anywhere on the stack).
+        """
+        if self.mode == 'cprofile':
+            stats = pstats.Stats(self.profile).stats
+            rows = [(func, nc, tt, ct) for func, (cc, nc, tt, ct, callers) in stats.items()]
+        else:
+            per_sample = self.seconds / max(self.samples, 1)
+            own, anywhere = Counter(), Counter()
+            for stack, count in self.stacks.items():
+                own[stack[-1]] += count
+                for func in set(stack):
+                    anywhere[func] += count
+            rows = [(func, None, own[func] * per_sample, anywhere[func] * per_sample) for func in anywhere]
+        return sorted(rows, key=lambda row: (-row[2], -row[3]))
+
+    def breakdown(self):
+        """Seconds per category of CATEGORY_ORDER; they add up to the profiled time."""
+        seconds = Counter({category: 0.0 for category in CATEGORY_ORDER})
+        if self.mode == 'sample':
+            per_sample = self.seconds / max(self.samples, 1)
+            for stack, count in self.stacks.items():
+                category = next((c for c in map(lambda f: categorize(f[0], f[2]), reversed(stack)) if c), 'other')
+                seconds[category] += count * per_sample
+            return dict(seconds)
+
+        stats = pstats.Stats(self.profile).stats
+        resolved = {}
+
+        def category_of(func, visiting=()):
+            """Own category, else that of the callers, weighted by the time spent under each caller."""
+            if func in resolved:
+                return resolved[func]
+            own = categorize(func[0], func[2])
+            if own is not None:
+                shares = {own: 1.0}
+            else:
+                callers = stats.get(func, (0, 0, 0, 0, {}))[4]
+                total = sum(caller_stats[2] for caller_stats in callers.values())
+                shares = Counter()
+                for caller, caller_stats in callers.items():
+                    if caller in visiting or total == 0:
+                        continue
+                    for category, share in category_of(caller, visiting + (func,)).items():
+                        shares[category] += share * caller_stats[2] / total
+                if not shares:
+                    shares = {'other': 1.0}
+            resolved[func] = shares
+            return shares
+
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            for category, share in category_of(func).items():
+                seconds[category] += tt * share
+        # Time outside any profiled function (start-up of the profiler itself)
+        seconds['other'] += max(0.0, self.seconds - sum(seconds.values()))
+        return dict(seconds)
+
+    def format_breakdown(self):
+        breakdown = self.breakdown()
+        total = sum(breakdown.values()) or 1.0
+        lines = [f"{'category':<10} {'seconds':>9} {'share':>7}"]
+        for category in CATEGORY_ORDER:
+            lines.append(f"{category:<10} {breakdown[category]:9.3f} {breakdown[category] / total:6.1%}")
+        lines.append(f"{'total':<10} {total:9.3f}")
+        return "\n".join(lines)
+
+    def format_functions(self, top=None):
+        rows = self.function_stats()[:top]
+        lines = [f"{'calls':>10} {'self s':>9} {'cum s':>9}  {'category':<8} function"]
+        for func, calls, own, cumulative in rows:
+            category = categorize(func[0], func[2]) or '-'
+            calls = '' if calls is None else calls
+            lines.append(f"{calls:>10} {own:9.4f} {cumulative:9.4f}  {category:<8} {function_name(func)}")
+        return "\n".join(lines)
+
+    def collapsed_stacks(self):
+        """Lines 'outer;...;inner count' (sample mode), the input format of flame graph tools."""
+        return [f"{';'.join(function_name(func) for func in stack)} {count}"
+                for stack, count in sorted(self.stacks.items())]
+
+    def write(self, output_dir, top=50):
+        """
+        Write the profile to output_dir and print the breakdown.
+
+        Returns: List of written files
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+
+        def write_text(name, text):
+            path = os.path.join(output_dir, name)
+            with open(path, 'w') as f:
+                f.write(text + "\n")
+            written.append(path)
+
+        write_text("breakdown.txt", self.format_breakdown())
+        write_text("functions.txt", self.format_functions())
+        if self.mode == 'cprofile':
+            path = os.path.join(output_dir, "profile.prof")
+            self.profile.dump_stats(path)
+            written.append(path)
+        else:
+            write_text("stacks.collapsed", "\n".join(self.collapsed_stacks()))
+
+        detail = f"{self.samples} samples" if self.mode == 'sample' else "cProfile"
+        print(f"\nProfile ({detail}, {self.seconds:.3f}s):")
+        print(self.format_breakdown())
+        print(f"\nTop functions by self time:")
+        print(self.format_functions(top=min(top, 15)))
+        print(f"\nWrote {', '.join(written)}")
+        return written
+
+
+def add_profile_arguments(parser):
+    """The --profile options shared by the entry points."""
+    parser.add_argument("--profile", choices=("cprofile", "sample"), default=None,
+                        help="Profile the run: deterministic (cprofile) or statistical (sample)")
+    parser.add_argument("--profile-output", default="profile_out", help="Directory for the profile files")
+    parser.add_argument("--profile-interval", type=float, default=0.001,
+                        help="Seconds between stack samples (--profile sample)")
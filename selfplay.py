@@ -0,0 +1,306 @@
+"""
+Lockstep self-play: many generator games advanced together.
+
+Low-depth searches are tiny, so playing games one at a time spends most of
+the time in per-call overhead. LockstepSelfPlay keeps `lockstep_games`
+games in flight; on every step it expands the search trees of all games
+that need a move level by level, scores all their leaves with one
+evaluator.evaluate_batch() call and backs the values up with NumPy.
+
+The searches are full width (no alpha-beta cutoffs), which is cheaper than
+per-node overhead only at low depth; players deeper than max_batch_depth
+fall back to minimax_possiblemove. Scores, draw handling and tie-breaking
+follow negamax() exactly, so with the default StaticEvaluator every game is
+identical to GameGenerator.generate_game with the same seed and settings.
+"""
+
+import random
+
+import numpy as np
+
+from arraymoves import generate_children, to_cells
+from checkers_types import Board, PositionHistory, minimax_possiblemove
+from dataset import encode_boards
+from evaluators import StaticEvaluator
+from gamegenerator import decide_random_move, game_end_after_move, game_settings, game_winner, make_game_data
+from gamerecord import encode_move
+from zobrist import hash_positions
+
+
+class LockstepGame:
+    """
+    One game of a lockstep run; the same rules and game_data as generate_game
+    (the helpers of gamegenerator.py).
+
+    Each move is begin_move(), choose_move() with the legal moves, and, when
+    that asks for a search, finish_move() with the chosen board.
+    """
+
+    def __init__(self, player1_depth, player2_depth, max_moves=200, random_move_chance=0.0,
+                 initial_random_moves=0, repetition_limit=3, no_progress_limit=40, seed=None):
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.player1_depth = player1_depth
+        self.player2_depth = player2_depth
+        self.max_moves = max_moves
+        self.random_move_chance = random_move_chance
+        self.initial_random_moves = initial_random_moves
+        self.settings = game_settings(max_moves, random_move_chance, initial_random_moves, 0,
+                                      repetition_limit, no_progress_limit)
+
+        self.board = Board()
+        self.start_board = self.board.squeeze()
+        self.moves = []
+        self.board_values = []
+        self.move_types = []
+        self.move_count = 0
+        self.current_player = 1
+        self.termination = 'move_limit'
+        self.winner = None
+        self.history = PositionHistory(repetition_limit, no_progress_limit)
+        self.history.record(self.board.board, self.current_player)
+        self.board_before = None
+
+    @property
+    def done(self):
+        return self.winner is not None
+
+    @property
+    def depth(self):
+        return self.player1_depth if self.current_player == 1 else self.player2_depth
+
+    def end(self, termination):
+        self.winner = game_winner(termination, self.current_player)
+        self.termination = termination
+        self.board.side_to_move = 1
+
+    def begin_move(self):
+        """
+        Start the next move; returns False if the game ended on the move limit.
+        The caller then generates the moves of self.board and calls choose_move().
+        """
+        if self.move_count >= self.max_moves:
+            self.end('move_limit')
+            return False
+
+        self.move_count += 1
+        self.board_before = [row[:] for row in self.board.board]
+        self.board.side_to_move = self.current_player
+        return True
+
+    def choose_move(self, possible_moves):
+        """
+        Handle the legal moves (in returnPossibleMoves order, any representation
+        that to_cells() accepts): end the game without moves, or play a random move.
+
+        Returns: True if the move has to come from a search.
+        """
+        if not len(possible_moves):
+            self.end('no_moves')
+            return False
+
+        use_random, self.initial_random_moves = decide_random_move(self.rng, self.initial_random_moves,
+                                                                   self.random_move_chance)
+
+        if use_random:
+            self.finish_move(to_cells(possible_moves[self.rng.choice(range(len(possible_moves)))]), 'random')
+            return False
+        return True
+
+    def finish_move(self, best_board, move_type='minimax'):
+        """Apply the chosen board (stored orientation) and check for the end of the game."""
+        if best_board is None:
+            self.end('no_moves')
+            return
+
+        board = self.board
+        board.board = best_board
+        board.side_to_move = 1
+
+        self.moves.append(encode_move(self.board_before, board.board))
+        self.board_values.append(board.estimateAdvantage())
+        self.move_types.append(move_type)
+
+        draw = game_end_after_move(self.board_before, board.board, self.history, self.current_player)
+        if draw:
+            self.end(draw)
+            return
+
+        self.current_player *= -1
+
+    def game_data(self):
+        """The finished game in the same layout as GameGenerator.generate_game."""
+        return make_game_data(self.seed, self.settings, self.player1_depth, self.player2_depth, self.move_count,
+                              self.winner, self.termination, self.start_board, self.moves, self.board_values,
+                              self.move_types, self.board.board)
+
+
+def lockstep_search(requests, evaluator=None):
+    """
+    Full-width negamax of several positions at once, one tree level at a time.
+
+    Args:
+        requests: List of (board, depth, history); history may be None
+        evaluator: Leaf evaluator (default StaticEvaluator); all leaves of all
+            requests are scored with a single evaluate_positions() call
+
+    Returns:
+        (best boards, positions searched); a best board is None when every
+        move loses, as with minimax_possiblemove(returnBoard=True)
+    """
+    evaluator = evaluator if evaluator is not None else StaticEvaluator()
+    num_roots = len(requests)
+
+    root_stm = np.array([board.side_to_move for board, _, _ in requests], dtype=np.int8)
+    histories = [history for _, _, history in requests]
+    has_history = np.array([history is not None for history in histories])
+    no_progress_limit = np.array([history.no_progress_limit if history is not None else 0
+                                  for history in histories])
+
+    # One entry per tree level; nodes keep the root's view, `side` is relative to the root's player
+    positions = [encode_boards([board.board for board, _, _ in requests])]
+    request = [np.arange(num_roots)]
+    parent = [np.full(num_roots, -1)]
+    side = [np.ones(num_roots, dtype=np.int8)]
+    depth_left = [np.array([depth for _, depth, _ in requests])]
+    no_progress = [np.array([history.no_progress if history is not None else 0 for history in histories])]
+    keys = [hash_positions(positions[0], root_stm)]
+    drawn = [np.zeros(num_roots, dtype=bool)]
+    offsets = [0]  # index of each level's first node in the flattened tree
+
+    while True:
+        level = len(positions) - 1
+        expand = np.nonzero((depth_left[level] > 0) & ~drawn[level])[0]
+        if not len(expand):
+            break
+
+        movers = side[level][expand] * root_stm[request[level][expand]]
+        local_parents, children, has_capture, progress = generate_children(positions[level][expand], movers)
+        parents = expand[local_parents]
+        child_request = request[level][parents]
+        child_no_progress = np.where(has_capture[local_parents] | progress, 0, no_progress[level][parents] + 1)
+        child_keys = hash_positions(children, -movers[local_parents])
+
+        # Draws: repeats a game position or one on the path from the root, or hits the no-progress limit
+        child_drawn = (no_progress_limit[child_request] > 0) & (child_no_progress >= no_progress_limit[child_request])
+        ancestors = parents
+        for lvl in range(level, -1, -1):
+            child_drawn |= child_keys == keys[lvl][ancestors]
+            if lvl > 0:
+                ancestors = parent[lvl][ancestors] - offsets[lvl - 1]
+        child_drawn &= has_history[child_request]  # draw rules only apply with a history
+        for i in np.nonzero(~child_drawn & has_history[child_request])[0].tolist():
+            if int(child_keys[i]) in histories[child_request[i]]:
+                child_drawn[i] = True
+
+        positions.append(children)
+        request.append(child_request)
+        parent.append(parents + offsets[level])
+        side.append(-side[level][parents])
+        depth_left.append(depth_left[level][parents] - 1)
+        no_progress.append(child_no_progress)
+        keys.append(child_keys)
+        drawn.append(child_drawn)
+        offsets.append(offsets[level] + len(positions[level]))
+
+    # Interior nodes start at -10000 (also the score of a node without moves), draws at 0, leaves evaluated
+    # for their player to move: the root's view times `side`, as negamax scores them
+    all_drawn = np.concatenate(drawn)
+    leaves = (np.concatenate(depth_left) == 0) & ~all_drawn
+    values = np.full(len(all_drawn), -10000.0)
+    values[all_drawn] = 0.0
+    if leaves.any():
+        values[leaves] = np.concatenate(side)[leaves] * evaluator.evaluate_positions(
+            np.concatenate(positions)[leaves], root_stm[np.concatenate(request)[leaves]])
+
+    # Back up one level at a time from the deepest: value = max over children of -child value
+    for level in range(len(positions) - 1, 0, -1):
+        lo = offsets[level]
+        np.maximum.at(values, parent[level], -values[lo:lo + len(positions[level])])
+
+    # Root move: the first child with the best score, as negamax picks it
+    best_boards = [None] * num_roots
+    if len(positions) > 1:
+        scores = -values[offsets[1]:offsets[1] + len(positions[1])]
+        best_scores = np.full(num_roots, -10000.0)
+        for i, root in enumerate(parent[1].tolist()):
+            if scores[i] > best_scores[root]:
+                best_scores[root] = scores[i]
+                best_boards[root] = i
+        best_boards = [None if i is None else to_cells(positions[1][i]) for i in best_boards]
+
+    return best_boards, len(values)
+
+
+class LockstepSelfPlay:
+    """Generate games with LockstepGame, `lockstep_games` at a time."""
+
+    def __init__(self, num_games, player1_depth, player2_depth, max_moves=200, random_move_chance=0.0,
+                 initial_random_moves=0, repetition_limit=3, no_progress_limit=40, seed=None,
+                 lockstep_games=32, max_batch_depth=3, evaluator=None):
+        """
+        Args:
+            num_games: Number of games to play
+            player1_depth / player2_depth ... no_progress_limit: as for GameGenerator.generate_game
+            seed: Optional base seed; game i is played with seed + i
+            lockstep_games: Games advanced together
+            max_batch_depth: Deeper players are searched one position at a time with minimax_possiblemove
+            evaluator: Leaf evaluator for the batched searches (default StaticEvaluator)
+        """
+        self.num_games = num_games
+        self.game_args = dict(player1_depth=player1_depth, player2_depth=player2_depth, max_moves=max_moves,
+                              random_move_chance=random_move_chance, initial_random_moves=initial_random_moves,
+                              repetition_limit=repetition_limit, no_progress_limit=no_progress_limit)
+        self.seed = seed
+        self.lockstep_games = lockstep_games
+        self.max_batch_depth = max_batch_depth
+        self.evaluator = evaluator if evaluator is not None else StaticEvaluator()
+        self.positions = 0  # positions generated by the searches
+
+    def _new_game(self, i):
+        return LockstepGame(seed=None if self.seed is None else self.seed + i, **self.game_args)
+
+    def run(self):
+        """Yield the game_data of each game as it finishes."""
+        started = 0
+        active = []
+
+        while active or started < self.num_games:
+            while started < self.num_games and len(active) < self.lockstep_games:
+                active.append(self._new_game(started))
+                started += 1
+
+            started_games = [game for game in active if game.begin_move()]
+            batched, deep = [], []
+            if started_games:
+                # Legal moves of every game in one pass; random moves are played right away
+                positions = encode_boards([game.board.board for game in started_games])
+                movers = [game.current_player for game in started_games]
+                parents, children, _, _ = generate_children(positions, movers)
+                bounds = np.searchsorted(parents, np.arange(len(started_games) + 1))
+                for i, game in enumerate(started_games):
+                    if game.choose_move(children[bounds[i]:bounds[i + 1]]):
+                        (batched if game.depth <= self.max_batch_depth else deep).append(game)
+
+            if batched:
+                requests = [(game.board, game.depth, game.history) for game in batched]
+                best_boards, positions = lockstep_search(requests, self.evaluator)
+                self.positions += positions
+                for game, best_board in zip(batched, best_boards):
+                    game.finish_move(best_board)
+
+            for game in deep:
+                best_board = minimax_possiblemove(game.board, alpha=-10000, beta=10000, isMaximizing=True,
+                                                  depth=game.depth, returnBoard=True, evaluator=self.evaluator,
+                                                  history=game.history)
+                game.finish_move(best_board)
+
+            still_active = []
+            for game in active:
+                if game.done:
+                    yield game.game_data()
+                else:
+                    still_active.append(game)
+            active = still_active
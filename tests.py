@@ -164,3 +164,825 @@ print(board.get_possible_moves_for_piece(3, 4))
 
 
 
+
+
+#test10
+print("\n\ntest10\n")
+import numpy as np
+from evaluators import NumpyEvaluator, static_weights
+
+np.savez("static_weights_test.npz", **static_weights())
+evaluator = NumpyEvaluator("static_weights_test.npz")
+
+_, boards = Board().returnPossibleMoves()
+batch_scores = evaluator.evaluate_batch([Board(b) for b in boards])
+for b, score in zip(boards, batch_scores):
+    print(f"heuristic: {Board(b).estimateAdvantage():.4f}  numpy linear: {score:.4f}")
+    assert abs(Board(b).estimateAdvantage() - score) < 1e-4
+
+import os
+os.remove("static_weights_test.npz")
+
+
+#test11
+print("\n\ntest11\n")
+from checkers_types import SearchStats, search_root, iterative_deepening
+
+board = Board([
+                [ 0, -1,  0, -1,  0,  0,  0, -1],
+                [-1,  0,  0,  0, -1,  0, -1,  0],
+               [ 0, -1,  0, -1,  0,  0,  0,  0],
+                [ 0,  0,  0,  0, -1,  0,  0,  0],
+                [ 0,  0,  0,  1,  0,  1,  0,  0],
+               [ 1,  0,  0,  0,  0,  0,  1,  0],
+               [ 0,  1,  0,  1,  0,  0,  0,  1],
+                [ 1,  0,  1,  0,  1,  0,  1,  0]
+            ])
+
+for depth in (3, 4, 5):
+    reference = minimax_possiblemove(board, -10000, 10000, depth=depth)
+    reference_board = minimax_possiblemove(board, -10000, 10000, depth=depth, returnBoard=True)
+    for algorithm in ("alphabeta", "pvs"):
+        stats = SearchStats()
+        score, best = search_root(board, depth, algorithm=algorithm, stats=stats)
+        print(f"depth {depth} {algorithm}: score={score} same_board={best == reference_board} {stats}")
+        assert score == reference and best == reference_board
+    best, _ = iterative_deepening(board, depth, algorithm="pvs", aspiration_window=0.25)
+    assert best == reference_board
+
+
+#test12
+print("\n\ntest12\n")
+board = Board()
+_, boards = board.returnPossibleMoves()
+board = Board(boards[0])
+
+view = Board([row[:] for row in board.board], side_to_move=-1)
+flipped = Board([row[:] for row in board.board]).flipSides()
+
+print(view.squeeze())
+assert view.squeeze() == flipped.squeeze()
+assert view.materialize().board == flipped.board
+assert view.estimateAdvantage() == -board.estimateAdvantage()
+
+_, view_moves = view.returnPossibleMoves()
+_, flipped_moves = flipped.returnPossibleMoves()
+print(f"view moves: {len(view_moves)}  flipped moves: {len(flipped_moves)}")
+assert sorted(Board(b).flipSides().board for b in view_moves) == sorted(flipped_moves)
+
+
+#test13
+print("\n\ntest13\n")
+from checkers_types import PositionHistory
+
+# Two kings each, shuffling back and forth: the third occurrence is a draw
+history = PositionHistory(repetition_limit=3)
+a = [[0] * 8 for _ in range(8)]
+a[7][0], a[0][7] = 2, -2
+b = [row[:] for row in a]
+b[7][0], b[6][1] = 0, 2
+
+result = None
+for cells, side in [(a, 1), (b, -1), (a, 1), (b, -1), (a, 1)]:
+    result = history.record(cells, side, progress=False)
+print(f"after shuffling: {result}")
+assert result == 'repetition'
+
+history = PositionHistory(repetition_limit=100, no_progress_limit=4)
+results = [history.record(a if i % 2 == 0 else b, 1 if i % 2 == 0 else -1, progress=False) for i in range(5)]
+print(f"no progress: {results}")
+assert results[-1] == 'no_progress'
+
+
+#test14
+print("\n\ntest14\n")
+from gamegenerator import GameGenerator, games_match
+from gamerecord import GameRecord, apply_move, encode_move
+
+game_data = GameGenerator(output_dir=None).generate_game(2, 2, max_moves=80, random_move_chance=0.2,
+                                                         initial_random_moves=4, verbose=False, seed=7)
+record = GameRecord(game_data, keyframe_interval=8)
+positions = [record.position_at(0)] + list(record.positions())
+print(f"{len(record)} moves, {len(record.keyframes)} keyframes, first moves: {record.moves[:4]}")
+
+for ply in range(len(record)):
+    assert encode_move(positions[ply], positions[ply + 1]) == record.moves[ply]
+    cells = [row[:] for row in positions[ply]]
+    apply_move(cells, record.moves[ply])
+    assert cells == positions[ply + 1] == record.position_at(ply + 1)
+assert positions[-1] == game_data['final_board']
+assert games_match(game_data, GameGenerator(output_dir=None).replay_game(game_data))
+
+
+#test15
+print("\n\ntest15\n")
+import numpy as np
+from dataset import augment, colour_swap, decode_board, encode_board, encode_boards
+
+_, boards = Board().returnPossibleMoves()
+encoded = encode_boards(boards)
+swapped = colour_swap(encoded)
+for b, s in zip(boards, swapped):
+    assert (s == encode_board(Board([row[:] for row in b]).flipSides())).all()
+
+corpus = {
+    'positions': np.concatenate([encoded, encoded[:2]]),
+    'side_to_move': np.full(len(encoded) + 2, -1, dtype=np.int8),
+    'static_labels': np.array([Board(b).estimateAdvantage() for b in boards + boards[:2]], dtype=np.float32),
+}
+augmented = augment(corpus)
+print(f"{len(corpus['positions'])} positions -> {len(augmented['positions'])} after augmentation")
+assert len(augmented['positions']) == 2 * len(encoded)
+for position, label in zip(augmented['positions'], augmented['static_labels']):
+    assert abs(decode_board(position).estimateAdvantage() - label) < 1e-4
+
+
+#test16
+print("\n\ntest16\n")
+import random
+from gamerecord import encode_move
+from zobrist import canonical_hash, hash_after_move, hash_cells, hash_child, hash_positions
+
+# Corpus of random playouts; every position is checked against the incremental hash
+rng = random.Random(3)
+seen = {}
+for game in range(600):
+    board = Board()
+    h = hash_cells(board.board, board.side_to_move)
+    for ply in range(80):
+        seen[(tuple(map(tuple, board.board)), board.side_to_move)] = h
+        _, children = board.returnPossibleMoves()
+        if not children:
+            break
+        child = rng.choice(children)
+        assert all(hash_child(h, board.board, other) == hash_cells(other, -board.side_to_move)
+                   for other in children)
+        h = hash_after_move(h, board.board, encode_move(board.board, child))
+        board = Board(child, -board.side_to_move)
+        assert h == hash_cells(board.board, board.side_to_move)
+
+hashes = list(seen.values())
+n = len(hashes)
+collisions = n - len(set(hashes))
+print(f"{n} distinct positions, {collisions} 64-bit collisions")
+assert collisions == 0
+
+# The low 20 bits should collide like a uniform random function would
+buckets = 2 ** 20
+expected = n - buckets * (1 - (1 - 1 / buckets) ** n)
+observed = n - len({h & (buckets - 1) for h in hashes})
+print(f"20-bit collisions: {observed}, expected {expected:.0f}")
+assert abs(observed - expected) < 5 * expected ** 0.5 + 5
+
+positions = [(cells, side) for cells, side in list(seen)[:2000]]
+vectorized = hash_positions(encode_boards([[list(row) for row in cells] for cells, _ in positions]),
+                            np.array([side for _, side in positions]))
+assert [int(h) for h in vectorized] == [seen[p] for p in positions]
+
+for cells, side in positions[:200]:
+    cells = [list(row) for row in cells]
+    swapped = Board([row[:] for row in cells]).flipSides().board
+    assert canonical_hash(cells, side) == canonical_hash(swapped, -side)
+
+
+#test17
+print("\n\ntest17\n")
+from evaluators import CachedEvaluator
+
+board = Board()
+for ply in range(6):
+    _, children = board.returnPossibleMoves()
+    board = Board(children[ply % len(children)], -board.side_to_move)
+board.side_to_move = 1
+
+cache = CachedEvaluator(size=1000)
+assert cache.size == 1024
+for depth in (3, 4, 5):
+    reference = minimax_possiblemove(board, -10000, 10000, depth=depth, returnBoard=True)
+    assert minimax_possiblemove(board, -10000, 10000, depth=depth, returnBoard=True, evaluator=cache) == reference
+print(cache)
+assert cache.hits > 0
+
+_, boards = board.returnPossibleMoves()
+boards = [Board(b) for b in boards]
+assert cache.evaluate_batch(boards + boards) == [b.estimateAdvantage() for b in boards + boards]
+
+
+#test18
+print("\n\ntest18\n")
+from checkers_types import PositionHistory
+
+kings = Board([row[:] for row in a])  # a king on each side, from test13
+for position in (board, kings):
+    for depth in (1, 2, 3, 4):
+        for algorithm in ("alphabeta", "pvs"):
+            history = PositionHistory(no_progress_limit=3)
+            history.record(position.board, 1)
+            expected = search_root(position, depth, algorithm=algorithm, history=history)
+            stats = SearchStats()
+            batched = search_root(position, depth, algorithm=algorithm, history=history, stats=stats,
+                                  batch_leaves=True)
+            print(f"depth {depth} {algorithm}: score={batched[0]} {stats}")
+            assert batched == expected
+
+
+#test19
+print("\n\ntest19\n")
+from arraymoves import generate_children, to_cells
+from evaluators import StaticEvaluator
+from gamegenerator import GameGenerator
+from selfplay import LockstepSelfPlay
+
+positions, movers, expected = [], [], []
+for cells, side in list(seen)[:500]:
+    position = Board([list(row) for row in cells], side)
+    _, children = position.returnPossibleMoves()
+    positions.append(position.board)
+    movers.append(side)
+    expected.append([Board(child, side).board for child in children])  # back to the stored orientation
+
+parents, children, _, _ = generate_children(encode_boards(positions), movers)
+generated = [[] for _ in positions]
+for parent, child in zip(parents.tolist(), children):
+    generated[parent].append(to_cells(child))
+assert generated == expected
+
+boards = [Board(b) for b in expected[0]]
+assert StaticEvaluator().evaluate_batch(boards).tolist() == [b.estimateAdvantage() for b in boards]
+
+generator = GameGenerator(output_dir=None)
+selfplay = LockstepSelfPlay(4, 2, 1, max_moves=40, random_move_chance=0.2, initial_random_moves=4, seed=50,
+                            lockstep_games=3)
+for game in selfplay.run():
+    reference = generator.generate_game(2, 1, max_moves=40, random_move_chance=0.2, initial_random_moves=4,
+                                        verbose=False, seed=game['seed'])
+    print(f"seed {game['seed']}: {game['total_moves']} moves, {game['termination']}")
+    assert games_match(game, reference)
+
+
+#test20
+print("\n\ntest20\n")
+import tempfile
+import time
+from gamerecord import read_games
+from gamewriter import GameWriter
+
+games = [GameGenerator(output_dir=None).generate_game(1, 1, max_moves=10, verbose=False, seed=s) for s in range(5)]
+with tempfile.TemporaryDirectory() as tmp:
+    with GameWriter(tmp, games_per_file=2, queue_size=1) as writer:
+        generator = GameGenerator(output_dir=tmp, writer=writer)
+        for game_data in games:
+            generator.save_game(game_data)
+    print(writer)
+    assert len(writer.files) == 3 and writer.games == 5
+    assert sorted(os.listdir(tmp)) == sorted(os.path.basename(path) for path in writer.files)
+    written = [game for path in writer.files for game in read_games(path)]
+    assert [g['game_id'] for g in written] == [g['game_id'] for g in games]
+    assert all(games_match(a, b) for a, b in zip(written, games))
+
+with tempfile.TemporaryDirectory() as tmp:
+    writer = GameWriter(tmp, games_per_file=10, flush_interval=0.05, fsync=False)
+    writer.write(games[0])
+    deadline = time.monotonic() + 5
+    while not writer.files and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(writer.files) == 1  # completed by the flush interval, before close()
+    writer.close()
+
+with tempfile.TemporaryDirectory() as tmp:
+    with GameWriter(tmp, games_per_file=2) as writer:
+        writer.write(games[0])
+        writer.write_file(os.path.join(tmp, "unit.pkl"), games[1:4])
+    assert writer.files[0] == os.path.join(tmp, "unit.pkl") and len(writer.files) == 2 and writer.games == 4
+    assert [g['game_id'] for g in read_games(writer.files[0])] == [g['game_id'] for g in games[1:4]]
+
+
+#test21
+print("\n\ntest21\n")
+from dataset import iter_game_files
+from jobscheduler import JobScheduler
+
+with tempfile.TemporaryDirectory() as tmp:
+    spec = {'output_dir': tmp, 'unit_size': 2, 'seed': 0, 'lockstep_games': 4, 'jobs': [
+        {'name': 'a', 'player1_depth': 1, 'player2_depth': 2, 'games': 3, 'max_moves': 12, 'seed': 100},
+        {'name': 'b', 'player1_depth': 2, 'player2_depth': 1, 'games': 1, 'max_moves': 12, 'seed': 200},
+    ]}
+    assert JobScheduler(spec, workers=2).run() == 3
+    assert JobScheduler(spec, workers=2).run() == 0  # everything checkpointed
+
+    spec['jobs'][0]['games'] = 5  # unit 1 grows from 1 to 2 games, unit 2 is new
+    assert JobScheduler(spec, workers=2).run() == 2
+
+    seeds = sorted(game['seed'] for path in iter_game_files(tmp) for game in read_games(path))
+    assert seeds == [100, 101, 102, 103, 104, 200]
+    unit = list(read_games(os.path.join(tmp, "a_u00001.pkl")))
+    reference = GameGenerator(output_dir=None).generate_game(1, 2, max_moves=12, verbose=False, seed=103)
+    assert games_match(unit[1], reference)
+
+
+#test22
+print("\n\ntest22\n")
+import json
+import socket
+import threading
+from distributed import Coordinator, GenerationSource, Worker
+
+with tempfile.TemporaryDirectory() as tmp:
+    spec['output_dir'] = tmp  # the two jobs of test21
+    coordinator = Coordinator(GenerationSource(JobScheduler(spec, workers=1)), host="127.0.0.1", port=0,
+                              lease_timeout=0.5, heartbeat_interval=0.1, linger=10)
+    server = threading.Thread(target=coordinator.serve)
+    server.start()
+
+    # A worker that takes a unit and goes silent: its lease times out and the unit is reassigned
+    silent = socket.create_connection(coordinator.address)
+    silent_file = silent.makefile('rwb')
+    for message in ({'type': 'hello', 'worker': 'silent'}, {'type': 'request'}):
+        silent_file.write((json.dumps(message) + "\n").encode())
+        silent_file.flush()
+        reply = json.loads(silent_file.readline())
+    assert reply['type'] == 'task'
+
+    workers = [Worker(*coordinator.address, name=f"w{i}") for i in range(2)]
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Its late result is a duplicate
+    result = {'type': 'result', 'unit': reply['unit'], 'lease': reply['lease'], 'result': []}
+    silent_file.write((json.dumps(result) + "\n").encode())
+    silent_file.flush()
+    assert json.loads(silent_file.readline()) == {'type': 'ack', 'accepted': False}
+    silent.close()
+    server.join()
+
+    print(f"{coordinator.completed} units, {coordinator.expired} expired, {coordinator.duplicates} duplicates")
+    assert coordinator.completed == 4 and coordinator.expired == 1 and coordinator.duplicates == 1
+    assert sum(worker.units for worker in workers) == 4
+    seeds = sorted(game['seed'] for path in iter_game_files(tmp) for game in read_games(path))
+    assert seeds == [100, 101, 102, 103, 104, 200]
+    unit = list(read_games(os.path.join(tmp, "a_u00001.pkl")))
+    assert games_match(unit[1], reference)
+
+
+#test23
+print("\n\ntest23\n")
+import socket
+from engineserver import EngineClient, EngineServer, position_to_text, text_to_position
+from tournament import EngineConfig
+
+assert text_to_position(position_to_text(board.board)) == board.board
+
+server = EngineServer("server:depth=3,cache=4096", ("127.0.0.1", 0), workers=2)
+server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+server_thread.start()
+
+local = EngineConfig("local", depth=3)
+requests = []
+position = Board()
+for ply in range(8):
+    _, children = position.returnPossibleMoves()
+    position = Board(children[ply % len(children)], -position.side_to_move)
+    requests.append(Board([row[:] for row in position.board], position.side_to_move))
+
+answers = {}
+
+def ask(client_id):
+    with EngineClient(server.address) as client:
+        assert client.ping()
+        for i, request in enumerate(requests):
+            answers[client_id, i] = client.best_move(request)
+
+clients = [threading.Thread(target=ask, args=(k,)) for k in range(3)]
+for thread in clients:
+    thread.start()
+for thread in clients:
+    thread.join()
+
+for i, request in enumerate(requests):
+    expected = local.search(request)[0]
+    assert all(answers[k, i][0] == expected for k in range(3))
+
+with EngineClient(server.address) as client:
+    best, info = client.best_move(requests[0], depth=6, node_limit=50)
+    assert info['nodes'] <= 51 and not info['cached']
+    again, info = client.best_move(requests[-1])
+    assert again == answers[0, len(requests) - 1][0] and info['cached']
+    stats = client.stats()
+    print(stats)
+    assert client.request("move abc 1").startswith("error")
+    # A search that fails in the worker is an error reply, not a dropped connection
+    reply = client.request(f"move {position_to_text(requests[0].board)} 1 depth=-1")
+    print(reply)
+    assert reply.startswith("error AssertionError") and client.ping()
+
+# A request line that is not UTF-8 gets an error reply and the connection stays open
+with socket.create_connection(server.address) as raw:
+    raw.sendall(b"move \xff\xfe 1\nping\n")
+    replies = raw.makefile('rb')
+    reply = replies.readline().decode()
+    print(reply.strip())
+    assert reply.startswith("error") and replies.readline() == b"pong\n"
+
+server.shutdown()
+server_thread.join()
+
+
+#test24
+print("\n\ntest24\n")
+import subprocess
+import sys
+from PIL import Image
+from gameexport import export_games, export_overview, list_games, select_games, sheet_plies
+from gamerecord import GameRecord
+from jobscheduler import write_games
+
+with tempfile.TemporaryDirectory() as tmp:
+    write_games(os.path.join(tmp, "games.pkl"), games[:3])
+    corpus = list_games(tmp)
+    assert [game_id for _, _, game_id in corpus] == [g['game_id'] for g in games[:3]]
+    picked = select_games(corpus, sample=2, seed=1)
+    assert picked == select_games(corpus, sample=2, seed=1) and len(picked) == 2
+
+    written = export_games(picked, os.path.join(tmp, "out"), formats=('sheet', 'gif'), workers=2,
+                           square_size=10, every=3, columns=4)
+    assert len(written) == 4
+    for _, index, game_id in picked:
+        record = GameRecord(games[index])
+        with Image.open(os.path.join(tmp, "out", f"game_{game_id}.gif")) as gif:
+            assert gif.n_frames == len(record) + 1
+        with Image.open(os.path.join(tmp, "out", f"game_{game_id}.png")) as sheet:
+            rows = (len(sheet_plies(record, 3)) + 3) // 4
+            assert sheet.size == (4 * 84 + 4, rows * 84 + 4)
+
+    overview = export_overview(corpus, os.path.join(tmp, "overview.png"), square_size=10, columns=2)
+    with Image.open(overview) as image:
+        assert image.size == (2 * 84 + 4, 2 * 84 + 4)
+
+    # An empty selection renders nothing
+    try:
+        export_overview([], os.path.join(tmp, "empty.png"))
+        assert False
+    except ValueError as e:
+        print(e)
+    result = subprocess.run([sys.executable, "gameexport.py", "--games-dir", tmp, "--output-dir",
+                             os.path.join(tmp, "none"), "--game-id", "missing", "--format", "sheet", "overview"],
+                            capture_output=True, text=True)
+    assert result.returncode == 0 and "no games selected" in result.stdout
+    assert not os.path.exists(os.path.join(tmp, "none"))
+
+
+#test25
+print("\n\ntest25\n")
+import sys
+sys.path.insert(0, os.path.join("training_data", "utility_small_scripts"))
+from labelstats import LabelStats, StreamingHistogram, stats_for_sources
+
+rng = np.random.default_rng(3)
+labels = np.concatenate([rng.normal(0, 30, 40000), rng.normal(400, 5, 2000)]).astype(np.float32)
+
+small = LabelStats().update(labels[:300])
+assert np.allclose(small.percentile([10, 25, 50, 90]), np.percentile(labels[:300], [10, 25, 50, 90]))
+
+stats = LabelStats(max_bins=512, k=200)
+for shard in np.array_split(labels, 7):
+    stats.merge(LabelStats(max_bins=512, k=200).update(shard))
+summary = stats.summary()
+print(summary, stats.sketch.size, len(stats.histogram.counts))
+assert summary['count'] == len(labels)
+assert np.isclose(summary['mean'], labels.astype(np.float64).mean())
+assert np.isclose(summary['std'], labels.astype(np.float64).std())
+assert summary['min'] == labels.min() and summary['max'] == labels.max()
+for q in (1, 25, 50, 75, 99):
+    assert abs((labels <= stats.percentile(q)).mean() * 100 - q) < 1.5
+assert stats.sketch.size < 2000 and len(stats.histogram.counts) <= 512
+
+counts, edges = stats.histogram_counts(bins=50)
+assert np.isclose(counts.sum(), len(labels))
+assert np.abs(counts - np.histogram(labels, edges)[0]).max() < 0.02 * len(labels)
+
+# Merging histograms of different widths matches one histogram of everything
+wide, narrow, whole = StreamingHistogram(64), StreamingHistogram(64), StreamingHistogram(64)
+wide.update(labels[:1000])
+narrow.update(labels[1000:1100] / 100)
+whole.update(np.concatenate([labels[:1000], labels[1000:1100] / 100]))
+wide.merge(narrow)
+assert wide.exponent == whole.exponent and wide.offset == whole.offset
+assert np.array_equal(wide.counts, whole.counts)
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.makedirs(os.path.join(tmp, "chunks"))
+    for i, shard in enumerate(np.array_split(labels, 3)):
+        np.save(os.path.join(tmp, "chunks", f"labels_{i:06d}.npy"), shard)
+    from_chunks = stats_for_sources([tmp], workers=2)
+    np.save(os.path.join(tmp, "labels.npy"), labels)
+    from_file = stats_for_sources([tmp], workers=1)
+    assert from_chunks.count == from_file.count == len(labels)
+    assert np.isclose(from_chunks.moments.mean, from_file.moments.mean)
+
+
+#test26
+print("\n\ntest26\n")
+from dataset import add_column, load_arrays, load_metadata, save_arrays
+
+with tempfile.TemporaryDirectory() as tmp:
+    save_arrays(tmp, {'labels': labels, 'positions': np.zeros((len(labels), 32), dtype=np.int8)}, {'depth': 6})
+    positions_mtime = os.path.getmtime(os.path.join(tmp, "positions.npy"))
+
+    normalized = add_column(tmp, 'normalized_labels', 'labels', 'tanh', chunk_rows=1000, divisor=30.0)
+    assert normalized.dtype == np.float32 and len(normalized) == len(labels)
+    assert np.allclose(normalized, np.tanh(labels.astype(np.float64) / 30.0), atol=1e-6)
+
+    add_column(tmp, 'normalized_labels', 'labels', 'tanh', chunk_rows=1000, divisor=100.0)  # re-tune
+    metadata = load_metadata(tmp)
+    assert metadata['depth'] == 6
+    assert metadata['columns']['normalized_labels'] == {
+        'source': 'labels', 'transform': 'tanh', 'params': {'divisor': 100.0}, 'dtype': 'float32'}
+    reloaded = load_arrays(tmp, ('normalized_labels',))['normalized_labels']
+    assert np.allclose(reloaded, np.tanh(labels.astype(np.float64) / 100.0), atol=1e-6)
+    assert os.path.getmtime(os.path.join(tmp, "positions.npy")) == positions_mtime
+    assert sorted(os.listdir(tmp)) == ['labels.npy', 'metadata.json', 'normalized_labels.npy', 'positions.npy']
+
+    try:
+        add_column(tmp, 'x', 'labels', 'log')
+        assert False
+    except ValueError as e:
+        print(e)
+
+
+#test27
+print("\n\ntest27\n")
+from profiling import Profiler, categorize
+
+assert categorize("/x/checkers_types.py", "returnPossibleMoves") == 'movegen'
+assert categorize("evaluators.py", "evaluate_positions") == 'eval'
+assert categorize("checkers_types.py", "flipSides") == 'flip'
+assert categorize("gamewriter.py", "_run") == 'save'
+assert categorize("gamegenerator.py", "generate_game") is None
+
+for mode in ('cprofile', 'sample'):
+    with tempfile.TemporaryDirectory() as tmp:
+        with Profiler(mode, interval=0.0005) as profiler:
+            game_data = GameGenerator(output_dir=None).generate_game(3, 2, max_moves=30, verbose=False, seed=7)
+            write_games(os.path.join(tmp, "games.pkl"), [game_data])
+        breakdown = profiler.breakdown()
+        print(mode, {category: round(seconds, 3) for category, seconds in breakdown.items()})
+        assert abs(sum(breakdown.values()) - profiler.seconds) < 0.05 * profiler.seconds + 0.01
+        written = profiler.write(os.path.join(tmp, "profile"))
+        assert all(os.path.getsize(path) > 0 for path in written)
+        if mode == 'sample':
+            assert profiler.samples > 0
+            assert all(line.rsplit(' ', 1)[1].isdigit() for line in profiler.collapsed_stacks())
+        else:
+            assert breakdown['movegen'] > 0 and breakdown['search'] > 0 and breakdown['eval'] > 0
+            assert any(calls for _, calls, _, _ in profiler.function_stats())
+
+
+#test28
+print("\n\ntest28\n")
+from checkers_types import BoardPool, SearchBoard, pvs_search
+
+assert not hasattr(Board(), '__dict__') and not hasattr(SearchBoard(None), '__dict__')
+pool = BoardPool(plies=2)
+first = pool.board(1, Board().board, -1)
+assert isinstance(first, Board) and first.side_to_move == -1
+assert pool.board(1, Board().board, 1) is first and pool.board(5, None, 1) is pool.boards[5]
+batch = pool.batch(2, [Board().board] * 3, 1)
+assert len(set(map(id, batch))) == 3 and pool.batch(2, [None] * 2, -1) == batch[:2]
+
+# Pooled boards give the same searches as fresh ones (the positions of the benchmark games)
+from benchmark import benchmark_positions
+for cells, side_to_move in benchmark_positions(every=9)[:12]:
+    board = Board(cells, side_to_move)
+    assert pvs_search(board, -10000, 10000, depth=4) == minimax_possiblemove(board, -10000, 10000, depth=4)
+    history = PositionHistory()
+    assert minimax_possiblemove(board, -10000, 10000, depth=3, returnBoard=True, history=history,
+                                evaluator=StaticEvaluator(), batch_leaves=True) == \
+        minimax_possiblemove(board, -10000, 10000, depth=3, returnBoard=True, history=history)
+
+
+#test29
+print("\n\ntest29\n")
+from checkers_types import MoveCache, get_move_cache, set_move_cache
+
+positions = benchmark_positions(every=7)
+expected = [(Board(cells, stm).returnPossibleMoves(), Board(cells, stm).returnPossibleMoves(forOpponent=True))
+            for cells, stm in positions]
+
+cache = MoveCache()
+assert set_move_cache(cache) is None and get_move_cache() is cache
+for _ in range(2):
+    for (cells, stm), (own, opponent) in zip(positions, expected):
+        assert Board(cells, stm).returnPossibleMoves() == own
+        assert Board(cells, stm).returnPossibleMoves(forOpponent=True) == opponent
+print(cache)
+assert cache.hits + cache.misses == 4 * len(positions) and cache.hits >= 2 * len(positions)
+
+# Changing a returned board (or the position) does not change what the cache answers
+board = Board(positions[0][0], positions[0][1])
+_, children = board.returnPossibleMoves()
+children[0][0][0] = 7
+assert board.returnPossibleMoves() == expected[0][0]
+
+small = MoveCache(max_bytes=20 * MoveCache.ENTRY_BYTES)
+set_move_cache(small)
+for cells, stm in positions:
+    Board(cells, stm).returnPossibleMoves()
+assert small.evictions > 0 and small.bytes <= small.max_bytes and len(small) < len(positions)
+
+# A search gives the same result with the cache
+set_move_cache(MoveCache())
+cached_best = [minimax_possiblemove(Board(cells, stm), -10000, 10000, depth=3, returnBoard=True)
+               for cells, stm in positions[:8]]
+assert set_move_cache(None) is not None
+assert cached_best == [minimax_possiblemove(Board(cells, stm), -10000, 10000, depth=3, returnBoard=True)
+                       for cells, stm in positions[:8]]
+
+
+#test30
+print("\n\ntest30\n")
+from selfplay import lockstep_search
+
+def plain_minimax(board, depth, maximizing):
+    """Textbook minimax, every leaf scored from the root's side."""
+    if depth == 0:
+        return board.estimateAdvantage()
+    _, children = board.returnPossibleMoves(forOpponent=not maximizing)
+    if not children:
+        return -10000 if maximizing else 10000
+    scores = [plain_minimax(Board(child, board.side_to_move), depth - 1, not maximizing) for child in children]
+    return max(scores) if maximizing else min(scores)
+
+# Odd and even depths agree with plain minimax, so both pick the best move for the root's player
+for cells, stm in benchmark_positions(every=25)[:6]:
+    position = Board(cells, stm)
+    _, children = position.returnPossibleMoves()
+    for depth in (1, 2, 3):
+        expected = max(plain_minimax(Board(child, stm), depth - 1, False) for child in children)
+        score = minimax_possiblemove(position, -10000, 10000, depth=depth)
+        batched, _ = search_root(position, depth, batch_leaves=True)
+        best = minimax_possiblemove(position, -10000, 10000, depth=depth, returnBoard=True)
+        (lockstep_best,), _ = lockstep_search([(position, depth, None)])
+        print(f"depth {depth}: minimax={expected} negamax={score} batched={batched}")
+        assert score == expected and batched == expected
+        assert plain_minimax(Board(best, stm), depth - 1, False) == expected
+        assert plain_minimax(Board(lockstep_best, stm), depth - 1, False) == expected
+        aspiration_best, _ = iterative_deepening(position, depth, aspiration_window=0.25)
+        assert plain_minimax(Board(aspiration_best, stm), depth - 1, False) == expected
+
+    # Depth 1 of a quiet position picks the child with the best static score
+    best = minimax_possiblemove(position, -10000, 10000, depth=1, returnBoard=True)
+    assert Board(best, stm).estimateAdvantage() == max(Board(child, stm).estimateAdvantage() for child in children)
+
+
+#test31
+print("\n\ntest31\n")
+from checkers_types import SearchContext, negamax
+
+# A capture on the horizon: 3.4 static, 7.1 once the capture is made
+cells = [[0] * 8 for _ in range(8)]
+cells[0][7] = -1
+cells[3][4] = -1
+cells[4][3] = 1
+cells[7][0] = 1
+cells[7][2] = 1
+board = Board(cells)
+quiet = negamax(SearchContext(), board, -10000, 10000, 0, 1)
+resolved = negamax(SearchContext(quiescence_nodes=50), board, -10000, 10000, 0, 1)
+print(f"static {quiet}  quiescence {resolved}")
+assert abs(quiet - 3.4) < 1e-9 and abs(resolved - 7.1) < 1e-9
+assert search_root(board, 1, quiescence_nodes=50)[0] == resolved
+
+# The same capture for the opponent, searched one ply below the root: positive for the opponent too
+mirrored = Board([row[:] for row in cells]).flipSides()
+assert abs(negamax(SearchContext(), mirrored, -10000, 10000, 0, -1) - 3.4) < 1e-9
+assert abs(negamax(SearchContext(quiescence_nodes=50), mirrored, -10000, 10000, 0, -1, 1) - 7.1) < 1e-9
+
+
+#test32
+print("\n\ntest32\n")
+from dataset import collect_positions, decode_board
+from gamerecord import GameRecord
+from labeler import PositionLabeler, search_label
+
+games = [GameGenerator(output_dir=None).generate_game(2, 1, max_moves=12, random_move_chance=0.2, verbose=False,
+                                                      seed=s) for s in (31, 32)]
+with tempfile.TemporaryDirectory() as tmp:
+    games_dir = os.path.join(tmp, "games")
+    generator = GameGenerator(output_dir=games_dir)
+    for game_data in games:
+        generator.save_game(game_data)
+
+    # Extraction: every position after a move, strong bot to move after the weak bot's moves
+    arrays = collect_positions(games_dir)
+    expected = [(cells, game['board_values'][i]) for game in map(GameRecord, games)
+                for i, cells in enumerate(game.positions())]
+    print(f"{len(arrays['positions'])} positions")
+    assert len(arrays['positions']) == len(expected) == sum(len(game['moves']) for game in games)
+    assert [decode_board(encoded).board for encoded in arrays['positions']] == [cells for cells, _ in expected]
+    assert np.allclose(arrays['static_labels'], [value for _, value in expected])
+    offset = len(games[0]['moves'])
+    assert list(arrays['side_to_move'][:4]) == [-1, 1, -1, 1] and arrays['side_to_move'][offset] == -1
+
+    # Labels keep the strong bot's sign on odd and even depths
+    for encoded, stm in list(zip(arrays['positions'], arrays['side_to_move']))[:6]:
+        stm = int(stm)
+        labels = [search_label(encoded, stm, depth) for depth in (1, 2, 3)]
+        reference = [stm * plain_minimax(Board(decode_board(encoded).board, stm), depth, True) for depth in (1, 2, 3)]
+        print(f"stm {stm:+d}: labels {labels}")
+        assert labels == reference
+
+    # Checkpoint / resume: finished chunks are kept, missing ones are labelled again
+    output_dir = os.path.join(tmp, "labelled")
+    labeler = PositionLabeler(output_dir, depth=2, chunk_size=8, workers=1)
+    labels = labeler.run(games_dir)
+    assert np.allclose(labels, [search_label(e, int(s), 2) for e, s in zip(arrays['positions'], arrays['side_to_move'])])
+
+    kept = np.full(8, 99.0, dtype=np.float32)
+    labeler.save_chunk(0, kept)
+    os.remove(labeler.chunk_path(1))
+    resumed = PositionLabeler(output_dir, depth=2, chunk_size=8, workers=1).run(games_dir)
+    assert np.array_equal(resumed[:8], kept) and np.array_equal(resumed[8:], labels[8:])
+    try:
+        PositionLabeler(output_dir, depth=3, chunk_size=8, workers=1).prepare(games_dir)
+        assert False
+    except ValueError as e:
+        print(e)
+
+
+#test33
+print("\n\ntest33\n")
+import math
+from tournament import Pairing, Tournament, elo_estimate, sprt_bounds, sprt_llr
+
+# +60 =20 -20: score 0.7, per-game variance 0.16, 95% margin 1.96 * sqrt(0.16 / 100) = 0.0784
+elo, lower, upper = elo_estimate(60, 20, 20)
+print(f"Elo {elo:+.2f} [{lower:+.2f}, {upper:+.2f}]")
+assert abs(elo - 400 * math.log10(0.7 / 0.3)) < 1e-9 and abs(elo - 147.19) < 0.01
+assert abs(lower - 86.22) < 0.01 and abs(upper - 218.25) < 0.01
+# +10 =0 -10: score 0.5, margin 1.96 * sqrt(0.25 / 20)
+assert elo_estimate(10, 0, 10) == (0.0, -elo_estimate(10, 0, 10)[2], elo_estimate(10, 0, 10)[2])
+assert abs(elo_estimate(10, 0, 10)[2] - 163.32) < 0.01
+assert elo_estimate(0, 0, 0) == (0.0, -math.inf, math.inf)
+# +8 =0 -0: no finite estimate; variance floored at 0.25 / 9, lower bound at score 1 - 1.96 * sqrt(0.25 / 72)
+elo, lower, upper = elo_estimate(8, 0, 0)
+assert elo == upper == math.inf and abs(lower - 353.66) < 0.01
+elo, low, high = elo_estimate(0, 0, 8)
+assert elo == low == -math.inf and abs(high + lower) < 1e-9
+
+# LLR = n (s1 - s0) (2 score - s0 - s1) / (2 variance) with s0 = 0.5, s1 = 1 / (1 + 10^(-10/400)) = 0.514387
+assert abs(sprt_llr(60, 20, 20, 0, 10) - 1.7337) < 1e-4
+assert abs(sprt_llr(10, 0, 10, 0, 10) - (-0.00828)) < 1e-5
+assert sprt_llr(0, 0, 0, 0, 10) == 0.0
+# Unanimous records use the variance floor 0.25 / (n + 1) and head for a bound
+assert abs(sprt_llr(0, 10, 0, 0, 10) - (-0.04554)) < 1e-5
+assert abs(sprt_llr(8, 0, 0, 0, 400) - 34.81) < 0.01
+assert sprt_llr(200, 0, 0, 0, 50) > sprt_llr(49, 1, 0, 0, 50) > 300
+assert all(abs(a - b) < 1e-4 for a, b in zip(sprt_bounds(0.05, 0.05), (-2.9444, 2.9444)))
+
+# Results count per colour pair, in whatever order the two games finish
+pairing = Pairing(EngineConfig('a'), EngineConfig('b'))
+assert not pairing.record_pair_game(1, 1) and not pairing.record_pair_game(0, 0.5)
+assert pairing.games == 0
+assert pairing.record_pair_game(1, 0) and pairing.games == 2 and (pairing.wins, pairing.losses) == (1, 1)
+assert pairing.record_pair_game(0, 0.5) and pairing.draws == 2
+
+# A one-sided match is stopped by the SPRT, in whole colour pairs
+tournament = Tournament([EngineConfig('a', depth=3), EngineConfig('b', depth=1)], games_per_pairing=8,
+                        max_moves=60, workers=2, sprt={'elo0': 0, 'elo1': 400, 'alpha': 0.05, 'beta': 0.05})
+pairing, = tournament.run()
+print(pairing.summary())
+assert pairing.decision == 'H1' and pairing.games % 2 == 0 and pairing.games < 8
+
+# A worker keeps its engines, and their evaluation caches, from one game to the next
+import tournament
+engines = [EngineConfig('a', depth=2, eval_cache=1 << 16), EngineConfig('b', depth=1)]
+tournament._init_worker(engines)
+tournament._play_game((0, 1, True, 5, 30, 4, None))
+cache = engines[0].loaded_evaluator()
+misses = cache.misses
+tournament._play_game((0, 1, True, 5, 30, 4, None))
+print(f"cache after two games: {cache.hits} hits, {cache.misses} misses")
+assert engines[0].loaded_evaluator() is cache and cache.misses - misses < misses // 2  # the replay mostly hits
+
+
+#test34
+print("\n\ntest34\n")
+import benchmark
+
+# A benchmark that fails half way still puts back the move cache it replaced
+def failing_search(*args, **kwargs):
+    raise KeyboardInterrupt
+
+search = benchmark.minimax_possiblemove
+benchmark.minimax_possiblemove = failing_search
+try:
+    benchmark.search_benchmark(depth=2, every=50, move_cache_mb=1)
+    assert False
+except KeyboardInterrupt:
+    pass
+finally:
+    benchmark.minimax_possiblemove = search
+assert get_move_cache() is None
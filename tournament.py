@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Self-play tournaments between named engine configurations.
+
+Every pairing is played as game pairs: both engines get the first move once
+from the same opening (the random opening moves of both games share a seed).
+Results are summarised as an Elo difference with a 95% error bar, and a
+pairing can be stopped early by a sequential probability ratio test (SPRT).
+
+Example:
+    python tournament.py --engine deep:depth=4 --engine fast:depth=2 --games 200 --workers 8 --sprt
+"""
+
+import argparse
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from checkers_types import iterative_deepening
+from evaluators import CachedEvaluator, load_evaluator
+from gamegenerator import GameGenerator
+
+
+class EngineConfig:
+    """A named search configuration that can play in GameGenerator.generate_game."""
+
+    def __init__(self, name, depth=4, time_budget=None, evaluator=None, quiescence_nodes=0,
+                 algorithm='alphabeta', aspiration_window=None, eval_cache=0, batch_leaves=False, node_limit=None):
+        """
+        Args:
+            name: Label used in the results table
+            depth: Maximum minimax depth
+            time_budget: Optional seconds per move (iterative deepening up to depth)
+            evaluator: None/'static' for estimateAdvantage, or a path to .npz weights
+            quiescence_nodes: Quiescence node limit per leaf (0 = off)
+            algorithm: 'alphabeta' or 'pvs'
+            aspiration_window: Optional aspiration window half-width for iterative deepening
+            eval_cache: Slots of an evaluation cache (0 = off); a Tournament keeps it across the
+                moves and games of each worker process
+            batch_leaves: Evaluate the leaves below each depth-1 node in batches
+            node_limit: Optional minimax nodes per move (iterative deepening up to depth)
+        """
+        self.name = name
+        self.depth = depth
+        self.time_budget = time_budget
+        self.evaluator = evaluator
+        self.quiescence_nodes = quiescence_nodes
+        self.algorithm = algorithm
+        self.aspiration_window = aspiration_window
+        self.eval_cache = eval_cache
+        self.batch_leaves = batch_leaves
+        self.node_limit = node_limit
+        self._loaded_evaluator = None
+
+    def __getstate__(self):
+        # Worker processes load the evaluator themselves
+        state = self.__dict__.copy()
+        state['_loaded_evaluator'] = None
+        return state
+
+    def loaded_evaluator(self):
+        """The evaluator, loaded on first use and kept (with its cache) for later moves."""
+        if self._loaded_evaluator is None:
+            self._loaded_evaluator = load_evaluator(self.evaluator)
+            if self.eval_cache:
+                self._loaded_evaluator = CachedEvaluator(self._loaded_evaluator, self.eval_cache)
+        return self._loaded_evaluator
+
+    def search(self, board, history=None, depth=None, time_budget=None, node_limit=None, stats=None):
+        """
+        Search with this config; depth / time_budget / node_limit override the
+        config's own limits when given.
+
+        Returns: (best_board, depth_reached)
+        """
+        return iterative_deepening(board, depth or self.depth,
+                                   time_budget if time_budget is not None else self.time_budget,
+                                   self.loaded_evaluator(), self.quiescence_nodes, stats, algorithm=self.algorithm,
+                                   aspiration_window=self.aspiration_window, history=history,
+                                   batch_leaves=self.batch_leaves,
+                                   node_limit=node_limit if node_limit is not None else self.node_limit)
+
+    def choose_board(self, board, history=None):
+        best_board, _ = self.search(board, history)
+        return best_board
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parse 'name:depth=4,time=0.5,nodes=20000,eval=weights.npz,qnodes=200,algo=pvs,asp=0.5,cache=65536,batch=1'
+        (everything after the colon is optional).
+        """
+        name, _, options = spec.partition(':')
+        kwargs = {}
+        for option in filter(None, options.split(',')):
+            key, _, value = option.partition('=')
+            if key == 'depth':
+                kwargs['depth'] = int(value)
+            elif key == 'time':
+                kwargs['time_budget'] = float(value)
+            elif key == 'nodes':
+                kwargs['node_limit'] = int(value)
+            elif key == 'eval':
+                kwargs['evaluator'] = value
+            elif key == 'qnodes':
+                kwargs['quiescence_nodes'] = int(value)
+            elif key == 'algo':
+                kwargs['algorithm'] = value
+            elif key == 'asp':
+                kwargs['aspiration_window'] = float(value)
+            elif key == 'cache':
+                kwargs['eval_cache'] = int(value)
+            elif key == 'batch':
+                kwargs['batch_leaves'] = bool(int(value))
+            else:
+                raise ValueError(f"Unknown engine option '{key}' in '{spec}'")
+        return cls(name, **kwargs)
+
+    def __repr__(self):
+        return (f"EngineConfig({self.name!r}, depth={self.depth}, "
+                f"time_budget={self.time_budget}, evaluator={self.evaluator!r}, "
+                f"quiescence_nodes={self.quiescence_nodes}, algorithm={self.algorithm!r}, "
+                f"aspiration_window={self.aspiration_window}, eval_cache={self.eval_cache}, batch_leaves={self.batch_leaves}, "
+                f"node_limit={self.node_limit})")
+
+
+def _elo_from_score(score):
+    """Elo of a score; a score of 0 or 1 (or beyond) is -inf / +inf."""
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def _score_and_variance(wins, draws, losses):
+    """
+    Mean score and per-game score variance of a W/D/L record. The variance is
+    floored at 0.25 / (n + 1), as if one more game had gone either way, so a
+    unanimous record (all wins, all draws) still has a finite error.
+    """
+    n = wins + draws + losses
+    score = (wins + 0.5 * draws) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    return score, max(variance, 0.25 / (n + 1))
+
+
+def elo_estimate(wins, draws, losses):
+    """
+    Elo difference implied by a W/D/L record, with a 95% confidence interval.
+    A unanimous record has no finite point estimate: all wins give +inf with
+    an open upper bound of +inf (all losses: -inf and -inf below).
+
+    Returns: (elo, elo_lower, elo_upper)
+    """
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0, -math.inf, math.inf
+
+    score, variance = _score_and_variance(wins, draws, losses)
+    margin = 1.96 * math.sqrt(variance / n)
+    return (_elo_from_score(score),
+            _elo_from_score(score - margin),
+            _elo_from_score(score + margin))
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """
+    Log-likelihood ratio of H1 (elo = elo1) against H0 (elo = elo0),
+    using the normal approximation of the per-game score (GSPRT).
+    """
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0
+
+    score, variance = _score_and_variance(wins, draws, losses)
+    s0 = 1.0 / (1.0 + 10 ** (-elo0 / 400.0))
+    s1 = 1.0 / (1.0 + 10 ** (-elo1 / 400.0))
+    return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+
+def sprt_bounds(alpha, beta):
+    """LLR bounds (lower, upper) for error rates alpha (false H1) and beta (false H0)."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+# Engines of a worker process, set by _init_worker
+_engines = None
+
+
+def _init_worker(engines):
+    """
+    Keep one copy of every engine per worker process, so each evaluator (and
+    its cache) is loaded once and stays warm across the worker's games.
+    """
+    global _engines
+    _engines = engines
+
+
+def _play_game(task):
+    """Worker entry point: play one game and return the score for engine A."""
+    a, b, a_moves_first, seed, max_moves, initial_random_moves, save_dir = task
+    engine_a, engine_b = _engines[a], _engines[b]
+
+    player1, player2 = (engine_a, engine_b) if a_moves_first else (engine_b, engine_a)
+
+    generator = GameGenerator(output_dir=save_dir)
+    game_data = generator.generate_game(
+        player1.depth, player2.depth,
+        max_moves=max_moves,
+        initial_random_moves=initial_random_moves,
+        player1_engine=player1,
+        player2_engine=player2,
+        verbose=False,
+        seed=seed
+    )
+    if save_dir:
+        generator.save_game(game_data)
+
+    winner = game_data['winner'] if a_moves_first else -game_data['winner']
+    return (winner + 1) / 2
+
+
+class Pairing:
+    """Running W/D/L record of engine A against engine B."""
+
+    def __init__(self, engine_a, engine_b):
+        self.engine_a = engine_a
+        self.engine_b = engine_b
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.decision = None  # 'H0', 'H1' once the SPRT stops the pairing
+        self.unpaired = {}  # game pair -> score of its game that finished first
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def record_pair_game(self, pair, score):
+        """
+        Record one game of a colour-swapped pair. Results are only counted once
+        both games of the pair are in, so the record (and the SPRT) never sees
+        a pair with only one colour played.
+
+        Returns: True if the pair is now complete
+        """
+        if pair not in self.unpaired:
+            self.unpaired[pair] = score
+            return False
+        self.record(self.unpaired.pop(pair))
+        self.record(score)
+        return True
+
+    def record(self, score):
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def summary(self):
+        elo, lower, upper = elo_estimate(self.wins, self.draws, self.losses)
+        line = (f"{self.engine_a.name} vs {self.engine_b.name}: "
+                f"+{self.wins} ={self.draws} -{self.losses} ({self.games} games)  "
+                f"Elo {elo:+.1f} [{lower:+.1f}, {upper:+.1f}]")
+        if self.decision:
+            line += f"  SPRT accepted {self.decision}"
+        return line
+
+
+class Tournament:
+    """Round-robin or gauntlet tournament between EngineConfigs."""
+
+    def __init__(self, engines, mode="round-robin", games_per_pairing=100, max_moves=200,
+                 initial_random_moves=4, workers=None, seed=0, sprt=None, save_dir=None):
+        """
+        Args:
+            engines: List of EngineConfig; in gauntlet mode the first one plays all others
+            mode: 'round-robin' or 'gauntlet'
+            games_per_pairing: Maximum games per pairing (rounded up to an even number)
+            max_moves: Move limit per game
+            initial_random_moves: Random opening moves shared by each game pair
+            workers: Number of worker processes
+            seed: Base seed for the opening of each game pair
+            sprt: Optional dict with elo0, elo1, alpha, beta to stop pairings early
+            save_dir: Optional directory to save every game for the viewer
+        """
+        if mode == "round-robin":
+            pairs = [(a, b) for i, a in enumerate(engines) for b in engines[i + 1:]]
+        elif mode == "gauntlet":
+            pairs = [(engines[0], b) for b in engines[1:]]
+        else:
+            raise ValueError(f"Unknown tournament mode '{mode}'")
+
+        self.engines = engines
+        self.pairings = [Pairing(a, b) for a, b in pairs]
+        self.game_pairs = (games_per_pairing + 1) // 2
+        self.max_moves = max_moves
+        self.initial_random_moves = initial_random_moves
+        self.workers = workers
+        self.seed = seed
+        self.sprt = sprt
+        self.save_dir = save_dir
+
+    def _tasks(self):
+        """Interleave game pairs of all pairings so they progress together."""
+        tasks = deque()
+        for k in range(self.game_pairs):
+            for idx, pairing in enumerate(self.pairings):
+                for a_moves_first in (True, False):
+                    tasks.append((idx, k, (self.engines.index(pairing.engine_a),
+                                           self.engines.index(pairing.engine_b), a_moves_first,
+                                           self.seed + k, self.max_moves,
+                                           self.initial_random_moves, self.save_dir)))
+        return tasks
+
+    def _check_sprt(self, pairing):
+        if self.sprt is None or pairing.decision:
+            return
+        llr = sprt_llr(pairing.wins, pairing.draws, pairing.losses,
+                       self.sprt['elo0'], self.sprt['elo1'])
+        lower, upper = sprt_bounds(self.sprt['alpha'], self.sprt['beta'])
+        if llr >= upper:
+            pairing.decision = 'H1'
+        elif llr <= lower:
+            pairing.decision = 'H0'
+
+    def run(self):
+        tasks = self._tasks()
+        in_flight = {}
+        max_in_flight = 2 * (self.workers or os.cpu_count())
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.engines,)) as pool:
+
+            while tasks or in_flight:
+                while tasks and len(in_flight) < max_in_flight:
+                    idx, k, task = tasks.popleft()
+                    if self.pairings[idx].decision:
+                        continue
+                    in_flight[pool.submit(_play_game, task)] = (idx, k)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx, k = in_flight.pop(future)
+                    pairing = self.pairings[idx]
+                    if pairing.decision:
+                        continue  # stopped while this game was still running
+                    if not pairing.record_pair_game(k, future.result()):
+                        continue
+                    self._check_sprt(pairing)
+                    if pairing.decision or pairing.games % 10 == 0:
+                        print(pairing.summary())
+
+        return self.pairings
+
+    def print_results(self):
+        print(f"\n{'#'*60}")
+        print("# Tournament results")
+        print(f"{'#'*60}")
+        for pairing in self.pairings:
+            print(pairing.summary())
+        if self.sprt:
+            lower, upper = sprt_bounds(self.sprt['alpha'], self.sprt['beta'])
+            print(f"\nSPRT elo0={self.sprt['elo0']} elo1={self.sprt['elo1']} "
+                  f"bounds=[{lower:.2f}, {upper:.2f}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a self-play tournament between engine configs")
+    parser.add_argument("--engine", action="append", required=True,
+                        help="Engine spec 'name:depth=4,time=0.5,nodes=20000,eval=weights.npz,qnodes=200,algo=pvs,asp=0.5,cache=65536,batch=1'; "
+                             "give at least two")
+    parser.add_argument("--mode", choices=("round-robin", "gauntlet"), default="round-robin")
+    parser.add_argument("--games", type=int, default=100, help="Maximum games per pairing")
+    parser.add_argument("--max-moves", type=int, default=200)
+    parser.add_argument("--initial-random-moves", type=int, default=4,
+                        help="Random opening moves, shared by both games of a colour-swapped pair")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-dir", default=None, help="Save every game to this directory")
+    parser.add_argument("--sprt", action="store_true", help="Stop pairings early with an SPRT")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=20.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+
+    args = parser.parse_args()
+    engines = [EngineConfig.parse(spec) for spec in args.engine]
+    if len(engines) < 2:
+        parser.error("need at least two engines")
+
+    sprt = None
+    if args.sprt:
+        sprt = {'elo0': args.elo0, 'elo1': args.elo1, 'alpha': args.alpha, 'beta': args.beta}
+
+    tournament = Tournament(engines, args.mode, args.games, args.max_moves,
+                            args.initial_random_moves, args.workers, args.seed, sprt, args.save_dir)
+    tournament.run()
+    tournament.print_results()
+
+
+if __name__ == "__main__":
+    main()
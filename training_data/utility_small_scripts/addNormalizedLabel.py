@@ -1,34 +1,48 @@
+import argparse
+import os
 import pickle
+import sys
+
 import numpy as np
 
-# Load training data
-with open('training_data.pkl', 'rb') as f:
-    training_data = pickle.load(f)
-
-labels = training_data['labels']
-
-# Normalize labels using tanh
-# You can adjust the divisor to control the spread
-# Smaller divisor = more aggressive normalization (values closer to -1 and 1)
-# Larger divisor = gentler normalization (values closer to 0)
-divisor = 30.0  # Adjust this based on your label distribution
-
-normalized_labels = [np.tanh(label / divisor) for label in labels]
-
-# Add normalized labels to the dictionary
-training_data['normalized_labels'] = normalized_labels
-
-# Save back to file
-with open('training_data.pkl', 'wb') as f:
-    pickle.dump(training_data, f)
-
-# Print statistics
-print(f"Original labels:")
-print(f"  Min: {np.min(labels):.3f}, Max: {np.max(labels):.3f}")
-print(f"  Mean: {np.mean(labels):.3f}, Std: {np.std(labels):.3f}")
-print()
-print(f"Normalized labels (tanh with divisor={divisor}):")
-print(f"  Min: {np.min(normalized_labels):.3f}, Max: {np.max(normalized_labels):.3f}")
-print(f"  Mean: {np.mean(normalized_labels):.3f}, Std: {np.std(normalized_labels):.3f}")
-print()
-print(f"Added 'normalized_labels' field to training_data.pkl")
\ No newline at end of file
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from dataset import add_column, load_arrays, load_metadata, save_arrays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add a tanh-normalized label column to a dataset directory")
+    parser.add_argument("dataset_dir", nargs="?", default="labelled", help="Dataset directory (labeler.py output)")
+    # Smaller divisor = more aggressive normalization (values closer to -1 and 1)
+    # Larger divisor = gentler normalization (values closer to 0)
+    parser.add_argument("--divisor", type=float, default=30.0, help="Adjust this based on your label distribution")
+    parser.add_argument("--source", default="labels", help="Column to normalize")
+    parser.add_argument("--name", default="normalized_labels", help="Column to write")
+    parser.add_argument("--from-pickle", default=None,
+                        help="First convert a legacy training_data.pkl into dataset_dir (one .npy per field)")
+    args = parser.parse_args()
+
+    if args.from_pickle:
+        with open(args.from_pickle, 'rb') as f:
+            training_data = pickle.load(f)
+        save_arrays(args.dataset_dir, {key: np.asarray(value) for key, value in training_data.items()},
+                    {**load_metadata(args.dataset_dir), 'source': args.from_pickle})
+        print(f"Converted {args.from_pickle} to {args.dataset_dir}")
+
+    normalized_labels = add_column(args.dataset_dir, args.name, args.source, 'tanh', divisor=args.divisor)
+    labels = load_arrays(args.dataset_dir, (args.source,), mmap_mode='r')[args.source]
+
+    # Print statistics
+    print(f"Original labels:")
+    print(f"  Min: {np.min(labels):.3f}, Max: {np.max(labels):.3f}")
+    print(f"  Mean: {np.mean(labels, dtype=np.float64):.3f}, Std: {np.std(labels, dtype=np.float64):.3f}")
+    print()
+    print(f"Normalized labels (tanh with divisor={args.divisor}):")
+    print(f"  Min: {np.min(normalized_labels):.3f}, Max: {np.max(normalized_labels):.3f}")
+    print(f"  Mean: {np.mean(normalized_labels, dtype=np.float64):.3f}, "
+          f"Std: {np.std(normalized_labels, dtype=np.float64):.3f}")
+    print()
+    print(f"Wrote '{args.name}' to {os.path.join(args.dataset_dir, args.name + '.npy')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Streaming, mergeable statistics of label arrays in bounded memory.
+
+Labels are fed in chunks (update) and partial results from different shards
+or processes are combined with merge, so a label set never has to be loaded
+or sorted as a whole:
+
+    Moments            count, mean, standard deviation, min, max (exact)
+    StreamingHistogram fixed-width power-of-two bins that double in width
+                       when the range outgrows max_bins (exact counts per bin)
+    QuantileSketch     KLL-style compactor sketch; quantiles within about
+                       1.7 / k of the true rank (exact while count <= k)
+    LabelStats         all three together
+
+Label sources are label .npy files (read memory-mapped, in slices), dataset
+directories (<dir>/<column>.npy, or the labeller's chunks/<column>_*.npy
+checkpoints while a run is unfinished) and legacy training_data.pkl files.
+stats_for_sources splits them into slices and summarizes them across a
+process pool.
+
+Example:
+    stats = stats_for_sources(['labelled'], column='labels', workers=8)
+    print(stats.summary())
+"""
+
+import glob
+import math
+import os
+import pickle
+from multiprocessing import Pool
+
+import numpy as np
+
+# Rows per slice when reading .npy label files
+SLICE_ROWS = 1 << 20
+
+
+class Moments:
+    """Count, mean, variance (Chan et al.'s parallel update), min and max."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values):
+            other = Moments()
+            other.count = len(values)
+            other.mean = float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            other.min = float(values.min())
+            other.max = float(values.max())
+            self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        """Population standard deviation, as np.std."""
+        return math.sqrt(self.m2 / self.count) if self.count else math.nan
+
+
+class StreamingHistogram:
+    """
+    Histogram on a grid of bins of width 2**exponent, aligned to multiples of
+    the width. When the values span more than max_bins bins, the width is
+    doubled (pairs of bins are added up) until they fit; histograms are merged
+    by bringing both to the coarser grid.
+    """
+
+    def __init__(self, max_bins=4096, min_exponent=-20):
+        """
+        Args:
+            max_bins: Most bins kept; bounds the memory and sets the resolution
+            min_exponent: Finest bin width is 2**min_exponent
+        """
+        self.max_bins = max_bins
+        self.exponent = min_exponent
+        self.offset = 0  # grid index of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def width(self):
+        return 2.0 ** self.exponent
+
+    def _coarsen(self, exponent):
+        """Move the counts to the grid of width 2**exponent."""
+        shift = exponent - self.exponent
+        if shift <= 0:
+            return
+        if len(self.counts):
+            first = self.offset >> shift
+            index = ((self.offset + np.arange(len(self.counts))) >> shift) - first
+            self.counts = np.bincount(index, weights=self.counts).astype(np.int64)
+            self.offset = first
+        self.exponent = exponent
+
+    def _fit(self, low, high):
+        """Coarsen until grid indices low..high (at the current width) fit into max_bins bins."""
+        shift = 0
+        while (high >> shift) - (low >> shift) + 1 > self.max_bins:
+            shift += 1
+        self._coarsen(self.exponent + shift)
+
+    def _add(self, offset, counts):
+        """Add counts starting at grid index offset (same exponent)."""
+        if not len(counts):
+            return
+        if not len(self.counts):
+            self.offset, self.counts = offset, counts.copy()
+            return
+        first = min(self.offset, offset)
+        last = max(self.offset + len(self.counts), offset + len(counts))
+        total = np.zeros(last - first, dtype=np.int64)
+        total[self.offset - first:self.offset - first + len(self.counts)] += self.counts
+        total[offset - first:offset - first + len(counts)] += counts
+        self.offset, self.counts = first, total
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        if not np.isfinite(values).all():
+            raise ValueError("Labels must be finite")
+
+        low = int(np.floor(values.min() / self.width))
+        high = int(np.floor(values.max() / self.width))
+        if len(self.counts):
+            low, high = min(low, self.offset), max(high, self.offset + len(self.counts) - 1)
+        self._fit(low, high)
+
+        index = np.floor(values / self.width).astype(np.int64)
+        first = int(index.min())
+        self._add(first, np.bincount(index - first).astype(np.int64))
+
+    def merge(self, other):
+        if not len(other.counts):
+            return self
+        other = other.copy()
+        self._coarsen(other.exponent)
+        other._coarsen(self.exponent)
+        low, high = other.offset, other.offset + len(other.counts) - 1
+        if len(self.counts):
+            low, high = min(low, self.offset), max(high, self.offset + len(self.counts) - 1)
+        self._fit(low, high)
+        other._coarsen(self.exponent)
+        self._add(other.offset, other.counts)
+        return self
+
+    def copy(self):
+        other = StreamingHistogram(self.max_bins)
+        other.exponent, other.offset, other.counts = self.exponent, self.offset, self.counts.copy()
+        return other
+
+    @property
+    def edges(self):
+        return (self.offset + np.arange(len(self.counts) + 1)) * self.width
+
+    def rebin(self, edges):
+        """
+        Counts between the given bin edges, each fine bin spread evenly over
+        its width (as float, for plt.hist(weights=...) or plt.stairs). Counts
+        outside the edges go to the first / last bin.
+        """
+        edges = np.asarray(edges, dtype=np.float64)
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)]).astype(np.float64)
+        at_edges = np.interp(edges, self.edges, cumulative)
+        at_edges[0], at_edges[-1] = 0, cumulative[-1]
+        return np.diff(at_edges)
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch: level h holds items that each stand for 2**h values.
+    A level over its capacity is sorted and every other item (random start)
+    moves up a level; capacities shrink by 2/3 per level below the top, so
+    the sketch keeps O(k log(n / k)) items.
+    """
+
+    def __init__(self, k=400, seed=0):
+        """
+        Args:
+            k: Accuracy parameter; rank error is about 1.7 / k, memory O(k log(n / k))
+            seed: Seed of the compaction coin flips
+        """
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.zeros(0, dtype=np.float64)]
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0, dtype=np.float64))
+                items = np.sort(items)
+                # An odd item out stays on its level
+                keep = items[:len(items) % 2]
+                pairs = items[len(items) % 2:]
+                promoted = pairs[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                level = 0  # adding a level lowers the capacities below it
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.zeros(0, dtype=np.float64))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    @property
+    def count(self):
+        return sum(len(items) << level for level, items in enumerate(self.levels))
+
+    @property
+    def size(self):
+        """Items kept."""
+        return sum(len(items) for items in self.levels)
+
+    def weighted_items(self):
+        """(sorted items, their weights)."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def cdf_points(self):
+        """(values, cumulative probability) for plotting a CDF, as np.sort + arange / n."""
+        items, weights = self.weighted_items()
+        return items, np.cumsum(weights) / weights.sum()
+
+    def percentile(self, q):
+        """
+        Percentile(s) q in 0..100, interpolated between neighbouring items as
+        np.percentile; exact while every value is still kept.
+        """
+        items, weights = self.weighted_items()
+        if not len(items):
+            return math.nan
+        # Centre of each item's rank range, on np.percentile's 0..n-1 scale
+        positions = np.cumsum(weights) - (weights + 1) / 2
+        rank = np.asarray(q, dtype=np.float64) / 100 * (weights.sum() - 1)
+        return np.interp(rank, positions, items)
+
+
+class LabelStats:
+    """Moments, histogram and quantile sketch of one label column."""
+
+    def __init__(self, max_bins=4096, k=400, seed=0):
+        self.moments = Moments()
+        self.histogram = StreamingHistogram(max_bins)
+        self.sketch = QuantileSketch(k, seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.histogram.update(values)
+        self.moments.update(values)
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    def percentile(self, q):
+        return self.sketch.percentile(q)
+
+    def summary(self):
+        """Total samples, mean, median, std, min, max and quartiles."""
+        p25, median, p75 = self.percentile([25, 50, 75])
+        return {
+            'count': self.count,
+            'mean': self.moments.mean,
+            'median': float(median),
+            'std': self.moments.std,
+            'min': self.moments.min,
+            'max': self.moments.max,
+            'p25': float(p25),
+            'p75': float(p75),
+        }
+
+    def histogram_counts(self, bins=50):
+        """(counts, edges) of `bins` equal bins over [min, max], as np.histogram."""
+        edges = np.linspace(self.moments.min, self.moments.max, bins + 1)
+        return self.histogram.rebin(edges), edges
+
+    def box_stats(self, label=None):
+        """Box plot statistics for Axes.bxp (whiskers at 1.5 IQR, no fliers)."""
+        p25, median, p75 = self.percentile([25, 50, 75])
+        iqr = p75 - p25
+        items, _ = self.sketch.weighted_items()
+        inside = items[(items >= p25 - 1.5 * iqr) & (items <= p75 + 1.5 * iqr)]
+        return {
+            'label': label,
+            'med': median,
+            'q1': p25,
+            'q3': p75,
+            'whislo': max(float(inside.min()), self.moments.min) if len(inside) else p25,
+            'whishi': min(float(inside.max()), self.moments.max) if len(inside) else p75,
+            'fliers': [],
+        }
+
+
+def label_slices(source, column='labels', slice_rows=SLICE_ROWS):
+    """
+    Work items for one source: (path, start, stop) slices of .npy files, or
+    (path, column) for a legacy training_data.pkl.
+    """
+    if source.endswith('.pkl'):
+        return [(source, column)]
+    if os.path.isdir(source):
+        path = os.path.join(source, f"{column}.npy")
+        paths = [path] if os.path.exists(path) else \
+            sorted(glob.glob(os.path.join(source, "chunks", f"{column}_*.npy")))
+        if not paths:
+            raise FileNotFoundError(f"No '{column}' labels in {source}")
+    else:
+        paths = [source]
+
+    slices = []
+    for path in paths:
+        rows = len(np.load(path, mmap_mode='r'))
+        slices.extend((path, start, min(start + slice_rows, rows)) for start in range(0, rows, slice_rows))
+    return slices
+
+
+def read_slice(work_item):
+    """Values of one label_slices() work item."""
+    if len(work_item) == 2:
+        path, column = work_item
+        with open(path, 'rb') as f:
+            return np.asarray(pickle.load(f)[column], dtype=np.float64)
+    path, start, stop = work_item
+    return np.asarray(np.load(path, mmap_mode='r')[start:stop], dtype=np.float64)
+
+
+def _slice_stats(args):
+    """Worker entry point: statistics of one slice."""
+    work_item, max_bins, k, seed = args
+    return LabelStats(max_bins, k, seed).update(read_slice(work_item))
+
+
+def stats_for_sources(sources, column='labels', workers=None, max_bins=4096, k=400, seed=0):
+    """
+    LabelStats of one column over all sources, summarized slice by slice
+    across a process pool (workers=1: in this process) and merged.
+    """
+    work_items = [item for source in sources for item in label_slices(source, column)]
+    tasks = [(item, max_bins, k, seed + i) for i, item in enumerate(work_items)]
+
+    stats = LabelStats(max_bins, k, seed)
+    if workers == 1:
+        for task in tasks:
+            stats.merge(_slice_stats(task))
+        return stats
+    with Pool(workers) as pool:
+        for partial in pool.imap(_slice_stats, tasks):
+            stats.merge(partial)
+    return stats
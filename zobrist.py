@@ -0,0 +1,133 @@
+"""
+Zobrist hashing of checkers positions.
+
+Every (square, piece) pair gets a fixed random 64-bit key and a position's
+hash is the XOR of the keys of its pieces, plus SIDE_KEY when the weak bot
+(-1) is to move. Cells are hashed in the stored orientation, so a Board's
+hash does not depend on which side it is viewed from.
+
+Because XOR is its own inverse, a move changes the hash by XOR-ing a few
+keys in and out (hash_after_move, or hash_child from the boards before and
+after); undoing the move is the same operation.
+The keys come from a fixed seed, so hashes are stable across runs and can
+be stored (opening books, corpus deduplication).
+
+canonical_hash() also folds in the colour-swap symmetry (Board.flipSides
+together with a change of side to move): a position and its colour-swapped
+twin get the same canonical hash.
+"""
+
+import random
+
+from gamerecord import square_coords
+
+_rng = random.Random(20240601)
+
+# SQUARE_KEYS[square][piece]; piece -1 / -2 index from the end of the list
+SQUARE_KEYS = [[0] + [_rng.getrandbits(64) for _ in range(4)] for _ in range(32)]
+SIDE_KEY = _rng.getrandbits(64)
+
+# (row, col, keys, swapped keys) per playable square. Colour swap moves square s
+# to 31 - s and negates the piece.
+_SQUARES = [
+    square_coords(s) + (SQUARE_KEYS[s], [SQUARE_KEYS[31 - s][-p] for p in (0, 1, 2, -2, -1)])
+    for s in range(32)
+]
+
+
+def hash_cells(cells, side_to_move=1):
+    """Hash of 8x8 cells (stored orientation) with the given player to move."""
+    h = SIDE_KEY if side_to_move == -1 else 0
+    for r, c, keys, _ in _SQUARES:
+        piece = cells[r][c]
+        if piece:
+            h ^= keys[piece]
+    return h
+
+
+def hash_board(board):
+    """Hash of a Board, including its side_to_move."""
+    return hash_cells(board.board, board.side_to_move)
+
+
+def canonical_hash(cells, side_to_move=1):
+    """Hash shared by a position and its colour-swapped twin (the smaller of the two hashes)."""
+    h = swapped = SIDE_KEY
+    if side_to_move == -1:
+        swapped = 0
+    else:
+        h = 0
+    for r, c, keys, swapped_keys in _SQUARES:
+        piece = cells[r][c]
+        if piece:
+            h ^= keys[piece]
+            swapped ^= swapped_keys[piece]
+    return min(h, swapped)
+
+
+def toggle_piece(h, square, piece):
+    """Add or remove `piece` on `square` (0-31)."""
+    return h ^ SQUARE_KEYS[square][piece]
+
+
+def hash_after_move(h, cells, move):
+    """
+    Hash after playing a compact move (see gamerecord.encode_move) on `cells`,
+    the position before the move. The player to move changes as well.
+
+    Applying the same move to the resulting hash again restores `h`.
+    """
+    frm, to, promoted = move[:3]
+    h ^= SIDE_KEY
+    if frm >= 0:
+        r, c = square_coords(frm)
+        piece = cells[r][c]
+        h ^= SQUARE_KEYS[frm][piece]
+        if promoted:
+            piece = 2 if piece > 0 else -2
+        h ^= SQUARE_KEYS[to][piece]
+    for square in move[3:]:
+        r, c = square_coords(square)
+        h ^= SQUARE_KEYS[square][cells[r][c]]
+    return h
+
+
+# Per row: (col, keys) of its playable squares, for hash_child
+_ROWS = [[(c, keys) for r, c, keys, _ in _SQUARES if r == row] for row in range(8)]
+
+
+def hash_child(h, cells, child_cells):
+    """
+    Hash of child_cells, a position reached from `cells` (hash `h`) by one
+    move: the keys of the squares that changed are XOR-ed out and in, and
+    the player to move changes. Unchanged rows are skipped with one list
+    comparison (a move changes two or three rows), so this costs roughly two
+    thirds of hash_cells(); the search keys every child it visits this way.
+    """
+    h ^= SIDE_KEY
+    for row, squares in enumerate(_ROWS):
+        before, after = cells[row], child_cells[row]
+        if before != after:
+            for c, keys in squares:
+                piece, new_piece = before[c], after[c]
+                if piece != new_piece:
+                    h ^= keys[piece] ^ keys[new_piece]
+    return h
+
+
+def hash_positions(positions, side_to_move=None):
+    """
+    Hashes of (N, 32) int8 positions (dataset.encode_board layout) as uint64.
+
+    Equal to hash_cells() of the decoded positions; side_to_move is an
+    optional (N,) array of 1 / -1.
+    """
+    import numpy as np
+
+    table = np.array(SQUARE_KEYS, dtype=np.uint64)  # (32, 5), piece -1 / -2 at columns 4 / 3
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 32)
+    keys = table[np.arange(32), positions % 5]
+    hashes = np.bitwise_xor.reduce(keys, axis=1)
+    if side_to_move is not None:
+        hashes ^= np.where(np.asarray(side_to_move) == -1, np.uint64(SIDE_KEY), np.uint64(0))
+    return hashes